@@ -9,6 +9,7 @@ from .portfolios import router as portfolios_router
 from .strategy_groups import router as strategy_groups_router
 from .asset_categories import router as asset_categories_router
 from .ai import router as ai_router
+from .market_data import router as market_data_router
 
 # 创建主路由
 router = APIRouter(prefix="/api", tags=["API"])
@@ -20,3 +21,4 @@ router.include_router(portfolios_router)
 router.include_router(strategy_groups_router)
 router.include_router(asset_categories_router)
 router.include_router(ai_router)
+router.include_router(market_data_router)
@@ -5,6 +5,7 @@
 - 创建资产时，name字段为可选
 - 如果未提供name，系统会从数据服务获取资产名称
 - 数据服务根据配置选择真实API或Mock数据
+- 数据服务调用在线程池中执行，不阻塞事件循环
 """
 from datetime import datetime, timedelta
 from typing import List, Optional
@@ -20,11 +21,13 @@ from ..schemas.asset import (
     AssetCreate,
     AssetUpdate,
     AssetStrategyCategoryUpdate,
-    MarketData
+    MarketData,
+    MarketDataBatchRequest,
+    MarketDataBatchResult
 )
 from ..schemas.common import Response, PaginatedResponse
 from ..utils.auth import get_current_active_user
-from ..services.data_service import market_data_service
+from ..services.data_service import async_market_data_service
 from ..services.asset_category_mapping import asset_category_mapping_service
 
 router = APIRouter(prefix="/assets", tags=["资产"])
@@ -84,25 +87,24 @@ async def create_asset(
         )
 
     # 获取初始市场数据并验证代码是否有效
-    market_data = market_data_service.get_market_data(asset.code, asset.type)
+    batch = await async_market_data_service.get_market_data_many([(asset.code, asset.type)])
+    market_data = batch['results'].get(asset.code)
+
+    # 市场数据中已包含名称；只有获取不到市场数据时才单独查询名称
+    if market_data:
+        resolved_name = market_data.get("name")
+    else:
+        resolved_name = await async_market_data_service.get_asset_name(asset.code)
 
     # 验证代码是否存在（市场数据或名称至少有一个存在）
-    if not market_data and not market_data_service.get_asset_name(asset.code):
+    if not market_data and not resolved_name:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"无效的资产代码 '{asset.code}'：未找到对应的金融产品"
         )
 
-    # 如果未提供名称，从数据服务中获取
-    asset_name = asset.name
-    if not asset_name:
-        asset_name = market_data_service.get_asset_name(asset.code)
-        if not asset_name and market_data:
-            # 如果数据服务中没有，尝试从market_data中获取
-            asset_name = market_data.get("name")
-        # 如果还是没有，使用代码作为名称
-        if not asset_name:
-            asset_name = asset.code
+    # 如果未提供名称，使用数据服务中的名称，还是没有则使用代码作为名称
+    asset_name = asset.name or resolved_name or asset.code
 
     db_asset = Asset(
         user_id=current_user.id,
@@ -220,7 +222,7 @@ async def get_asset_market_data(
     db: Session = Depends(get_db)
 ):
     """获取资产市场数据"""
-    market_data = market_data_service.get_market_data(asset_code, asset_type)
+    market_data = await async_market_data_service.get_market_data(asset_code, asset_type)
 
     if not market_data:
         raise HTTPException(
@@ -231,6 +233,22 @@ async def get_asset_market_data(
     return Response.success_response(data=MarketData(**market_data))
 
 
+@router.post("/market-data/batch", response_model=Response[MarketDataBatchResult])
+async def get_assets_market_data_batch(
+    request: MarketDataBatchRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """批量获取资产市场数据（每种资产类型只访问一次全量数据）"""
+    batch = await async_market_data_service.get_market_data_many(
+        [(item.code, item.asset_type) for item in request.items]
+    )
+
+    return Response.success_response(data=MarketDataBatchResult(
+        results={code: MarketData(**data) for code, data in batch['results'].items()},
+        errors=batch['errors']
+    ))
+
+
 @router.post("/{asset_id}/refresh", response_model=Response[AssetSchema])
 async def refresh_asset_data(
     asset_id: int,
@@ -250,35 +268,17 @@ async def refresh_asset_data(
             detail="资产不存在"
         )
 
-    # 强制刷新数据
-    refresh_success = market_data_service.force_refresh_asset(asset.code, asset.type)
+    # 强制刷新数据，刷新结果直接返回最新市场数据
+    market_data = await async_market_data_service.refresh_market_data(asset.code, asset.type)
 
-    if not refresh_success:
+    if not market_data:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="刷新市场数据失败"
         )
 
     # 更新资产的市场数据
-    market_data = market_data_service.get_market_data(asset.code, asset.type)
-    if market_data:
-        api_price = market_data["price"]
-
-        # 检查是否应该覆盖手动设置的价格（强制刷新时不覆盖，除非满足条件）
-        should_use_api_price = should_override_manual_price(asset, api_price)
-
-        if should_use_api_price:
-            # 使用API价格
-            asset.current_price = api_price
-            asset.market_value = asset.quantity * api_price
-            asset.profit = (api_price - asset.cost_price) * asset.quantity
-            asset.profit_percent = ((api_price - asset.cost_price) / asset.cost_price) * 100
-        else:
-            # 保持手动价格
-            asset.current_price = asset.manual_set_price
-            asset.market_value = asset.quantity * asset.manual_set_price
-            asset.profit = (asset.manual_set_price - asset.cost_price) * asset.quantity
-            asset.profit_percent = ((asset.manual_set_price - asset.cost_price) / asset.cost_price) * 100
+    apply_market_price(asset, market_data["price"])
 
     # 更新策略分类
     asset.strategy_category = asset_category_mapping_service.get_effective_strategy_category(
@@ -304,42 +304,28 @@ async def batch_refresh_assets(
     failed_count = 0
     failed_assets = []
 
-    # 逐个刷新
+    # 一次批量刷新：每种基金类型的全量数据最多重新获取一次，并直接返回刷新后的市场数据
+    batch = await async_market_data_service.refresh_market_data_many(
+        [(asset.code, asset.type) for asset in assets]
+    ) if assets else {'results': {}, 'errors': {}}
+
     for asset in assets:
-        refresh_success = market_data_service.force_refresh_asset(asset.code, asset.type)
-        if refresh_success:
-            success_count += 1
-            # 更新资产的市场数据
-            market_data = market_data_service.get_market_data(asset.code, asset.type)
-            if market_data:
-                api_price = market_data["price"]
-
-                # 检查是否应该覆盖手动设置的价格
-                should_use_api_price = should_override_manual_price(asset, api_price)
-
-                if should_use_api_price:
-                    # 使用API价格
-                    asset.current_price = api_price
-                    asset.market_value = asset.quantity * api_price
-                    asset.profit = (api_price - asset.cost_price) * asset.quantity
-                    asset.profit_percent = ((api_price - asset.cost_price) / asset.cost_price) * 100
-                else:
-                    # 保持手动价格
-                    asset.current_price = asset.manual_set_price
-                    asset.market_value = asset.quantity * asset.manual_set_price
-                    asset.profit = (asset.manual_set_price - asset.cost_price) * asset.quantity
-                    asset.profit_percent = ((asset.manual_set_price - asset.cost_price) / asset.cost_price) * 100
-
-            # 更新策略分类
-            asset.strategy_category = asset_category_mapping_service.get_effective_strategy_category(
-                db, current_user.id, asset.code, asset.type, asset.name
-            )
-        else:
+        market_data = batch['results'].get(asset.code)
+        if not market_data:
             failed_count += 1
             failed_assets.append({
                 'code': asset.code,
                 'name': asset.name
             })
+            continue
+
+        success_count += 1
+        apply_market_price(asset, market_data["price"])
+
+        # 更新策略分类
+        asset.strategy_category = asset_category_mapping_service.get_effective_strategy_category(
+            db, current_user.id, asset.code, asset.type, asset.name
+        )
 
     db.commit()
 
@@ -382,6 +368,22 @@ async def get_assets_sync_status(
     })
 
 
+def apply_market_price(asset: Asset, api_price: float) -> None:
+    """用API价格更新资产的价格、市值和盈亏（满足条件时保留手动设置的价格）"""
+    # 检查是否应该覆盖手动设置的价格
+    if should_override_manual_price(asset, api_price):
+        # 使用API价格
+        price = api_price
+    else:
+        # 保持手动价格
+        price = asset.manual_set_price
+
+    asset.current_price = price
+    asset.market_value = asset.quantity * price
+    asset.profit = (price - asset.cost_price) * asset.quantity
+    asset.profit_percent = ((price - asset.cost_price) / asset.cost_price) * 100
+
+
 def should_override_manual_price(asset: Asset, api_price: float) -> bool:
     """
     判断是否应该用手动价格覆盖API价格
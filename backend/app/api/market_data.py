@@ -0,0 +1,54 @@
+"""
+市场数据服务状态API路由
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from ..models.enums import AssetType
+from ..models.user import User
+from ..schemas.common import PaginatedResponse, Response
+from ..services import data_service
+from ..utils.auth import get_current_active_user
+
+router = APIRouter(prefix="/market-data", tags=["市场数据"])
+
+
+@router.get("/source", response_model=Response[dict])
+async def get_data_source(
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取数据源信息（上游调用计数、缓存、快照存储、Redis二级缓存）"""
+    return Response.success_response(data=data_service.get_data_source_info())
+
+
+@router.get("/cache", response_model=Response[dict])
+async def get_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取进程内行情缓存的内存占用、淘汰统计和各条目信息"""
+    return Response.success_response(data=data_service.get_cache_info())
+
+
+@router.get("/quality", response_model=Response[dict])
+async def get_snapshot_quality(
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取已加载全量快照的质量报告（有效行数、各检查项未通过的行数）"""
+    return Response.success_response(data=data_service.get_snapshot_quality())
+
+
+@router.get("/funds", response_model=Response[PaginatedResponse[dict]])
+async def list_funds(
+    asset_type: AssetType = Query(AssetType.OPEN_FUND, description="基金类型"),
+    keyword: Optional[str] = Query(None, description="按代码前缀或名称筛选"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(50, ge=1, le=500, description="每页条数"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """分页浏览或搜索全市场基金（LOF、ETF、开放式基金）"""
+    try:
+        funds = await data_service.async_market_data_service.list_funds(asset_type, keyword, page, page_size)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return Response.success_response(data=funds)
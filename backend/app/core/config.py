@@ -38,6 +38,57 @@ class Settings(BaseSettings):
 
     # 数据源配置
     USE_REAL_DATA: bool = True  # True: 使用真实API数据, False: 使用Mock数据
+    MARKET_DATA_MAX_WORKERS: int = 8  # 异步数据服务线程池大小（同时进行的阻塞调用上限）
+
+    # Mock数据服务的合成市场（见 services/synthetic_market.py）：资产数 > 0 时按全市场比例生成，用于压测
+    MOCK_SYNTHETIC_ASSETS: int = 0
+    MOCK_SYNTHETIC_SEED: int = 0
+
+    # 回放录制数据（见 scripts/record_market_data.py）：设置录制目录后使用 ReplayMarketDataService，不访问网络
+    MARKET_DATA_REPLAY_DIR: Optional[str] = None
+    MARKET_DATA_REPLAY_LATENCY: Optional[float] = None  # 每次上游调用注入的延迟（秒），None 表示按录制时的耗时
+    MARKET_DATA_REPLAY_LATENCY_SCALE: float = 1.0  # 注入延迟的缩放比例，0 表示不等待
+
+    # 进程内行情缓存容量（0 表示不限制），超出时先淘汰已过期条目，再按最近最少使用淘汰
+    ASSET_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # 内存预算（字节），内存映射快照的列数据不计入
+    ASSET_CACHE_MAX_ENTRIES: int = 10000  # 最大条目数
+    ASSET_CACHE_SWEEP_INTERVAL: int = 60  # 后台清理已过期条目的间隔（秒），0 表示不启用
+    NEGATIVE_CACHE_MAX_ENTRIES: int = 10000  # 不存在代码的负缓存条目上限
+
+    # 股票行情：一次查询的股票数达到该值时获取全A股实时行情快照（一次调用），否则逐只查询；0 表示总是逐只查询
+    STOCK_SPOT_THRESHOLD: int = 3
+
+    # 上游（akshare）调用保护：超时、重试和按接口熔断，熔断期间退回最近一次成功获取的数据
+    UPSTREAM_TIMEOUT: float = 30  # 全量接口单次尝试的截止时间（秒），0 表示不限制
+    UPSTREAM_QUOTE_TIMEOUT: float = 10  # 单只股票接口单次尝试的截止时间（秒）
+    UPSTREAM_DEADLINE: float = 60  # 一次上游调用（含所有重试、退避和限流等待）的总截止时间（秒），0 表示不限制
+    UPSTREAM_MAX_RETRIES: int = 2  # 超时和网络错误的最大重试次数
+    UPSTREAM_BACKOFF_BASE: float = 0.5  # 重试退避基数（秒），指数增长并加随机抖动
+    UPSTREAM_BACKOFF_MAX: float = 8  # 单次退避等待上限（秒）
+    UPSTREAM_FAILURE_THRESHOLD: int = 5  # 连续失败多少次后熔断，0 表示不熔断
+    UPSTREAM_RESET_TIMEOUT: float = 60  # 熔断后多久放行一次探测调用（秒）
+    UPSTREAM_MAX_WORKERS: int = 8  # 执行上游调用的线程数
+    UPSTREAM_FALLBACK_MAX_AGE: int = 7 * 24 * 3600  # 熔断期间可退回的旧数据最大年龄（秒）
+
+    # 上游请求预算（令牌桶），格式: {接口名: [每秒请求数, 突发容量]}，'*' 为所有接口合计；空字典表示不限流
+    # 全量接口在 akshare 内部会分页请求多次，预算按“一次全量获取”计
+    UPSTREAM_RATE_LIMITS: dict[str, list[float]] = {
+        "*": [5, 10],
+        "stock_individual_info_em": [2, 5],
+        "stock_zh_a_spot_em": [1 / 30, 1],
+        "fund_lof_spot_em": [1 / 30, 2],
+        "fund_etf_fund_daily_em": [1 / 60, 2],
+        "fund_open_fund_daily_em": [1 / 60, 2],
+    }
+    # 各优先级取令牌的最长排队时间（秒）：interactive 用户请求，refresh 强制刷新，background 后台刷新和预热
+    UPSTREAM_RATE_MAX_WAIT: dict[str, float] = {"interactive": 5, "refresh": 15, "background": 60}
+    UPSTREAM_RATE_BACKGROUND_RESERVE: float = 1  # 非交互请求取令牌后桶中至少保留的令牌数（留给用户请求）
+    UPSTREAM_RATE_LIMIT_SHARED: bool = True  # 配置了 REDIS_URL 时通过 Redis 在所有进程和节点间共享预算
+
+    # 全量快照磁盘存储（需要 pyarrow），用于重启后热启动
+    SNAPSHOT_STORE_ENABLED: bool = True
+    SNAPSHOT_STORE_DIR: str = "./db/snapshots"
+    SNAPSHOT_STORE_MEMORY_MAP: bool = True  # 内存映射读取快照，多个 worker 共享同一份数据（Windows 下不生效）
 
     class Config:
         env_file = ".env"
@@ -2,8 +2,8 @@
 资产相关schemas
 """
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator
 from ..models.enums import AssetType
 
 
@@ -26,6 +26,32 @@ class MarketData(BaseModel):
     discount_rate: Optional[float] = None
 
 
+class MarketDataRequestItem(BaseModel):
+    """批量市场数据请求项"""
+    code: str = Field(..., description="资产代码")
+    asset_type: AssetType = Field(..., description="资产类型")
+
+
+class MarketDataBatchRequest(BaseModel):
+    """批量市场数据请求"""
+    items: List[MarketDataRequestItem] = Field(..., min_length=1, description="请求的资产列表")
+
+    @field_validator('items')
+    def validate_unique_codes(cls, v):
+        # 结果按代码索引，同一代码不能以不同资产类型请求
+        types = {}
+        for item in v:
+            if types.setdefault(item.code, item.asset_type) != item.asset_type:
+                raise ValueError(f'代码 {item.code} 不能同时以多个资产类型请求')
+        return v
+
+
+class MarketDataBatchResult(BaseModel):
+    """批量市场数据结果"""
+    results: Dict[str, MarketData] = Field(default_factory=dict, description="成功获取的市场数据，按代码索引")
+    errors: Dict[str, str] = Field(default_factory=dict, description="获取失败的代码及原因")
+
+
 class AssetBase(BaseModel):
     """资产基础信息"""
     code: str = Field(..., min_length=1, max_length=20)
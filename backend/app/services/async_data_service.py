@@ -0,0 +1,115 @@
+"""
+异步市场数据服务
+
+资产路由都是 async def，但直接调用同步的 MarketDataService：akshare 一次几秒的下载
+会阻塞整个 uvicorn 事件循环，所有其他用户的请求都会卡住。
+
+AsyncMarketDataService 是 MarketDataService 的异步对应版本：
+- 阻塞调用在有界线程池中执行，事件循环不被阻塞，同时限制并发的上游调用数
+- 相同的进行中调用（同一方法、同一参数）通过 SingleFlight 合并为一次执行
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+
+from ..models.enums import AssetType
+from .quote import Quote
+from .real_data import MarketDataService
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMarketDataService:
+    """市场数据服务的异步包装"""
+
+    def __init__(self, service: MarketDataService, max_workers: int = 8):
+        """
+        Args:
+            service: 被包装的同步市场数据服务（真实或Mock）
+            max_workers: 线程池大小，即同时进行的阻塞调用上限
+        """
+        self.service = service
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market-data")
+        self.single_flight = SingleFlight()
+
+    async def _run(self, key: str, func: Callable[..., Any], *args) -> Any:
+        """在线程池中执行阻塞调用，相同 key 的并发调用合并为一次"""
+        return await self.single_flight.do_async(key, partial(func, *args), self.executor)
+
+    async def get_stock_info(self, code: str) -> Optional[Quote]:
+        """获取股票信息"""
+        return await self._run(f"stock_info:{code}", self.service.get_stock_info, code)
+
+    async def get_lof_fund_info(self, code: str) -> Optional[Quote]:
+        """获取LOF基金信息"""
+        return await self._run(f"lof_fund_info:{code}", self.service.get_lof_fund_info, code)
+
+    async def get_etf_fund_info(self, code: str) -> Optional[Quote]:
+        """获取ETF基金信息"""
+        return await self._run(f"etf_fund_info:{code}", self.service.get_etf_fund_info, code)
+
+    async def get_open_fund_info(self, code: str) -> Optional[Quote]:
+        """获取开放式基金信息"""
+        return await self._run(f"open_fund_info:{code}", self.service.get_open_fund_info, code)
+
+    async def get_market_data(self, code: str, asset_type: AssetType) -> Optional[Quote]:
+        """获取市场数据"""
+        return await self._run(f"market_data:{AssetType(asset_type).value}:{code}", self.service.get_market_data, code, asset_type)
+
+    async def get_market_data_many(self, requests: List[Tuple[str, AssetType]]) -> Dict:
+        """批量获取市场数据"""
+        key = "market_data_many:" + ",".join(sorted(f"{AssetType(t).value}:{c}" for c, t in requests))
+        return await self._run(key, self.service.get_market_data_many, list(requests))
+
+    async def get_all_lof_funds(self) -> List[Dict]:
+        """获取所有LOF基金"""
+        return await self._run("all_lof_funds", self.service.get_all_lof_funds)
+
+    async def get_all_etf_funds(self) -> List[Dict]:
+        """获取所有ETF基金"""
+        return await self._run("all_etf_funds", self.service.get_all_etf_funds)
+
+    async def get_all_open_funds(self) -> List[Dict]:
+        """获取所有开放式基金"""
+        return await self._run("all_open_funds", self.service.get_all_open_funds)
+
+    async def list_funds(self, asset_type: AssetType, keyword: Optional[str] = None,
+                         page: int = 1, page_size: int = 50) -> Dict:
+        """分页获取基金列表"""
+        key = f"list_funds:{AssetType(asset_type).value}:{keyword or ''}:{page}:{page_size}"
+        return await self._run(key, self.service.list_funds, asset_type, keyword, page, page_size)
+
+    async def get_asset_info(self, code: str) -> Optional[Quote]:
+        """根据代码获取资产信息（自动识别类型）"""
+        return await self._run(f"asset_info:{code}", self.service.get_asset_info, code)
+
+    async def get_asset_type(self, code: str) -> Optional[AssetType]:
+        """根据代码获取资产类型"""
+        return await self._run(f"asset_type:{code}", self.service.get_asset_type, code)
+
+    async def get_asset_name(self, code: str) -> Optional[str]:
+        """根据代码获取资产名称"""
+        return await self._run(f"asset_name:{code}", self.service.get_asset_name, code)
+
+    async def force_refresh_asset(self, code: str, asset_type: AssetType) -> bool:
+        """强制刷新资产数据"""
+        return await self._run(f"force_refresh:{AssetType(asset_type).value}:{code}", self.service.force_refresh_asset, code, asset_type)
+
+    async def refresh_market_data(self, code: str, asset_type: AssetType) -> Optional[Quote]:
+        """刷新并返回资产的最新市场数据"""
+        return await self._run(f"refresh:{AssetType(asset_type).value}:{code}", self.service.refresh_market_data, code, asset_type)
+
+    async def refresh_market_data_many(self, requests: List[Tuple[str, AssetType]]) -> Dict:
+        """批量刷新并返回市场数据"""
+        key = "refresh_many:" + ",".join(sorted(f"{AssetType(t).value}:{c}" for c, t in requests))
+        return await self._run(key, self.service.refresh_market_data_many, list(requests))
+
+    def get_info(self) -> Dict:
+        """获取线程池和请求合并的统计信息"""
+        return {
+            'max_workers': self.max_workers,
+            'single_flight': self.single_flight.get_stats(),
+        }
@@ -0,0 +1,146 @@
+"""
+代码目录服务
+
+原来 get_asset_type / get_asset_name / get_asset_info 按 股票 → ETF → LOF → 开放式基金
+逐个探测，其中股票探测是一次网络调用，识别一只基金代码最多需要四次上游往返。
+
+CodeDirectory 把各个全量快照合并为一个 代码 → (类型, 名称, 交易所) 索引：
+- 基金快照每次刷新时增量同步（只增删改有变化的代码）
+- 股票在成功查询后登记
+- 结合交易所代码前缀规则推断交易所，并判断代码是否可能是股票
+
+已知代码的识别不需要任何网络调用。
+"""
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import logging
+import threading
+import weakref
+
+from ..models.enums import AssetType
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CodeEntry:
+    """代码目录条目"""
+    code: str
+    asset_type: AssetType
+    name: Optional[str]
+    exchange: Optional[str]  # 'SH' / 'SZ' / 'BJ'，场外开放式基金为 None
+
+
+# 交易所代码前缀规则：(交易所, 资产类型, 代码前缀)
+EXCHANGE_PREFIX_RULES: List[Tuple[str, AssetType, Tuple[str, ...]]] = [
+    ('SH', AssetType.STOCK, ('600', '601', '603', '605', '688', '689')),
+    ('SZ', AssetType.STOCK, ('000', '001', '002', '003', '300', '301')),
+    ('BJ', AssetType.STOCK, ('430', '83', '87', '88', '920')),
+    ('SH', AssetType.ETF_FUND, ('510', '511', '512', '513', '515', '516', '517', '518', '560', '561', '562', '563', '588')),
+    ('SZ', AssetType.ETF_FUND, ('159',)),
+    ('SH', AssetType.LOF_FUND, ('501', '502', '506')),
+    ('SZ', AssetType.LOF_FUND, ('16',)),
+]
+
+
+class CodeDirectory:
+    """合并的代码目录"""
+
+    # 同一代码属于多个类型时的优先级（与原逐个探测的顺序一致）
+    TYPE_PRIORITY = [AssetType.STOCK, AssetType.ETF_FUND, AssetType.LOF_FUND, AssetType.OPEN_FUND]
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[AssetType, CodeEntry]] = {}  # 格式: {code: {asset_type: CodeEntry}}
+        # 已同步快照的弱引用，避免重复同步（不用 id()：旧快照释放后地址可能被新快照复用）
+        self._synced_snapshots: Dict[AssetType, weakref.ref] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def infer_exchange(code: str, asset_type: AssetType) -> Optional[str]:
+        """按代码前缀规则推断交易所"""
+        for exchange, rule_type, prefixes in EXCHANGE_PREFIX_RULES:
+            if rule_type == asset_type and code.startswith(prefixes):
+                return exchange
+        return None
+
+    @staticmethod
+    def may_be_stock(code: str) -> bool:
+        """代码是否符合股票代码前缀规则"""
+        return CodeDirectory.infer_exchange(code, AssetType.STOCK) is not None
+
+    def register(self, code: str, asset_type: AssetType, name: Optional[str]) -> CodeEntry:
+        """登记单个代码（如股票查询成功后）"""
+        entry = CodeEntry(code, asset_type, name, self.infer_exchange(code, asset_type))
+        with self._lock:
+            self._entries.setdefault(code, {})[asset_type] = entry
+        return entry
+
+    def sync_snapshot(self, asset_type: AssetType, snapshot) -> None:
+        """
+        用全量快照增量同步某一类型的代码
+
+        只新增快照中新出现的代码、更新名称有变化的代码、删除快照中已消失的代码。
+        同一个快照对象只同步一次。
+        """
+        if snapshot is None or snapshot.empty:
+            return
+
+        with self._lock:
+            synced = self._synced_snapshots.get(asset_type)
+            if synced is not None and synced() is snapshot:
+                return
+
+            snapshot_codes = set(snapshot.codes())
+            added = updated = removed = 0
+
+            for code in snapshot_codes:
+                name = snapshot.get_name(code)
+                types = self._entries.setdefault(code, {})
+                existing = types.get(asset_type)
+                if existing is None:
+                    types[asset_type] = CodeEntry(code, asset_type, name, self.infer_exchange(code, asset_type))
+                    added += 1
+                elif existing.name != name:
+                    types[asset_type] = CodeEntry(code, asset_type, name, existing.exchange)
+                    updated += 1
+
+            for code in list(self._entries):
+                types = self._entries[code]
+                if asset_type in types and code not in snapshot_codes:
+                    del types[asset_type]
+                    removed += 1
+                    if not types:
+                        del self._entries[code]
+
+            self._synced_snapshots[asset_type] = weakref.ref(snapshot)
+
+        logger.info(f"代码目录同步 {asset_type.value}: 新增 {added}，更新 {updated}，删除 {removed}")
+
+    def lookup(self, code: str) -> List[CodeEntry]:
+        """获取代码的所有已知条目（按类型优先级排序）"""
+        with self._lock:
+            types = dict(self._entries.get(code, {}))
+        return [types[t] for t in self.TYPE_PRIORITY if t in types]
+
+    def get(self, code: str, asset_type: AssetType) -> Optional[CodeEntry]:
+        """获取代码在指定类型下的条目"""
+        with self._lock:
+            return self._entries.get(code, {}).get(asset_type)
+
+    def resolve(self, code: str) -> Optional[CodeEntry]:
+        """按类型优先级返回代码的首选条目"""
+        entries = self.lookup(code)
+        return entries[0] if entries else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_info(self) -> Dict:
+        """获取目录统计信息"""
+        with self._lock:
+            counts = {t.value: 0 for t in self.TYPE_PRIORITY}
+            for types in self._entries.values():
+                for asset_type in types:
+                    counts[asset_type.value] += 1
+            return {'total_codes': len(self._entries), 'by_type': counts}
@@ -8,6 +8,8 @@ from typing import Optional
 from ..core.config import settings
 from .real_data import MarketDataService, RealMarketDataService
 from .mock_data import MockDataService
+from .replay_data import ReplayMarketDataService
+from .async_data_service import AsyncMarketDataService
 
 
 def get_market_data_service() -> MarketDataService:
@@ -17,21 +19,34 @@ def get_market_data_service() -> MarketDataService:
     根据配置文件中的USE_REAL_DATA设置选择数据源：
     - USE_REAL_DATA = True: 使用真实数据服务（需要实现）
     - USE_REAL_DATA = False: 使用Mock数据服务（当前默认）
+    设置了 MARKET_DATA_REPLAY_DIR 时优先使用回放服务（真实数据服务的实现 + 录制的上游数据）
+    Mock数据服务在 MOCK_SYNTHETIC_ASSETS > 0 时加入按种子生成的合成资产
 
     Returns:
         MarketDataService: 市场数据服务实例
     """
-    if settings.USE_REAL_DATA and RealMarketDataService:
+    if settings.MARKET_DATA_REPLAY_DIR:
+        return ReplayMarketDataService(
+            settings.MARKET_DATA_REPLAY_DIR,
+            latency=settings.MARKET_DATA_REPLAY_LATENCY,
+            latency_scale=settings.MARKET_DATA_REPLAY_LATENCY_SCALE,
+        )
+    elif settings.USE_REAL_DATA and RealMarketDataService:
         # 使用真实数据服务
         return RealMarketDataService()
     else:
         # 使用Mock数据服务（默认）
+        if settings.MOCK_SYNTHETIC_ASSETS > 0:
+            return MockDataService.with_synthetic_market(settings.MOCK_SYNTHETIC_ASSETS, seed=settings.MOCK_SYNTHETIC_SEED)
         return MockDataService()
 
 
 # 创建全局数据服务实例
 market_data_service = get_market_data_service()
 
+# 异步数据服务实例（供 async 路由使用，阻塞调用在有界线程池中执行）
+async_market_data_service = AsyncMarketDataService(market_data_service, settings.MARKET_DATA_MAX_WORKERS)
+
 
 def refresh_market_data_service() -> None:
     """
@@ -40,8 +55,9 @@ def refresh_market_data_service() -> None:
     在配置变更后调用此方法重新创建服务实例。
     主要用于开发和测试场景。
     """
-    global market_data_service
+    global market_data_service, async_market_data_service
     market_data_service = get_market_data_service()
+    async_market_data_service = AsyncMarketDataService(market_data_service, settings.MARKET_DATA_MAX_WORKERS)
 
 
 def get_data_source_info() -> dict:
@@ -53,9 +69,71 @@ def get_data_source_info() -> dict:
     """
     is_using_real_data = settings.USE_REAL_DATA and RealMarketDataService is not None
 
+    # 上游API调用计数、上游调用保护（熔断、延迟、错误）、快照存储和 Redis 二级缓存信息（仅真实数据服务提供）
+    upstream_calls = {}
+    upstream = {}
+    asset_cache = {}
+    negative_cache = {}
+    snapshot_store = {}
+    l2_cache = {}
+    if isinstance(market_data_service, RealMarketDataService):
+        upstream_calls = market_data_service.get_upstream_stats()
+        upstream = market_data_service.upstream.get_info()
+        asset_cache = market_data_service.cache.get_info()
+        negative_cache = market_data_service.negative_cache.get_info()
+        snapshot_store = market_data_service.snapshot_store.get_info()
+        l2_cache = market_data_service.l2_cache.get_info()
+
+    if isinstance(market_data_service, ReplayMarketDataService):
+        source = {
+            "source": "replay",
+            "service_type": "ReplayMarketDataService",
+            "description": "回放录制的上游数据",
+            "replay": market_data_service.get_replay_info(),
+        }
+    else:
+        source = {
+            "source": "real_api" if is_using_real_data else "mock_data",
+            "service_type": "RealMarketDataService" if is_using_real_data else "MockDataService",
+            "description": "使用真实金融API数据" if is_using_real_data else "使用Mock测试数据",
+        }
+
     return {
-        "source": "real_api" if is_using_real_data else "mock_data",
-        "service_type": "RealMarketDataService" if is_using_real_data else "MockDataService",
+        **source,
         "config_setting": settings.USE_REAL_DATA,
-        "description": "使用真实金融API数据" if is_using_real_data else "使用Mock测试数据"
+        "upstream_calls": upstream_calls,
+        "upstream": upstream,
+        "asset_cache": asset_cache,
+        "negative_cache": negative_cache,
+        "snapshot_store": snapshot_store,
+        "l2_cache": l2_cache,
+    }
+
+
+def get_cache_info() -> dict:
+    """
+    获取进程内行情缓存的统计信息和条目列表
+
+    Returns:
+        dict: {'info': 统计信息, 'entries': 各条目的元数据}；Mock数据服务没有缓存，均为空
+    """
+    if not isinstance(market_data_service, RealMarketDataService):
+        return {"info": {}, "entries": []}
+
+    return {
+        "info": market_data_service.cache.get_info(),
+        "entries": market_data_service.cache.get_entries(),
     }
+
+
+def get_snapshot_quality() -> dict:
+    """
+    获取各全量快照的质量报告（各检查项未通过的行数）
+
+    Returns:
+        dict: {快照类型: 质量报告}；Mock数据服务没有快照，为空
+    """
+    if not isinstance(market_data_service, RealMarketDataService):
+        return {}
+
+    return market_data_service.get_snapshot_quality()
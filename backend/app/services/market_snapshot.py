@@ -0,0 +1,250 @@
+"""
+全市场快照（带代码索引）
+
+akshare的全量接口（LOF实时行情、ETF日净值、开放式基金日净值）一次返回整个市场的
+DataFrame。原实现每次查询都用 iloc 逐行扫描并逐列重建字典，是 O(行数×列数) 的
+Python 循环。
+
+MarketSnapshot 在每次获取数据后构建一次：
+- 代码 → 行位置 的哈希索引
+- 预先清洗（NaN → None）的行记录
+
+之后按代码查询记录、名称、是否存在都是 O(1) 操作。
+
+由快照整体计算出的派生结果（如全量基金列表）可以用 memoize 缓存在快照上：
+快照构建后不再修改，刷新时整体替换为新对象，缓存自然随快照版本失效。
+
+快照也可以直接建立在（内存映射的）Arrow 表之上（from_arrow）：此时不复制列数据，
+只在本进程内构建代码索引，行记录在查询时按需从列中读取。多个 worker 进程映射同一个
+快照文件时，列数据只在操作系统页缓存中保存一份。
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from datetime import datetime
+import sys
+import threading
+
+import pandas as pd
+
+
+class MarketSnapshot:
+    """带代码索引的全市场数据快照"""
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        code_column: str,
+        name_column: str,
+        snapshot_type: str,
+        fetched_at: Optional[datetime] = None,
+    ):
+        """
+        Args:
+            frame: akshare返回的全量DataFrame
+            code_column: 代码列名（如 '代码'、'基金代码'）
+            name_column: 名称列名（如 '名称'、'基金简称'）
+            snapshot_type: 快照类型标识（如 'lof'、'etf'、'open_fund'）
+            fetched_at: 数据获取时间，默认为当前时间
+        """
+        self._frame = frame.reset_index(drop=True)
+        self._table = None
+        self.code_column = code_column
+        self.name_column = name_column
+        self.snapshot_type = snapshot_type
+        self.fetched_at = fetched_at or datetime.now()
+
+        self._positions = self._build_code_index()
+        self._records = self._build_records()
+        self._memo: Dict[str, Any] = {}
+        self._memo_lock = threading.RLock()
+
+    @classmethod
+    def from_arrow(
+        cls,
+        table,
+        code_column: str,
+        name_column: str,
+        snapshot_type: str,
+        fetched_at: Optional[datetime] = None,
+    ) -> 'MarketSnapshot':
+        """
+        基于 Arrow 表构建快照（零拷贝）
+
+        表通常来自内存映射的快照文件，列数据不会复制到本进程；
+        只有代码索引在本进程内构建。
+        """
+        snapshot = cls.__new__(cls)
+        snapshot._frame = None
+        snapshot._table = table
+        snapshot.code_column = code_column
+        snapshot.name_column = name_column
+        snapshot.snapshot_type = snapshot_type
+        snapshot.fetched_at = fetched_at or datetime.now()
+
+        # 逐个遍历代码建立索引，不经过 pandas，避免在每个进程中产生大块临时内存
+        positions = {}
+        for pos, code in enumerate(table.column(code_column).to_pylist()):
+            if code is not None:
+                positions.setdefault(str(code), pos)
+        snapshot._positions = positions
+        snapshot._records = None
+        snapshot._column_names = list(table.column_names)
+        snapshot._columns = [table.column(name) for name in snapshot._column_names]
+        snapshot._name_values = table.column(name_column)
+        snapshot._memo = {}
+        snapshot._memo_lock = threading.RLock()
+        return snapshot
+
+    def _build_code_index(self) -> Dict[str, int]:
+        """构建 代码 → 行位置 索引（代码重复时保留第一行，与原逐行扫描行为一致）"""
+        codes = self._frame[self.code_column]
+        codes = codes[codes.notna()].astype(str)
+        codes = codes[~codes.duplicated(keep='first')]
+        return dict(zip(codes.tolist(), codes.index.tolist()))
+
+    def _build_records(self) -> List[Dict]:
+        """一次性把所有行转换为字典，并把 NaN 统一替换为 None"""
+        cleaned = self._frame.astype(object).where(self._frame.notna(), None)
+        return cleaned.to_dict('records')
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        原始 DataFrame
+
+        Arrow 快照每次访问都会转换出一份新的 DataFrame（不缓存，避免每个进程各持有一份副本）。
+        """
+        if self._frame is not None:
+            return self._frame
+        return self._table.to_pandas()
+
+    def select_frame(self, columns: Sequence[str]) -> pd.DataFrame:
+        """
+        只包含指定列的 DataFrame（不存在的列忽略）
+
+        Arrow 快照只转换这些列，不会把整张表复制到进程内存。
+        """
+        selected = [column for column in columns if column in self.columns]
+        if self._frame is not None:
+            return self._frame[selected]
+        return self._table.select(selected).to_pandas()
+
+    def memoize(self, key: str, build: Callable[['MarketSnapshot'], Any]) -> Any:
+        """
+        按快照缓存派生结果，同一快照上的 build 只执行一次
+
+        Args:
+            key: 派生结果的名称（如 'listing'）
+            build: 以快照为参数计算派生结果
+        """
+        with self._memo_lock:
+            if key not in self._memo:
+                self._memo[key] = build(self)
+            return self._memo[key]
+
+    @property
+    def arrow_table(self):
+        """底层 Arrow 表（仅 from_arrow 构建的快照有）"""
+        return self._table
+
+    @property
+    def is_memory_mapped(self) -> bool:
+        """是否基于 Arrow 表（零拷贝）"""
+        return self._table is not None
+
+    def _record_at(self, pos: int) -> Dict:
+        """按行位置读取记录（返回新字典）"""
+        if self._records is not None:
+            return dict(self._records[pos])
+        return {name: column[pos].as_py() for name, column in zip(self._column_names, self._columns)}
+
+    def __len__(self) -> int:
+        if self._records is not None:
+            return len(self._records)
+        return self._table.num_rows
+
+    def __contains__(self, code: str) -> bool:
+        return str(code) in self._positions
+
+    @property
+    def empty(self) -> bool:
+        """快照是否为空（与 DataFrame.empty 语义一致）"""
+        return len(self) == 0
+
+    @property
+    def columns(self) -> List[str]:
+        """原始列名"""
+        if self._frame is not None:
+            return list(self._frame.columns)
+        return list(self._column_names)
+
+    def codes(self) -> Iterator[str]:
+        """遍历快照中的所有代码"""
+        return iter(self._positions)
+
+    def position(self, code: str) -> Optional[int]:
+        """获取代码对应的行位置"""
+        return self._positions.get(str(code))
+
+    def get_record(self, code: str) -> Optional[Dict]:
+        """
+        按代码获取清洗后的行记录
+
+        返回浅拷贝，调用方修改结果不会影响快照。
+        """
+        pos = self._positions.get(str(code))
+        if pos is None:
+            return None
+        return self._record_at(pos)
+
+    def get_record_at(self, position: int) -> Dict:
+        """按行位置获取清洗后的行记录（位置来自 position()）"""
+        return self._record_at(position)
+
+    def get_records(self, codes: Iterable[str]) -> Dict[str, Dict]:
+        """
+        批量按代码获取记录，一次遍历完成所有请求代码的索引查询
+
+        Returns:
+            {code: 记录}，未找到的代码不在结果中
+        """
+        positions = self._positions
+        found = {}
+        for code in codes:
+            pos = positions.get(str(code))
+            if pos is not None:
+                found[code] = self._record_at(pos)
+        return found
+
+    def get_name(self, code: str) -> Optional[str]:
+        """按代码获取名称"""
+        pos = self._positions.get(str(code))
+        if pos is None:
+            return None
+        if self._records is not None:
+            return self._records[pos].get(self.name_column)
+        return self._name_values[pos].as_py()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        估算快照占用的内存（字节）
+
+        Returns:
+            {'private': 本进程私有内存, 'mapped': 内存映射的列数据（多进程共享的页缓存）}
+            pandas 快照：DataFrame 深度内存 + 行记录 + 代码索引，全部计入 private；
+            Arrow 快照：只有代码索引是私有的，列数据计入 mapped
+        """
+        index_bytes = sys.getsizeof(self._positions) + sum(sys.getsizeof(code) for code in self._positions)
+
+        if self._records is None:
+            return {'private': index_bytes, 'mapped': self._table.nbytes}
+
+        frame_bytes = int(self._frame.memory_usage(index=True, deep=True).sum())
+        # 行记录中的字符串与 DataFrame 共享同一对象，这里只按每行字典本身的大小近似估算
+        records_bytes = sys.getsizeof(self._records)
+        if self._records:
+            records_bytes += len(self._records) * sys.getsizeof(self._records[0])
+        return {'private': frame_bytes + records_bytes + index_bytes, 'mapped': 0}
+
+    def __repr__(self):
+        backing = "arrow" if self.is_memory_mapped else "pandas"
+        return f"<MarketSnapshot {self.snapshot_type} rows={len(self)} {backing} fetched_at={self.fetched_at:%Y-%m-%d %H:%M:%S}>"
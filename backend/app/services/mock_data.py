@@ -6,13 +6,16 @@ Mock数据服务 - 用于替代akshare API调用
 而非独立的债券资产。
 
 该服务实现了MarketDataService接口，可以与真实数据服务互换使用。
+传入 SyntheticMarket 时在手写资产之外加入按种子生成的合成资产（可达 10 万级），用于压测和基准测试。
 """
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import random
 
 from ..models.enums import AssetType, StrategyCategory
+from .quote import Quote
 from .real_data import MarketDataService
+from .synthetic_market import SyntheticMarket
 
 
 class MockDataService(MarketDataService):
@@ -129,108 +132,125 @@ class MockDataService(MarketDataService):
         },
     }
 
-    def get_stock_info(self, code: str) -> Optional[Dict]:
+    def __init__(self, synthetic_market: Optional[SyntheticMarket] = None, seed: Optional[int] = None):
+        """
+        Args:
+            synthetic_market: 合成市场（其资产加入 MOCK_ASSETS 之外的资产表）
+            seed: 行情模拟波动的随机种子（None 表示不固定）
+        """
+        self.synthetic_market = synthetic_market
+        self.assets: Dict[str, Dict] = dict(self.MOCK_ASSETS)
+        if synthetic_market is not None:
+            self.assets.update(synthetic_market.assets())
+
+        # 按类型索引，get_all_* 不必每次扫描全部资产
+        self._codes_by_type: Dict[AssetType, List[str]] = {}
+        for code, asset in self.assets.items():
+            self._codes_by_type.setdefault(asset["type"], []).append(code)
+
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def with_synthetic_market(cls, size: int, seed: int = 0, **kwargs) -> 'MockDataService':
+        """按全市场比例生成约 size 个合成资产（代码不与手写资产重复）"""
+        market = SyntheticMarket.of_size(size, seed=seed, exclude=cls.MOCK_ASSETS.keys(), **kwargs)
+        return cls(market, seed=seed)
+
+    def get_stock_info(self, code: str) -> Optional[Quote]:
         """获取股票信息"""
-        if code in self.MOCK_ASSETS:
-            return self.MOCK_ASSETS[code].copy()
+        if code in self.assets:
+            return Quote.from_mapping(self.assets[code])
         return None
 
-    def get_lof_fund_info(self, code: str) -> Optional[Dict]:
+    def get_lof_fund_info(self, code: str) -> Optional[Quote]:
         """获取LOF基金信息"""
-        if code in self.MOCK_ASSETS:
-            asset = self.MOCK_ASSETS[code]
+        if code in self.assets:
+            asset = self.assets[code]
             if asset["type"] == AssetType.LOF_FUND:
-                return asset.copy()
+                return Quote.from_mapping(asset)
         return None
 
-    def get_etf_fund_info(self, code: str) -> Optional[Dict]:
+    def get_etf_fund_info(self, code: str) -> Optional[Quote]:
         """获取ETF基金信息"""
-        if code in self.MOCK_ASSETS:
-            asset = self.MOCK_ASSETS[code]
+        if code in self.assets:
+            asset = self.assets[code]
             if asset["type"] == AssetType.ETF_FUND:
-                return asset.copy()
+                return Quote.from_mapping(asset)
         return None
 
-    def get_open_fund_info(self, code: str) -> Optional[Dict]:
+    def get_open_fund_info(self, code: str) -> Optional[Quote]:
         """获取开放式基金信息"""
-        if code in self.MOCK_ASSETS:
-            asset = self.MOCK_ASSETS[code]
+        if code in self.assets:
+            asset = self.assets[code]
             if asset["type"] == AssetType.OPEN_FUND:
-                return asset.copy()
+                return Quote.from_mapping(asset)
         return None
 
-    def get_market_data(self, code: str, asset_type: AssetType) -> Optional[Dict]:
+    def get_market_data(self, code: str, asset_type: AssetType) -> Optional[Quote]:
         """
         获取市场数据
 
         返回的数据包含资产名称，以便在创建资产时如果未提供名称可以自动填充
         """
-        asset = self.MOCK_ASSETS.get(code)
+        asset = self.assets.get(code)
         if asset and asset["type"] == asset_type:
             base_price = asset["price"]
             # 模拟价格波动
-            price_change = random.uniform(-0.01, 0.01) * base_price
+            price_change = self._rng.uniform(-0.01, 0.01) * base_price
             new_price = base_price + price_change
 
-            return {
-                "name": asset.get("name"),  # 包含资产名称
-                "price": round(new_price, 4),
-                "change_amount": round(price_change, 4),
-                "change_percent": round((price_change / base_price) * 100, 2),
-                "volume": asset.get("volume"),
-                "turnover": asset.get("turnover"),
-                "open_price": round(new_price * random.uniform(0.98, 1.0), 4),
-                "high_price": round(new_price * random.uniform(1.0, 1.02), 4),
-                "low_price": round(new_price * random.uniform(0.98, 1.0), 4),
-                "prev_close": round(base_price, 4),
-                "turnover_rate": random.uniform(0.1, 10),
-                "circulating_market_cap": random.uniform(100000000, 10000000000),
-                "total_market_cap": random.uniform(100000000, 10000000000),
-                "unit_net_value": asset.get("unit_net_value"),
-                "accumulated_net_value": asset.get("accumulated_net_value"),
-                "discount_rate": random.uniform(-5, 5),
-            }
+            return Quote(
+                code=code,
+                name=asset.get("name"),  # 包含资产名称
+                type=asset_type,
+                price=round(new_price, 4),
+                change_amount=round(price_change, 4),
+                change_percent=round((price_change / base_price) * 100, 2),
+                volume=asset.get("volume"),
+                turnover=asset.get("turnover"),
+                open_price=round(new_price * self._rng.uniform(0.98, 1.0), 4),
+                high_price=round(new_price * self._rng.uniform(1.0, 1.02), 4),
+                low_price=round(new_price * self._rng.uniform(0.98, 1.0), 4),
+                prev_close=round(base_price, 4),
+                turnover_rate=self._rng.uniform(0.1, 10),
+                circulating_market_cap=self._rng.uniform(100000000, 10000000000),
+                total_market_cap=self._rng.uniform(100000000, 10000000000),
+                unit_net_value=asset.get("unit_net_value"),
+                accumulated_net_value=asset.get("accumulated_net_value"),
+                discount_rate=self._rng.uniform(-5, 5),
+            )
         return None
 
     def get_all_lof_funds(self) -> List[Dict]:
         """获取所有LOF基金"""
-        return [
-            {**data, "updated_at": datetime.now()}
-            for code, data in self.MOCK_ASSETS.items()
-            if data["type"] == AssetType.LOF_FUND
-        ]
+        return self._list_assets(AssetType.LOF_FUND)
 
     def get_all_etf_funds(self) -> List[Dict]:
         """获取所有ETF基金"""
-        return [
-            {**data, "updated_at": datetime.now()}
-            for code, data in self.MOCK_ASSETS.items()
-            if data["type"] == AssetType.ETF_FUND
-        ]
+        return self._list_assets(AssetType.ETF_FUND)
 
     def get_all_open_funds(self) -> List[Dict]:
         """获取所有开放式基金"""
-        return [
-            {**data, "updated_at": datetime.now()}
-            for code, data in self.MOCK_ASSETS.items()
-            if data["type"] == AssetType.OPEN_FUND
-        ]
+        return self._list_assets(AssetType.OPEN_FUND)
 
-    def get_asset_info(self, code: str) -> Optional[Dict]:
+    def _list_assets(self, asset_type: AssetType) -> List[Dict]:
+        """某类型的全部资产（附带更新时间）"""
+        updated_at = datetime.now()
+        return [{**self.assets[code], "updated_at": updated_at} for code in self._codes_by_type.get(asset_type, [])]
+
+    def get_asset_info(self, code: str) -> Optional[Quote]:
         """根据代码获取资产信息（自动识别类型）"""
-        for asset_data in self.MOCK_ASSETS.values():
-            if asset_data["code"] == code:
-                return asset_data.copy()
-        return None
+        asset = self.assets.get(code)
+        return Quote.from_mapping(asset) if asset else None
 
     def get_asset_type(self, code: str) -> Optional[AssetType]:
         """根据代码获取资产类型"""
-        asset = self.MOCK_ASSETS.get(code)
+        asset = self.assets.get(code)
         return asset["type"] if asset else None
 
     def get_asset_name(self, code: str) -> Optional[str]:
         """根据代码获取资产名称"""
-        asset = self.MOCK_ASSETS.get(code)
+        asset = self.assets.get(code)
         return asset["name"] if asset else None
 
     def force_refresh_asset(self, code: str, asset_type: AssetType) -> bool:
@@ -0,0 +1,154 @@
+"""
+净值列解析
+
+ETF 和开放式基金的全量数据中，净值以带日期的列给出（如 '2026-03-08-单位净值'、
+'2026-03-08-累计净值'），同一个 DataFrame 中所有行的列结构完全相同。原实现对每只基金的
+每个字段都跑一遍正则和 strptime，再逐字段查找有效净值；列出全部开放式基金时要重复约两万次。
+
+这里在每次获取快照后只解析一次列结构，再用向量化的列运算为所有基金一次性算出：
+- 最新有效净值（任意日期净值列，ETF 使用）
+- 最新有效单位净值、最新有效累计净值（开放式基金使用）
+及对应的净值日期和来源字段，作为派生列保存在快照中。之后查询单只基金只需读取一行。
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from datetime import datetime
+import re
+
+import numpy as np
+import pandas as pd
+
+NAV_FIELD_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})-(.+)$')  # 日期开头的净值字段
+
+UNIT_NAV = '单位净值'
+ACCUMULATED_NAV = '累计净值'
+
+# 有效净值范围（排除零值、负值和明显异常的值）
+MIN_VALID_NAV = 0.001
+MAX_VALID_NAV = 10000
+
+
+class NavColumns(NamedTuple):
+    """一组派生列：净值、净值日期、来源字段"""
+    value: str
+    date: str
+    field: str
+
+
+# 派生列（不以日期开头，不会被当作净值字段再次解析）
+LATEST_NAV = NavColumns('最新净值', '最新净值日期', '最新净值字段')  # 任意日期净值字段中最新的有效值
+LATEST_UNIT_NAV = NavColumns('最新单位净值', '最新单位净值日期', '最新单位净值字段')
+LATEST_ACCUMULATED_NAV = NavColumns('最新累计净值', '最新累计净值日期', '最新累计净值字段')
+
+# 派生列 → 参与计算的净值类型（None 表示所有日期净值字段）
+DERIVED_NAV_COLUMNS: List[Tuple[NavColumns, Optional[str]]] = [
+    (LATEST_NAV, None),
+    (LATEST_UNIT_NAV, UNIT_NAV),
+    (LATEST_ACCUMULATED_NAV, ACCUMULATED_NAV),
+]
+
+
+class NavField(NamedTuple):
+    """解析出的净值字段"""
+    field: str
+    date: datetime
+    nav_type: str  # 日期之后的部分，如 '单位净值'
+
+
+def parse_nav_fields(columns: Sequence[str]) -> List[NavField]:
+    """
+    解析所有日期格式的净值字段，按日期降序排列（同一日期保持原列顺序）
+
+    日期不合法的字段（如 '2026-13-01-单位净值'）被忽略。
+    """
+    nav_fields = []
+    for column in columns:
+        match = NAV_FIELD_PATTERN.match(str(column))
+        if not match:
+            continue
+        try:
+            nav_date = datetime.strptime(match.group(1), '%Y-%m-%d')
+        except ValueError:
+            continue
+        nav_fields.append(NavField(column, nav_date, match.group(2)))
+
+    nav_fields.sort(key=lambda nav_field: nav_field.date, reverse=True)
+    return nav_fields
+
+
+def add_nav_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    为所有行计算最新有效净值，返回增加了派生列的新 DataFrame
+
+    每组派生列按日期从新到旧检查对应的净值字段，取第一个在有效范围内的值；
+    没有有效值的行派生列为空。
+    """
+    nav_fields = parse_nav_fields(frame.columns)
+    derived = {}
+
+    for columns, nav_type in DERIVED_NAV_COLUMNS:
+        fields = [nav_field for nav_field in nav_fields if nav_type is None or nav_field.nav_type == nav_type]
+        values = np.full(len(frame), np.nan)
+        dates = pd.Series(pd.NaT, index=frame.index, dtype='datetime64[ns]')
+        sources = pd.Series(None, index=frame.index, dtype=object)
+
+        if fields:
+            # 行 × 字段 的数值矩阵（无法转换的值为 NaN），字段已按日期降序排列
+            matrix = np.column_stack([
+                pd.to_numeric(frame[nav_field.field], errors='coerce').to_numpy(dtype=float)
+                for nav_field in fields
+            ])
+            with np.errstate(invalid='ignore'):
+                valid = (matrix > MIN_VALID_NAV) & (matrix < MAX_VALID_NAV)
+
+            found = valid.any(axis=1)
+            first = valid.argmax(axis=1)  # 每行第一个有效字段的位置
+            rows = np.flatnonzero(found)
+
+            values[rows] = matrix[rows, first[rows]]
+            field_dates = np.array([nav_field.date for nav_field in fields], dtype='datetime64[ns]')
+            field_names = np.array([nav_field.field for nav_field in fields], dtype=object)
+            dates.iloc[rows] = field_dates[first[rows]]
+            sources.iloc[rows] = field_names[first[rows]]
+
+        derived[columns.value] = values
+        derived[columns.date] = dates
+        derived[columns.field] = sources
+
+    return frame.assign(**derived)
+
+
+def read_nav(record: Dict, columns: NavColumns) -> Optional[Dict]:
+    """
+    从快照行记录中读取一组派生净值列
+
+    Returns:
+        {'price': 净值, 'field': 来源字段, 'date': 净值日期}；该行没有有效净值时返回 None
+    """
+    value = record.get(columns.value)
+    if value is None or pd.isna(value):
+        return None
+
+    nav_date = record.get(columns.date)
+    if isinstance(nav_date, pd.Timestamp):
+        nav_date = nav_date.to_pydatetime()
+
+    return {
+        'price': float(value),
+        'field': record.get(columns.field),
+        'date': nav_date,
+    }
+
+
+def has_nav_columns(record: Dict) -> bool:
+    """行记录中是否已有派生净值列（来自经过 add_nav_columns 处理的快照）"""
+    return LATEST_NAV.value in record
+
+
+def ensure_nav_columns(record: Dict) -> Dict:
+    """返回带派生净值列的行记录：快照记录直接返回，其他来源的单行数据现场计算"""
+    if has_nav_columns(record):
+        return record
+
+    row = add_nav_columns(pd.DataFrame([record])).iloc[0]
+    return {column: (None if not isinstance(value, str) and pd.isna(value) else value)
+            for column, value in row.items()}
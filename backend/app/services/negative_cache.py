@@ -0,0 +1,128 @@
+"""
+不存在代码的负缓存
+
+创建资产时先用 get_market_data 校验代码，再用 get_asset_name 识别名称。输错或已退市的代码
+每次都查不到，原来不会留下任何记录：股票代码每次都探测一次上游接口，快照过期后还会触发
+全量下载，用户或脚本反复重试时会持续冲击 akshare。
+
+NegativeCache 按资产类型记录已确认不存在的代码：
+- 有效期与该类型数据的刷新时间一致（到下一次快照可能变化的时刻为止）
+- 新快照包含该代码时（如新上市），立即失效
+- 条目数有上限，超出时淘汰最早写入的条目，防止随意输入的代码占满内存
+
+命中负缓存的代码不产生任何网络调用。
+"""
+from typing import Dict, Iterable, Optional
+from collections import OrderedDict
+from datetime import datetime
+import logging
+import threading
+
+from ..models.enums import AssetType
+
+logger = logging.getLogger(__name__)
+
+
+class NegativeCache:
+    """按资产类型记录不存在的代码"""
+
+    def __init__(self, max_entries: int = 10000):
+        """
+        Args:
+            max_entries: 最大条目数，0 表示不限制
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # 格式: {(asset_type, code): expires_at}，按写入顺序
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,  # 命中次数（省去的查询）
+            'added': 0,  # 写入次数
+            'invalidated': 0,  # 因新快照包含该代码而失效的条目数
+            'evicted': 0,  # 因超出条目数上限被淘汰的条目数
+        }
+
+    def contains(self, asset_type: AssetType, code: str) -> bool:
+        """代码是否已确认在该类型中不存在（过期条目会被删除）"""
+        key = (AssetType(asset_type), str(code))
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if datetime.now() >= expires_at:
+                del self._entries[key]
+                return False
+            self._stats['hits'] += 1
+            return True
+
+    def add(self, asset_type: AssetType, code: str, expires_at: datetime) -> None:
+        """
+        记录不存在的代码
+
+        Args:
+            expires_at: 失效时间（通常为该类型数据下一次可能变化的时刻）
+        """
+        key = (AssetType(asset_type), str(code))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = expires_at
+            self._stats['added'] += 1
+
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evicted'] += 1
+
+        logger.info(f"{AssetType(asset_type).value} 代码 {code} 不存在，{expires_at:%Y-%m-%d %H:%M:%S} 前不再查询")
+
+    def discard(self, asset_type: AssetType, code: str) -> bool:
+        """删除某个代码的条目（如该代码已查询成功）"""
+        with self._lock:
+            return self._entries.pop((AssetType(asset_type), str(code)), None) is not None
+
+    def invalidate_present(self, asset_type: AssetType, codes: Iterable[str]) -> int:
+        """
+        新快照到达时调用：删除该类型中已出现在快照里的代码
+
+        Args:
+            codes: 支持 in 判断的代码集合（如 MarketSnapshot）
+
+        Returns:
+            失效的条目数
+        """
+        asset_type = AssetType(asset_type)
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == asset_type and key[1] in codes]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidated'] += len(stale)
+
+        if stale:
+            logger.info(f"新的 {asset_type.value} 快照包含 {len(stale)} 个负缓存代码，已失效")
+        return len(stale)
+
+    def clear(self, asset_type: Optional[AssetType] = None) -> None:
+        """清空全部条目或某一类型的条目"""
+        with self._lock:
+            if asset_type is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == AssetType(asset_type)]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_info(self) -> Dict:
+        """获取负缓存统计信息"""
+        now = datetime.now()
+        with self._lock:
+            by_type: Dict[str, int] = {}
+            for (asset_type, _), expires_at in self._entries.items():
+                if now < expires_at:
+                    by_type[asset_type.value] = by_type.get(asset_type.value, 0) + 1
+            return {
+                'total_entries': len(self._entries),
+                'by_type': by_type,
+                'max_entries': self.max_entries,
+                **self._stats,
+            }
@@ -0,0 +1,134 @@
+"""
+行情记录
+
+原来各数据服务每次查询都返回约 20 个键的字典，另外附带整行原始数据（raw_data）和
+校验结果字典，这些字典被缓存并复制到响应中。Quote 是字段固定、不可变的 slots 记录：
+- 只保存标准化字段，内存占用和创建开销都远小于字典
+- 原始行不复制：保存来源快照的弱引用和行位置，访问 raw_data 时才从快照中读取
+- 校验结果只保存位掩码，访问 validation 时才解码
+
+Quote 实现只读 Mapping 接口，quote['price']、quote.get('name')、MarketData(**quote)
+等原有的字典用法保持不变。
+"""
+from typing import Any, Dict, Iterator, Mapping, Optional
+from collections.abc import Mapping as MappingABC
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+import weakref
+
+from ..models.enums import AssetType
+from .market_snapshot import MarketSnapshot
+from .snapshot_validation import FATAL_FLAGS, decode_flags
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Quote(MappingABC):
+    """一只资产的标准化行情"""
+    code: str
+    name: Optional[str]
+    type: AssetType
+    price: float
+    timestamp: datetime = field(default_factory=datetime.now)
+
+    # 行情字段（没有实时行情的基金使用默认值，开高低收默认为价格）
+    change_amount: float = 0.0
+    change_percent: float = 0.0
+    volume: int = 0
+    turnover: float = 0.0
+    open_price: Optional[float] = None
+    high_price: Optional[float] = None
+    low_price: Optional[float] = None
+    prev_close: Optional[float] = None
+    turnover_rate: float = 0.0
+    circulating_market_cap: float = 0.0
+    total_market_cap: float = 0.0
+
+    # 基金字段
+    unit_net_value: Optional[float] = None
+    accumulated_net_value: Optional[float] = None
+    discount_rate: Optional[float] = None
+    price_date: Optional[datetime] = None  # 价格（净值）对应的日期
+    price_field: Optional[str] = None  # 价格来源字段，如 '2026-03-09-单位净值'
+    price_method: Optional[str] = None  # 价格提取方式
+    trading_date: Optional[str] = None
+    purchase_status: Optional[str] = None
+    redemption_status: Optional[str] = None
+    fee_rate: Any = None
+
+    # 校验位掩码及其所属快照类型（见 snapshot_validation）
+    validation_flags: int = 0
+    snapshot_type: Optional[str] = None
+
+    # 来源快照的弱引用和行位置，用于按需读取原始行（不参与 Mapping 接口）
+    source: Optional[weakref.ref] = field(default=None, repr=False)
+    row: Optional[int] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        for name in ('open_price', 'high_price', 'low_price', 'prev_close'):
+            if getattr(self, name) is None:
+                object.__setattr__(self, name, self.price)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: MarketSnapshot, code: str, **values) -> 'Quote':
+        """创建引用快照中某一行的行情（raw_data 按需从该行读取）"""
+        return cls(
+            code=code, snapshot_type=snapshot.snapshot_type,
+            source=weakref.ref(snapshot), row=snapshot.position(code), **values
+        )
+
+    @classmethod
+    def from_mapping(cls, data: Mapping, **overrides) -> 'Quote':
+        """从字典创建行情（忽略未知的键）"""
+        values = {key: data[key] for key in QUOTE_FIELDS if key in data}
+        values.update(overrides)
+        return cls(**values)
+
+    @property
+    def raw_data(self) -> Optional[Dict]:
+        """来源快照中的原始行；没有来源快照或快照已被释放时为 None"""
+        snapshot = self.source() if self.source is not None else None
+        if snapshot is None or self.row is None:
+            return None
+        return snapshot.get_record_at(self.row)
+
+    @property
+    def validation(self) -> Dict:
+        """解码后的校验结果（没有校验标记的数据来源视为通过）"""
+        if self.snapshot_type not in FATAL_FLAGS:
+            return {'valid': True, 'issues': [], 'warnings': [], 'reasons': [], 'flags': 0}
+        return decode_flags(self.validation_flags, self.snapshot_type)
+
+    def to_dict(self, include_raw: bool = False) -> Dict:
+        """转换为字典（可选包含原始行）"""
+        data = {key: getattr(self, key) for key in QUOTE_FIELDS}
+        data['validation'] = self.validation
+        if include_raw:
+            data['raw_data'] = self.raw_data
+        return data
+
+    # ---------- 只读 Mapping 接口 ----------
+
+    def __getitem__(self, key: str) -> Any:
+        if key in QUOTE_FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(QUOTE_FIELDS)
+
+    def __len__(self) -> int:
+        return len(QUOTE_FIELDS)
+
+    def __reduce__(self):
+        # 快照弱引用无法序列化，序列化时丢弃来源快照
+        values = {key: getattr(self, key) for key in QUOTE_FIELDS}
+        return (_restore_quote, (values,))
+
+
+def _restore_quote(values: Dict) -> Quote:
+    return Quote(**values)
+
+
+# Mapping 接口中的键：除来源快照引用以外的所有字段
+QUOTE_FIELDS = tuple(f.name for f in fields(Quote) if f.name not in ('source', 'row'))
+QUOTE_FIELD_SET = frozenset(QUOTE_FIELDS)
@@ -0,0 +1,356 @@
+"""
+上游请求限流（令牌桶）
+
+刷新接口允许任何用户触发 akshare 调用，batch_refresh_assets 一次就可能连续发出几十个请求；
+东方财富在突发流量下会限流甚至封禁。RateLimiter 在调用上游前按令牌桶发放许可：
+- 预算：每个接口一个令牌桶（每秒请求数 + 突发容量），'*' 为所有接口合计的全局桶；
+  一次调用需要同时从所属接口桶和全局桶各取一个令牌
+- 优先级通道：interactive（用户请求）> refresh（强制刷新）> background（后台刷新、预热）。
+  令牌不足时按优先级排队，高优先级的等待者先取令牌；非交互请求还必须在桶中
+  保留 background_reserve 个令牌，突发流量下交互请求总有余量
+- 最长等待：每个通道有等待上限，预计等待超过上限时立即拒绝（RateLimitExceeded），
+  不让请求在注定超时的队列里空等
+- 共享：传入 Redis 客户端时桶状态保存在 Redis 中（WATCH/MULTI 乐观事务更新），
+  所有进程和节点共用同一份预算；Redis 不可用时退化为进程内令牌桶。
+  Redis 往返不持有进程内的条件锁，排在后面的等待者和其他接口的调用不会被网络延迟阻塞
+
+调用方通过 upstream_priority() 声明当前线程（上下文）中上游调用的优先级，默认为 interactive。
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from .upstream import RateLimitExceeded
+
+try:
+    from redis.exceptions import WatchError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+    class WatchError(Exception):
+        """redis 未安装时的占位（此时不会使用 Redis 共享模式）"""
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """上游调用优先级（数值越小越优先）"""
+    INTERACTIVE = 0  # 用户请求
+    REFRESH = 1  # 用户触发的强制刷新
+    BACKGROUND = 2  # 软过期后的后台刷新、预热
+
+
+_current_priority: ContextVar[Priority] = ContextVar('upstream_priority', default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def upstream_priority(priority: Priority) -> Iterator[None]:
+    """在此上下文中发出的上游调用使用指定优先级"""
+    token = _current_priority.set(Priority(priority))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    """当前上下文中上游调用的优先级"""
+    return _current_priority.get()
+
+
+class TokenBucket:
+    """令牌桶：容量 capacity，每秒补充 rate 个令牌"""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = refill(self.tokens, self.updated, now, self.rate, self.capacity)
+        self.updated = now
+
+    def wait_time(self, needed: float) -> float:
+        """补充到 needed 个令牌还需要多少秒（调用前先 refill）"""
+        return wait_time(self.tokens, needed, self.rate)
+
+
+def refill(tokens: float, updated: float, now: float, rate: float, capacity: float) -> float:
+    """按经过的时间补充令牌（不超过容量）"""
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def wait_time(tokens: float, needed: float, rate: float) -> float:
+    if tokens >= needed:
+        return 0.0
+    return (needed - tokens) / rate if rate > 0 else float('inf')
+
+
+class RateLimiter:
+    """按接口和全局预算的令牌桶限流器（支持优先级排队和 Redis 共享）"""
+
+    GLOBAL = '*'  # 全局预算的键
+    KEY_PREFIX = "bafangce:ratelimit:"
+    WATCH_RETRIES = 5  # Redis 乐观事务冲突时的重试次数
+
+    DEFAULT_MAX_WAITS = {
+        Priority.INTERACTIVE: 5.0,
+        Priority.REFRESH: 15.0,
+        Priority.BACKGROUND: 60.0,
+    }
+
+    def __init__(
+        self,
+        budgets: Dict[str, Sequence[float]],
+        max_waits: Optional[Dict[Priority, float]] = None,
+        background_reserve: float = 1.0,
+        redis_client: Any = None,
+        retry_interval: int = 30,
+        clock=time.monotonic,
+    ):
+        """
+        Args:
+            budgets: 格式: {接口名或 '*': (每秒请求数, 突发容量)}；未列出的接口只受全局预算限制
+            max_waits: 各优先级的最长排队时间（秒）
+            background_reserve: 非交互请求取令牌后桶中至少保留的令牌数
+            redis_client: 兼容 redis-py 的客户端；传入时预算在所有使用同一 Redis 的进程间共享
+            retry_interval: Redis 出错后多少秒内改用进程内令牌桶
+            clock: 进程内令牌桶使用的单调时钟（Redis 共享模式使用墙上时间，各节点时钟需同步）
+        """
+        self.budgets = {name: (float(rate), float(capacity)) for name, (rate, capacity) in budgets.items()}
+        self.max_waits = {**self.DEFAULT_MAX_WAITS, **(max_waits or {})}
+        self.background_reserve = background_reserve
+        self.redis = redis_client
+        self.retry_interval = retry_interval
+        self._clock = clock
+
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waiters: List[Tuple[int, int, Tuple[str, ...]]] = []  # 堆: (优先级, 到达序号, 所需的桶)
+        self._sequence = itertools.count()
+        self._redis_unavailable_until: Optional[datetime] = None
+        self._stats: Dict[str, Counter] = {}  # 格式: {桶名: Counter}
+        self._wait_seconds: Dict[str, float] = {}
+
+    @property
+    def shared(self) -> bool:
+        """当前是否使用 Redis 共享预算"""
+        if self.redis is None:
+            return False
+        return self._redis_unavailable_until is None or datetime.now() >= self._redis_unavailable_until
+
+    def bucket_names(self, endpoint: str) -> Tuple[str, ...]:
+        """一次调用需要取令牌的桶（接口桶和全局桶中已配置的）"""
+        return tuple(name for name in (endpoint, self.GLOBAL) if name in self.budgets)
+
+    def acquire(self, endpoint: str, priority: Optional[Priority] = None, max_wait: Optional[float] = None,
+                timeout: Optional[float] = None) -> float:
+        """
+        为一次上游调用取令牌，令牌不足时按优先级排队等待
+
+        Args:
+            endpoint: 接口名
+            priority: 优先级，默认为当前上下文的优先级（见 upstream_priority）
+            max_wait: 最长等待时间（秒），默认按优先级取 max_waits
+            timeout: 调用方剩余的时间（秒，如上游调用的总截止时间），与 max_wait 取较小者
+
+        Returns:
+            实际等待的秒数
+
+        Raises:
+            RateLimitExceeded: 预计或实际等待超过 max_wait
+        """
+        names = self.bucket_names(endpoint)
+        if not names:
+            return 0.0
+
+        priority = Priority(current_priority() if priority is None else priority)
+        if max_wait is None:
+            max_wait = self.max_waits[priority]
+        if timeout is not None:
+            max_wait = max(0.0, min(max_wait, timeout))
+        reserve = 0.0 if priority == Priority.INTERACTIVE else self.background_reserve
+
+        started = self._clock()
+        deadline = started + max_wait
+        waiter = (int(priority), next(self._sequence), names)
+        blocked = False
+
+        with self._cond:
+            heapq.heappush(self._waiters, waiter)
+        try:
+            while True:
+                with self._cond:
+                    now = self._clock()
+                    if not self._is_next(waiter):
+                        wait = deadline - now  # 排在更高优先级的请求之后，等待它们取走令牌后被唤醒
+                        if wait <= 0:
+                            self._record(names, 'rejected', priority=priority)
+                            raise RateLimitExceeded(f"{endpoint} 排队超过 {max_wait:g} 秒仍未取得上游请求许可")
+                        blocked = True
+                        self._cond.wait(wait)
+                        continue
+
+                # 排在队首：Redis 往返期间不持有 _cond（其他等待者仍在队列中排在后面，不会抢先取令牌）
+                wait = self._try_take(names, reserve)
+
+                with self._cond:
+                    now = self._clock()
+                    if wait == 0:
+                        waited = now - started if blocked else 0.0
+                        self._record(names, 'acquired', waited)
+                        return waited
+                    if now + wait > deadline:
+                        self._record(names, 'rejected', priority=priority)
+                        raise RateLimitExceeded(
+                            f"{endpoint} 超出上游请求预算，预计需等待 {wait:.1f} 秒（上限 {max_wait:g} 秒）"
+                        )
+                    blocked = True
+                    self._cond.wait(min(wait, deadline - now))
+        finally:
+            with self._cond:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def _is_next(self, waiter: Tuple[int, int, Tuple[str, ...]]) -> bool:
+        """没有更优先（优先级更高或同优先级先到）且需要同一个桶的等待者（调用方持有 _cond）"""
+        names = set(waiter[2])
+        return not any(other < waiter and names.intersection(other[2]) for other in self._waiters)
+
+    def _try_take(self, names: Tuple[str, ...], reserve: float) -> float:
+        """
+        尝试从所有桶各取一个令牌（调用方不持有 _cond）
+
+        Returns:
+            0 表示已取得；否则为还需等待的秒数
+        """
+        if self.shared:
+            wait = self._try_take_redis(names, reserve)
+            if wait is not None:
+                return wait
+        with self._cond:
+            return self._try_take_local(names, reserve)
+
+    def _needed(self, name: str, reserve: float) -> float:
+        """取一个令牌前桶中至少要有的令牌数（保留量不超过容量减一）"""
+        capacity = self.budgets[name][1]
+        return 1.0 + min(reserve, max(0.0, capacity - 1.0))
+
+    def _try_take_local(self, names: Tuple[str, ...], reserve: float) -> float:
+        """进程内令牌桶（调用方持有 _cond）"""
+        now = self._clock()
+        buckets = []
+        for name in names:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                bucket = self._buckets[name] = TokenBucket(*self.budgets[name], now)
+            bucket.refill(now)
+            buckets.append(bucket)
+
+        wait = max(bucket.wait_time(self._needed(name, reserve)) for name, bucket in zip(names, buckets))
+        if wait > 0:
+            return wait
+        for bucket in buckets:
+            bucket.tokens -= 1
+        return 0.0
+
+    def _try_take_redis(self, names: Tuple[str, ...], reserve: float) -> Optional[float]:
+        """
+        在 Redis 中原子地从所有桶各取一个令牌（WATCH/MULTI，冲突时重试）
+
+        Returns:
+            0 表示已取得，正数为需等待的秒数；Redis 出错时返回 None（改用进程内令牌桶）
+        """
+        keys = [f"{self.KEY_PREFIX}{name}" for name in names]
+        try:
+            for _ in range(self.WATCH_RETRIES):
+                with self.redis.pipeline() as pipe:
+                    try:
+                        pipe.watch(*keys)
+                        now = time.time()
+                        states = []
+                        for name, raw in zip(names, pipe.mget(keys)):
+                            rate, capacity = self.budgets[name]
+                            if raw is None:
+                                tokens = capacity
+                            else:
+                                stored_tokens, updated = (float(part) for part in raw.decode().split(':'))
+                                tokens = refill(stored_tokens, updated, now, rate, capacity)
+                            states.append((name, tokens, rate, capacity))
+
+                        wait = max(wait_time(tokens, self._needed(name, reserve), rate)
+                                   for name, tokens, rate, _ in states)
+                        if wait > 0:
+                            pipe.unwatch()
+                            return wait
+
+                        pipe.multi()
+                        for key, (name, tokens, rate, capacity) in zip(keys, states):
+                            # 桶补满后状态与不存在相同，过期时间设为补满所需时间
+                            ttl_ms = max(1000, int((capacity - tokens + 1) / rate * 1000) + 1000)
+                            pipe.set(key, f"{tokens - 1}:{now}", px=ttl_ms)
+                        pipe.execute()
+                        self._redis_unavailable_until = None
+                        return 0.0
+                    except WatchError:
+                        continue
+            return 0.01  # 持续冲突：稍后再试
+
+        except Exception as e:
+            if self._redis_unavailable_until is None or datetime.now() >= self._redis_unavailable_until:
+                logger.warning(f"Redis 不可用，{self.retry_interval} 秒内使用进程内限流: {e}")
+            self._redis_unavailable_until = datetime.now() + timedelta(seconds=self.retry_interval)
+            return None
+
+    def _record(self, names: Tuple[str, ...], event: str, waited: float = 0.0,
+                priority: Optional[Priority] = None) -> None:
+        """记录统计（调用方持有 _cond）"""
+        for name in names:
+            stats = self._stats.setdefault(name, Counter())
+            stats[event] += 1
+            if priority is not None:
+                stats[f"{event}_{priority.name.lower()}"] += 1
+            if waited > 0:
+                stats['waited'] += 1
+                self._wait_seconds[name] = self._wait_seconds.get(name, 0.0) + waited
+
+    def get_info(self) -> Dict:
+        """获取预算配置、各桶的剩余令牌（进程内）和取令牌/等待/拒绝统计"""
+        with self._cond:
+            now = self._clock()
+            buckets = {}
+            for name, (rate, capacity) in self.budgets.items():
+                bucket = self._buckets.get(name)
+                if bucket is not None:
+                    bucket.refill(now)
+                stats = self._stats.get(name, Counter())
+                buckets[name] = {
+                    'rate': rate,
+                    'capacity': capacity,
+                    'local_tokens': round(bucket.tokens, 2) if bucket is not None else capacity,
+                    'acquired': stats['acquired'],
+                    'waited': stats['waited'],
+                    'wait_seconds': round(self._wait_seconds.get(name, 0.0), 3),
+                    'rejected': {
+                        priority.name.lower(): stats[f"rejected_{priority.name.lower()}"] for priority in Priority
+                    },
+                    'queued': sum(1 for waiter in self._waiters if name in waiter[2]),
+                }
+
+            return {
+                'shared': self.shared,
+                'background_reserve': self.background_reserve,
+                'max_waits': {priority.name.lower(): wait for priority, wait in self.max_waits.items()},
+                'buckets': buckets,
+            }
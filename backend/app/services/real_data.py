@@ -7,14 +7,19 @@
 - 实现交易时间判断和缓存机制
 - 提供强制刷新接口
 """
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
 from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+import heapq
 import logging
-import re
+import sys
+import threading
 
 try:
     import pandas as pd
+    from .market_snapshot import MarketSnapshot
     PANDAS_AVAILABLE = True
 except ImportError:
     PANDAS_AVAILABLE = False
@@ -27,6 +32,20 @@ except ImportError:
 
 from ..models.enums import AssetType
 from ..core.config import settings
+from .single_flight import SingleFlight
+from .trading_calendar import trading_calendar
+from .code_directory import CodeDirectory, CodeEntry
+from .snapshot_store import SnapshotStore
+from .redis_cache import RedisMarketCache
+from .negative_cache import NegativeCache
+from .nav_columns import (
+    LATEST_ACCUMULATED_NAV, LATEST_NAV, LATEST_UNIT_NAV,
+    add_nav_columns, ensure_nav_columns, read_nav,
+)
+from .quote import Quote
+from .snapshot_validation import VALIDATION_COLUMN, add_validation_column, quality_report, validate_record
+from .upstream import UpstreamClient
+from .rate_limiter import Priority, RateLimiter, upstream_priority
 
 logger = logging.getLogger(__name__)
 
@@ -35,30 +54,105 @@ class MarketDataService(ABC):
     """市场数据服务接口"""
 
     @abstractmethod
-    def get_stock_info(self, code: str) -> Optional[Dict]:
+    def get_stock_info(self, code: str) -> Optional[Quote]:
         """获取股票信息"""
         pass
 
     @abstractmethod
-    def get_lof_fund_info(self, code: str) -> Optional[Dict]:
+    def get_lof_fund_info(self, code: str) -> Optional[Quote]:
         """获取LOF基金信息"""
         pass
 
     @abstractmethod
-    def get_etf_fund_info(self, code: str) -> Optional[Dict]:
+    def get_etf_fund_info(self, code: str) -> Optional[Quote]:
         """获取ETF基金信息"""
         pass
 
     @abstractmethod
-    def get_open_fund_info(self, code: str) -> Optional[Dict]:
+    def get_open_fund_info(self, code: str) -> Optional[Quote]:
         """获取开放式基金信息"""
         pass
 
     @abstractmethod
-    def get_market_data(self, code: str, asset_type: AssetType) -> Optional[Dict]:
+    def get_market_data(self, code: str, asset_type: AssetType) -> Optional[Quote]:
         """获取市场数据"""
         pass
 
+    def get_market_data_many(self, requests: List[Tuple[str, AssetType]]) -> Dict:
+        """
+        批量获取市场数据（默认实现：逐个调用 get_market_data）
+
+        Args:
+            requests: [(代码, 资产类型), ...]
+
+        Returns:
+            {'results': {code: 市场数据}, 'errors': {code: 错误信息}}
+
+        Raises:
+            ValueError: 同一代码以多个资产类型请求
+        """
+        return self._collect_each(self._unique_requests(requests), self.get_market_data, "无法获取市场数据")
+
+    def refresh_market_data(self, code: str, asset_type: AssetType) -> Optional[Quote]:
+        """
+        刷新并返回资产的最新市场数据（默认实现：强制刷新后再获取）
+
+        Returns:
+            刷新后的市场数据，刷新失败时返回 None
+        """
+        if not self.force_refresh_asset(code, asset_type):
+            return None
+        return self.get_market_data(code, asset_type)
+
+    def refresh_market_data_many(self, requests: List[Tuple[str, AssetType]]) -> Dict:
+        """
+        批量刷新并返回市场数据（默认实现：逐个调用 refresh_market_data）
+
+        Returns:
+            {'results': {code: 市场数据}, 'errors': {code: 错误信息}}
+
+        Raises:
+            ValueError: 同一代码以多个资产类型请求
+        """
+        return self._collect_each(self._unique_requests(requests), self.refresh_market_data, "刷新市场数据失败")
+
+    @staticmethod
+    def _collect_each(requests: List[Tuple[str, AssetType]], fetch: Callable[[str, AssetType], Optional[Quote]],
+                      failure_message: str) -> Dict:
+        """逐个调用 fetch，汇总为批量结果格式"""
+        results, errors = {}, {}
+        for code, asset_type in requests:
+            try:
+                market_data = fetch(code, asset_type)
+            except Exception as e:
+                errors[code] = str(e)
+                continue
+
+            if market_data:
+                results[code] = market_data
+            else:
+                errors[code] = failure_message
+
+        return {'results': results, 'errors': errors}
+
+    @staticmethod
+    def _unique_requests(requests: List[Tuple[str, AssetType]]) -> List[Tuple[str, AssetType]]:
+        """
+        去掉重复的批量请求项
+
+        批量结果按代码索引，同一代码以不同资产类型请求时结果会互相覆盖，因此直接拒绝。
+
+        Raises:
+            ValueError: 同一代码以多个资产类型请求
+        """
+        unique: Dict[str, AssetType] = {}
+        for code, asset_type in requests:
+            asset_type = AssetType(asset_type)
+            previous = unique.setdefault(code, asset_type)
+            if previous != asset_type:
+                raise ValueError(f"代码 {code} 同时以 {previous.value} 和 {asset_type.value} 两种资产类型请求")
+        return list(unique.items())
+
     @abstractmethod
     def get_all_lof_funds(self) -> List[Dict]:
         """获取所有LOF基金"""
@@ -74,8 +168,58 @@ class MarketDataService(ABC):
         """获取所有开放式基金"""
         pass
 
+    def list_funds(self, asset_type: AssetType, keyword: Optional[str] = None,
+                   page: int = 1, page_size: int = 50) -> Dict:
+        """
+        分页获取基金列表（默认实现：在 get_all_* 返回的完整列表上筛选）
+
+        Args:
+            asset_type: 基金类型（LOF、ETF、开放式基金）
+            keyword: 按代码前缀或名称（不区分大小写）筛选
+            page: 页码，从 1 开始
+            page_size: 每页条数
+
+        Returns:
+            {'items': 当前页, 'total': 总数, 'page', 'page_size', 'total_pages'}
+        """
+        funds = self._get_all_funds(asset_type)
+        if keyword:
+            keyword_lower = keyword.lower()
+            funds = [
+                fund for fund in funds
+                if str(fund.get('code') or '').startswith(keyword)
+                or keyword_lower in str(fund.get('name') or '').lower()
+            ]
+
+        start, end, total_pages = self._page_bounds(len(funds), page, page_size)
+        return {
+            'items': funds[start:end],
+            'total': len(funds),
+            'page': page,
+            'page_size': page_size,
+            'total_pages': total_pages,
+        }
+
+    def _get_all_funds(self, asset_type: AssetType) -> List[Dict]:
+        """按基金类型获取完整列表"""
+        getters = {
+            AssetType.LOF_FUND: self.get_all_lof_funds,
+            AssetType.ETF_FUND: self.get_all_etf_funds,
+            AssetType.OPEN_FUND: self.get_all_open_funds,
+        }
+        asset_type = AssetType(asset_type)
+        if asset_type not in getters:
+            raise ValueError(f"资产类型 {asset_type.value} 不支持基金列表")
+        return getters[asset_type]()
+
+    @staticmethod
+    def _page_bounds(total: int, page: int, page_size: int) -> Tuple[int, int, int]:
+        """计算分页的起止位置和总页数"""
+        start = (page - 1) * page_size
+        return start, start + page_size, (total + page_size - 1) // page_size
+
     @abstractmethod
-    def get_asset_info(self, code: str) -> Optional[Dict]:
+    def get_asset_info(self, code: str) -> Optional[Quote]:
         """根据代码获取资产信息（自动识别类型）"""
         pass
 
@@ -96,18 +240,18 @@ class MarketDataService(ABC):
 
 
 class TradingTimeHelper:
-    """交易时间辅助类"""
+    """交易时间辅助类（交易日判断基于内置的沪深交易所日历）"""
 
-    @staticmethod
-    def is_trading_day(current_time: datetime) -> bool:
-        """判断是否是交易日（简化实现）"""
-        # 1. 周末不交易
-        if current_time.weekday() >= 5:  # 周六周日
-            return False
+    # A股连续竞价时段（上午、下午）
+    TRADING_SESSIONS = [
+        (time(9, 30), time(11, 30)),
+        (time(13, 0), time(15, 0)),
+    ]
 
-        # 2. 简化假设工作日都是交易日
-        # TODO: 可以集成节假日API判断
-        return True
+    @staticmethod
+    def is_trading_day(current_time: date) -> bool:
+        """判断是否是交易日（排除周末和交易所节假日休市）"""
+        return trading_calendar.is_trading_day(current_time)
 
     @staticmethod
     def is_trading_hours(current_time: datetime) -> bool:
@@ -130,23 +274,18 @@ class TradingTimeHelper:
 
     @staticmethod
     def get_current_trading_date() -> str:
-        """获取当前交易日期"""
-        from datetime import datetime as dt
-        current = dt.now()
-
-        # 简化逻辑：周末和节假日不是交易日
-        if current.weekday() >= 5:  # 周六周日
-            # 回到上一个工作日
-            return (current - timedelta(days=current.weekday() - 5)).strftime('%Y-%m-%d')
-        else:
-            return current.strftime('%Y-%m-%d')
+        """获取当前交易日期（非交易日返回最近一个交易日）"""
+        return trading_calendar.latest_trading_day(datetime.now()).strftime('%Y-%m-%d')
+
+    @staticmethod
+    def get_next_trading_day(current_date: date) -> date:
+        """获取指定日期之后的下一个交易日"""
+        return trading_calendar.next_trading_day(current_date)
 
     @staticmethod
     def get_previous_trading_date(current_date: str, days_back: int = 1) -> str:
-        """获取上一个交易日"""
-        from datetime import datetime as dt
-        date = dt.strptime(current_date, '%Y-%m-%d')
-        return (date - timedelta(days=days_back)).strftime('%Y-%m-%d')
+        """获取往前第 days_back 个交易日"""
+        return trading_calendar.shift_trading_days(current_date, -days_back).strftime('%Y-%m-%d')
 
     @staticmethod
     def should_fetch_latest_data(current_time: datetime) -> bool:
@@ -169,16 +308,165 @@ class TradingTimeHelper:
             return date_str
 
 
-class AssetCache:
-    """资产缓存服务"""
+class CacheExpiryPolicy:
+    """
+    缓存过期策略（基于交易日历）
+
+    固定TTL会在非交易时段和周末反复下载不会变化的数据。本策略让每类数据
+    一直有效到它下一次可能变化的时刻：
+    - 盘中行情（LOF、股票）：交易时段内按刷新间隔过期；午休和收盘后有效到下一个交易时段开盘
+    - 每日净值（开放式基金、ETF）：有效到下一次净值公布窗口开始；公布窗口内按刷新间隔过期
+    """
+
+    INTRADAY = 'intraday'  # 盘中实时行情
+    DAILY_NAV = 'daily_nav'  # 每日公布的净值
+
+    # 数据类型 → 更新方式
+    DATA_KINDS = {
+        'lof': INTRADAY,
+        'stock': INTRADAY,
+        'stock_spot': INTRADAY,  # 全A股实时行情快照
+        'open_fund': DAILY_NAV,
+        'etf': DAILY_NAV,
+        'listing': DAILY_NAV,  # 代码列表（新上市、退市），按交易日变化
+    }
+
+    def __init__(self, trading_helper: Optional['TradingTimeHelper'] = None):
+        self.trading_helper = trading_helper or TradingTimeHelper()
+
+        # 盘中行情刷新间隔（秒）
+        self.intraday_intervals = {
+            'lof': 1800,  # 30分钟
+            'stock': 60,  # 1分钟
+            'stock_spot': 60,  # 1分钟
+        }
+        self.session_close_grace = 300  # 收盘后5分钟内仍允许再取一次，拿到收盘价
+
+        # 净值公布窗口（交易日当晚陆续公布）
+        self.nav_publish_start = time(19, 0)
+        self.nav_publish_end = time(23, 0)
+        self.nav_publish_interval = 7200  # 公布窗口内2小时刷新一次
+
+        self.min_ttl = 60  # 最短TTL（秒）
+
+    def get_expiry(self, data_kind: str, current_time: Optional[datetime] = None) -> datetime:
+        """计算数据的过期时间（即下一次可能变化的时刻）"""
+        current_time = current_time or datetime.now()
+        update_mode = self.DATA_KINDS.get(data_kind)
+
+        if update_mode == self.INTRADAY:
+            return self._next_intraday_expiry(current_time, self.intraday_intervals[data_kind])
+        if update_mode == self.DAILY_NAV:
+            return self._next_nav_expiry(current_time)
+
+        raise ValueError(f"未知的数据类型: {data_kind}")
 
-    def __init__(self):
-        self.cache = {}  # 格式: {code: {data, timestamp, expiry}}
+    def get_ttl(self, data_kind: str, current_time: Optional[datetime] = None) -> int:
+        """计算数据的缓存TTL（秒）"""
+        current_time = current_time or datetime.now()
+        expiry = self.get_expiry(data_kind, current_time)
+        return max(self.min_ttl, int((expiry - current_time).total_seconds()))
+
+    def _next_intraday_expiry(self, current_time: datetime, interval: int) -> datetime:
+        """盘中行情：交易时段内按间隔刷新，否则有效到下一个时段开盘"""
+        if self.trading_helper.is_trading_day(current_time):
+            for session_open, session_close in TradingTimeHelper.TRADING_SESSIONS:
+                open_at = datetime.combine(current_time.date(), session_open)
+                close_at = datetime.combine(current_time.date(), session_close) + timedelta(seconds=self.session_close_grace)
+
+                if current_time < open_at:
+                    return open_at
+                if current_time < close_at:
+                    return min(current_time + timedelta(seconds=interval), close_at)
+
+        next_open = TradingTimeHelper.TRADING_SESSIONS[0][0]
+        return datetime.combine(self.trading_helper.get_next_trading_day(current_time.date()), next_open)
+
+    def _next_nav_expiry(self, current_time: datetime) -> datetime:
+        """每日净值：公布窗口内按间隔刷新，否则有效到下一个交易日的公布窗口开始"""
+        if self.trading_helper.is_trading_day(current_time):
+            publish_start = datetime.combine(current_time.date(), self.nav_publish_start)
+            publish_end = datetime.combine(current_time.date(), self.nav_publish_end)
+
+            if current_time < publish_start:
+                return publish_start
+            if current_time < publish_end:
+                return min(current_time + timedelta(seconds=self.nav_publish_interval), publish_end)
+
+        next_trading_day = self.trading_helper.get_next_trading_day(current_time.date())
+        return datetime.combine(next_trading_day, self.nav_publish_start)
+
+
+class AssetCache:
+    """
+    资产缓存服务（带请求合并、后台刷新和容量限制）
+
+    每个条目有软过期（expiry）和硬过期（hard_expiry）两个时间点：
+    - 软过期之前：直接返回缓存数据
+    - 软过期之后、硬过期之前：立即返回旧数据，同时在后台线程刷新（stale-while-revalidate）
+    - 硬过期之后，或后台刷新失败：调用方阻塞等待重新加载
+
+    容量限制：每个条目写入时估算占用的内存（快照按 DataFrame 深度内存，其他数据按对象大小），
+    总量超过 max_bytes 或条目数超过 max_entries 时先淘汰已硬过期的条目，再按最近最少使用（LRU）淘汰。
+    已硬过期的条目从按硬过期时间排序的堆中取出，淘汰一个条目为 O(log n)，不扫描整个缓存。
+    内存映射快照的列数据在多进程间共享，不计入预算（单独统计）。
+    后台清理线程每 sweep_interval 秒删除一次已硬过期的条目。
+    """
+
+    def __init__(self, max_bytes: int = 0, max_entries: int = 0, sweep_interval: int = 0):
+        """
+        Args:
+            max_bytes: 缓存内存预算（字节），0 表示不限制
+            max_entries: 最大条目数，0 表示不限制
+            sweep_interval: 后台清理已硬过期条目的间隔（秒），0 表示不启用
+        """
+        self.cache = OrderedDict()  # 格式: {code: {data, timestamp, expiry, hard_expiry, refresh_failed, size, mapped_size}}，按最近访问排序
         self.default_ttl = 3600  # 默认1小时
+        self.single_flight = SingleFlight()  # 合并同一键的并发加载
+
+        # 容量限制
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.RLock()  # 保护缓存字典、LRU顺序和内存统计
+        self._total_bytes = 0
+        self._mapped_bytes = 0
+        # 硬过期时间堆: (hard_expiry, code)；条目被替换或删除后堆中的旧项在取出时丢弃（硬过期时间不匹配）
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        self._eviction_stats = {
+            'expired': 0,  # 因硬过期被淘汰的条目数
+            'capacity': 0,  # 因超出容量被淘汰的条目数（LRU）
+        }
+
+        # 后台清理
+        self.sweep_interval = sweep_interval
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
+        self._last_sweep: Optional[datetime] = None
+
+        # 后台刷新
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._refresh_workers = 2
+        self._refreshing = set()  # 正在后台刷新的键
+        self._refresh_lock = threading.Lock()
+        self._refresh_stats = {
+            'stale_hits': 0,  # 返回旧数据的次数
+            'background_refreshes': 0,  # 后台刷新成功次数
+            'refresh_failures': 0,  # 后台刷新失败次数
+            'forced_refreshes': 0,  # 强制刷新实际重新加载的次数
+            'throttled_refreshes': 0,  # 因未达到最小刷新间隔而直接返回现有数据的强制刷新次数
+        }
+
+    def _touch(self, code: str) -> Optional[Dict]:
+        """获取条目并标记为最近使用"""
+        with self._lock:
+            entry = self.cache.get(code)
+            if entry is not None:
+                self.cache.move_to_end(code)
+            return entry
 
     def get(self, code: str) -> Optional[Dict]:
-        """获取缓存数据"""
-        entry = self.cache.get(code)
+        """获取缓存数据（软过期后视为未命中）"""
+        entry = self._touch(code)
         if not entry:
             return None
 
@@ -188,97 +476,756 @@ class AssetCache:
 
         return entry.get('data')
 
-    def set(self, code: str, data: Dict, ttl: int = None) -> None:
-        """设置缓存数据"""
+    def peek(self, code: str) -> Any:
+        """读取条目数据而不检查过期、不改变 LRU 顺序（如与新数据比较时读取上一版本）"""
+        with self._lock:
+            entry = self.cache.get(code)
+            return entry.get('data') if entry else None
+
+    def get_stale(self, code: str, allow_failed_refresh: bool = False) -> Optional[Dict]:
+        """
+        获取已软过期但未硬过期的旧数据
+
+        Args:
+            allow_failed_refresh: 是否返回后台刷新已失败的条目
+        """
+        entry = self._touch(code)
+        if not entry:
+            return None
+
+        if datetime.now() > entry.get('hard_expiry', entry.get('expiry', datetime.min)):
+            return None
+
+        if entry.get('refresh_failed') and not allow_failed_refresh:
+            return None
+
+        return entry.get('data')
+
+    def set(self, code: str, data: Dict, ttl: int = None, stale_ttl: int = 0,
+            timestamp: Optional[datetime] = None) -> None:
+        """
+        设置缓存数据
+
+        写入后超出容量限制时淘汰其他条目（刚写入的条目不会被淘汰）。
+
+        Args:
+            ttl: 软过期时间（秒）
+            stale_ttl: 软过期后仍可返回旧数据的时间（秒），0 表示不启用后台刷新
+            timestamp: 数据的获取时间，过期时间从该时间起算；默认为当前时间（从磁盘恢复的数据使用原获取时间）
+        """
         ttl = ttl or self.default_ttl
-        expiry = datetime.now() + timedelta(seconds=ttl)
+        written_at = timestamp or datetime.now()
+        expiry = written_at + timedelta(seconds=ttl)
+        size, mapped_size = self.estimate_size(data)
+
+        hard_expiry = expiry + timedelta(seconds=stale_ttl or 0)
+
+        with self._lock:
+            self._remove(code)
+            self.cache[code] = {
+                'data': data,
+                'timestamp': written_at,
+                'expiry': expiry,
+                'hard_expiry': hard_expiry,
+                'refresh_failed': False,
+                'size': size,
+                'mapped_size': mapped_size,
+            }
+            self._total_bytes += size
+            self._mapped_bytes += mapped_size
+            self._push_expiry(hard_expiry, code)
+            self._enforce_limits(keep=code)
 
-        self.cache[code] = {
-            'data': data,
-            'timestamp': datetime.now(),
-            'expiry': expiry
-        }
+        self._ensure_sweeper()
+
+    @staticmethod
+    def estimate_size(data: Any) -> Tuple[int, int]:
+        """
+        估算缓存数据占用的内存
+
+        Returns:
+            (私有内存字节数, 内存映射字节数)
+        """
+        if PANDAS_AVAILABLE and isinstance(data, MarketSnapshot):
+            usage = data.memory_usage()
+            return usage['private'], usage['mapped']
+        return _deep_sizeof(data), 0
+
+    def _remove(self, code: str) -> Optional[Dict]:
+        """删除条目并更新内存统计（调用方持有 _lock）"""
+        entry = self.cache.pop(code, None)
+        if entry is not None:
+            self._total_bytes -= entry['size']
+            self._mapped_bytes -= entry['mapped_size']
+        return entry
+
+    def _over_limits(self) -> bool:
+        return ((self.max_bytes and self._total_bytes > self.max_bytes)
+                or (self.max_entries and len(self.cache) > self.max_entries))
+
+    def _push_expiry(self, hard_expiry: datetime, code: str) -> None:
+        """登记条目的硬过期时间（调用方持有 _lock）"""
+        heapq.heappush(self._expiry_heap, (hard_expiry, code))
+        # 频繁替换的长期条目会在堆中留下大量旧项：超过条目数两倍时重建
+        if len(self._expiry_heap) > 2 * len(self.cache) + 64:
+            self._expiry_heap = [(entry['hard_expiry'], key) for key, entry in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _pop_expired(self, now: datetime) -> Optional[str]:
+        """
+        删除最早硬过期的一个已过期条目（调用方持有 _lock）
+
+        Returns:
+            删除的键；没有已过期的条目时返回 None
+        """
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            hard_expiry, code = heapq.heappop(heap)
+            entry = self.cache.get(code)
+            if entry is None or entry['hard_expiry'] != hard_expiry:
+                continue  # 条目已被替换或删除
+            self._remove(code)
+            self._eviction_stats['expired'] += 1
+            return code
+        return None
+
+    def _enforce_limits(self, keep: Optional[str] = None) -> None:
+        """超出容量时先淘汰已硬过期的条目，再按 LRU 顺序淘汰（调用方持有 _lock）"""
+        if not self._over_limits():
+            return
+
+        now = datetime.now()
+        while self._over_limits() and self._pop_expired(now) is not None:
+            pass
+
+        while self._over_limits():
+            # 最久未使用的条目在最前面，跳过刚写入的条目（通常在最后）
+            code = next((key for key in self.cache if key != keep), None)
+            if code is None:
+                break
+            entry = self._remove(code)
+            self._eviction_stats['capacity'] += 1
+            logger.info(f"缓存超出容量，淘汰最久未使用的条目 {code}（{entry['size'] / 1024:.1f} KB）")
+
+        if self._over_limits():
+            logger.warning(
+                f"缓存条目 {keep} 单独已超出内存预算（{self._total_bytes / 1024 / 1024:.1f} MB / "
+                f"{self.max_bytes / 1024 / 1024:.1f} MB）"
+            )
+
+    def _purge_expired_locked(self, now: datetime) -> int:
+        """删除所有已硬过期的条目（调用方持有 _lock）"""
+        removed = 0
+        while self._pop_expired(now) is not None:
+            removed += 1
+        return removed
+
+    def purge_expired(self) -> int:
+        """
+        删除所有已硬过期的条目
+
+        Returns:
+            删除的条目数
+        """
+        with self._lock:
+            removed = self._purge_expired_locked(datetime.now())
+            self._last_sweep = datetime.now()
+        if removed:
+            logger.info(f"清理已过期缓存条目 {removed} 个")
+        return removed
+
+    def _ensure_sweeper(self) -> None:
+        """首次写入时启动后台清理线程"""
+        if not self.sweep_interval or self._sweeper is not None:
+            return
+
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="asset-cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._sweeper_stop.wait(self.sweep_interval):
+            try:
+                self.purge_expired()
+            except Exception as e:
+                logger.error(f"清理过期缓存失败: {e}")
+
+    def stop_sweeper(self) -> None:
+        """停止后台清理线程"""
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+        self._sweeper_stop.clear()
+
+    def get_or_load(self, code: str, loader: Callable[[], Any], ttl: int = None, stale_ttl: int = 0) -> Any:
+        """
+        获取缓存数据，未命中时加载并写入缓存
+
+        同一键的并发未命中只会执行一次 loader，其余调用方等待并复用结果。
+        软过期后的旧数据会立即返回并触发后台刷新。
+        loader 返回 None 表示加载失败，不写入缓存。
+        """
+        data = self.get(code)
+        if data is not None:
+            return data
+
+        stale_data = self.get_stale(code)
+        if stale_data is not None:
+            self._schedule_refresh(code, loader, ttl, stale_ttl)
+            return stale_data
+
+        data = self.single_flight.do(code, lambda: self._load_and_set(code, loader, ttl, stale_ttl))
+        if data is None:
+            # 阻塞加载也失败时，退回到硬过期前的旧数据
+            return self.get_stale(code, allow_failed_refresh=True)
+        return data
+
+    async def get_or_load_async(self, code: str, loader: Callable[[], Any], ttl: int = None,
+                                stale_ttl: int = 0, executor: Optional[Executor] = None) -> Any:
+        """
+        get_or_load 的异步版本，供 asyncio 调用方使用
+
+        阻塞的 loader 在线程池中执行；与同步调用方共享同一个合并表，
+        因此线程池中的同步请求和协程请求也会互相合并。
+        """
+        data = self.get(code)
+        if data is not None:
+            return data
+
+        stale_data = self.get_stale(code)
+        if stale_data is not None:
+            self._schedule_refresh(code, loader, ttl, stale_ttl)
+            return stale_data
+
+        data = await self.single_flight.do_async(
+            code, lambda: self._load_and_set(code, loader, ttl, stale_ttl), executor
+        )
+        if data is None:
+            return self.get_stale(code, allow_failed_refresh=True)
+        return data
+
+    def _load_and_set(self, code: str, loader: Callable[[], Any], ttl: Optional[int], stale_ttl: int = 0) -> Any:
+        """由 leader 执行：再次检查缓存（等待期间可能已被写入），然后加载"""
+        data = self.get(code)
+        if data is not None:
+            return data
+
+        data = loader()
+        if data is not None:
+            self.set(code, data, ttl, stale_ttl)
+        return data
+
+    def refresh(self, code: str, loader: Callable[[], Any], ttl: int = None, stale_ttl: int = 0,
+                min_age: int = 0) -> Any:
+        """
+        强制重新加载缓存条目
+
+        新数据加载成功后直接替换原条目（而不是先删除），刷新期间其他调用方仍可读到旧数据。
+        条目写入不足 min_age 秒时直接返回现有数据，避免频繁的刷新请求冲刷共享缓存；
+        同一键的并发刷新和普通加载合并为一次 loader 调用。
+
+        Returns:
+            刷新后的数据；加载失败时保留原条目并返回 None
+        """
+        return self.single_flight.do(code, lambda: self._reload_and_set(code, loader, ttl, stale_ttl, min_age))
+
+    def _reload_and_set(self, code: str, loader: Callable[[], Any], ttl: Optional[int], stale_ttl: int,
+                        min_age: int) -> Any:
+        """由 leader 执行：条目足够新时跳过，否则重新加载"""
+        entry = self.cache.get(code)
+        if entry and datetime.now() - entry['timestamp'] < timedelta(seconds=min_age):
+            with self._refresh_lock:
+                self._refresh_stats['throttled_refreshes'] += 1
+            logger.info(f"缓存 {code} 写入不足 {min_age} 秒，跳过强制刷新")
+            return entry['data']
+
+        with self._refresh_lock:
+            self._refresh_stats['forced_refreshes'] += 1
+
+        data = loader()
+        if data is not None:
+            self.set(code, data, ttl, stale_ttl)
+        return data
+
+    def _schedule_refresh(self, code: str, loader: Callable[[], Any], ttl: Optional[int], stale_ttl: int) -> None:
+        """提交后台刷新任务（同一键同时只有一个刷新任务）"""
+        with self._refresh_lock:
+            self._refresh_stats['stale_hits'] += 1
+            if code in self._refreshing:
+                return
+            self._refreshing.add(code)
+
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=self._refresh_workers, thread_name_prefix="asset-cache-refresh"
+                )
+
+        logger.info(f"缓存 {code} 已软过期，返回旧数据并在后台刷新")
+        self._refresh_executor.submit(self._background_refresh, code, loader, ttl, stale_ttl)
+
+    def _background_refresh(self, code: str, loader: Callable[[], Any], ttl: Optional[int], stale_ttl: int) -> None:
+        """后台刷新：失败时标记条目，之后的调用方将阻塞加载而不是继续使用旧数据"""
+        try:
+            # 后台刷新的上游调用排在用户请求之后（见 rate_limiter）
+            with upstream_priority(Priority.BACKGROUND):
+                data = self.single_flight.do(code, lambda: self._load_and_set(code, loader, ttl, stale_ttl))
+            succeeded = data is not None
+        except Exception as e:
+            logger.error(f"后台刷新缓存 {code} 失败: {e}")
+            succeeded = False
+
+        with self._refresh_lock:
+            self._refreshing.discard(code)
+            if succeeded:
+                self._refresh_stats['background_refreshes'] += 1
+            else:
+                self._refresh_stats['refresh_failures'] += 1
+
+        if not succeeded:
+            entry = self.cache.get(code)
+            if entry:
+                entry['refresh_failed'] = True
 
     def delete(self, code: str) -> bool:
         """删除缓存数据"""
-        if code in self.cache:
-            del self.cache[code]
-            return True
-        return False
+        with self._lock:
+            return self._remove(code) is not None
 
     def clear(self) -> None:
         """清空所有缓存"""
-        self.cache.clear()
+        with self._lock:
+            self.cache.clear()
+            self._expiry_heap.clear()
+            self._total_bytes = 0
+            self._mapped_bytes = 0
+
+    @staticmethod
+    def _entry_state(entry: Dict, now: datetime) -> str:
+        if now <= entry['expiry']:
+            return 'valid'
+        if now <= entry['hard_expiry']:
+            return 'stale'
+        return 'expired'
+
+    def get_entries(self) -> List[Dict]:
+        """
+        获取所有条目的元数据（不含数据本身），按最近使用从新到旧排序
+
+        字段与 CacheMetadata 表一致：数据类型、键、写入时间、过期时间、数据大小
+        """
+        now = datetime.now()
+        with self._lock:
+            items = list(self.cache.items())
+
+        entries = []
+        for code, entry in reversed(items):
+            data = entry['data']
+            entries.append({
+                'code': code,
+                'data_type': getattr(data, 'snapshot_type', None) or type(data).__name__,
+                'cached_at': entry['timestamp'],
+                'expires_at': entry['expiry'],
+                'hard_expires_at': entry['hard_expiry'],
+                'state': self._entry_state(entry, now),
+                'data_size': entry['size'],
+                'mapped_size': entry['mapped_size'],
+            })
+        return entries
 
     def get_info(self) -> Dict:
         """获取缓存统计信息"""
-        total = len(self.cache)
-        valid = sum(1 for entry in self.cache.values()
-                   if datetime.now() <= entry.get('expiry', datetime.min))
+        now = datetime.now()
+        with self._lock:
+            states = Counter(self._entry_state(entry, now) for entry in self.cache.values())
+            total = len(self.cache)
+            memory = {
+                'size_bytes': self._total_bytes,
+                'mapped_bytes': self._mapped_bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'evictions': dict(self._eviction_stats),
+            }
 
-        expired = total - valid
+        with self._refresh_lock:
+            refresh_stats = dict(self._refresh_stats)
+            refresh_stats['refreshing'] = len(self._refreshing)
 
         return {
             'total_entries': total,
-            'valid_entries': valid,
-            'expired_entries': expired
+            'valid_entries': states['valid'],
+            'stale_entries': states['stale'],
+            'expired_entries': states['expired'],
+            'memory': memory,
+            'sweeper': {
+                'interval': self.sweep_interval,
+                'running': self._sweeper is not None,
+                'last_sweep': self._last_sweep.isoformat() if self._last_sweep else None,
+            },
+            'single_flight': self.single_flight.get_stats(),
+            'background_refresh': refresh_stats
         }
 
 
+def _deep_sizeof(data: Any, seen: Optional[set] = None) -> int:
+    """递归估算容器对象（字典、列表等）及其内容占用的内存（同一对象只计一次）"""
+    if seen is None:
+        seen = set()
+    if id(data) in seen:
+        return 0
+    seen.add(id(data))
+
+    size = sys.getsizeof(data)
+    if isinstance(data, dict):
+        size += sum(_deep_sizeof(key, seen) + _deep_sizeof(value, seen) for key, value in data.items())
+    elif isinstance(data, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in data)
+    elif isinstance(data, Quote):
+        size += sum(_deep_sizeof(value, seen) for value in data.values())
+    return size
+
+
 class RealMarketDataService(MarketDataService):
     """真实市场数据服务实现 - 阶段1"""
 
-    def __init__(self):
-        self.cache = AssetCache()
+    # 有全量快照的资产类型 → 过期策略中的数据类型
+    SNAPSHOT_DATA_KINDS = {
+        AssetType.LOF_FUND: 'lof',
+        AssetType.OPEN_FUND: 'open_fund',
+        AssetType.ETF_FUND: 'etf',
+        AssetType.STOCK: 'stock_spot',  # 全A股实时行情，批量查询股票时按需获取
+    }
+
+    # 各全量快照对应的上游接口（熔断和调用统计按接口区分）
+    SNAPSHOT_ENDPOINTS = {
+        AssetType.LOF_FUND: 'fund_lof_spot_em',
+        AssetType.OPEN_FUND: 'fund_open_fund_daily_em',
+        AssetType.ETF_FUND: 'fund_etf_fund_daily_em',
+        AssetType.STOCK: 'stock_zh_a_spot_em',
+    }
+    STOCK_INFO_ENDPOINT = 'stock_individual_info_em'  # 单只股票信息
+
+    # 按需获取的快照：不参与预热（股票实时行情一分钟即过期，只在批量查询时获取）
+    ON_DEMAND_SNAPSHOTS = {AssetType.STOCK}
+
+    # 负缓存有效期对应的数据类型：基金跟随各自快照的刷新时间，股票跟随代码列表
+    NEGATIVE_CACHE_DATA_KINDS = {
+        **SNAPSHOT_DATA_KINDS,
+        AssetType.STOCK: 'listing',
+    }
+
+    def __init__(self, snapshot_store: Optional[SnapshotStore] = None, l2_cache: Optional[RedisMarketCache] = None,
+                 upstream: Optional[UpstreamClient] = None):
+        """
+        Args:
+            snapshot_store: 全量快照磁盘存储，默认按配置创建
+            l2_cache: Redis 二级缓存，默认按 REDIS_URL 创建（未配置时仅使用进程内缓存）
+            upstream: 上游调用保护（超时、重试、熔断），默认按配置创建
+        """
+        self.cache = AssetCache(
+            settings.ASSET_CACHE_MAX_BYTES, settings.ASSET_CACHE_MAX_ENTRIES, settings.ASSET_CACHE_SWEEP_INTERVAL
+        )
         self.trading_helper = TradingTimeHelper()
 
         # 不再硬编码净值字段，改为动态解析所有日期格式的净值字段
 
+        # 缓存有效期由交易日历决定：数据一直有效到下一次可能变化的时刻
+        self.expiry_policy = CacheExpiryPolicy(self.trading_helper)
+
+        # 缓存软过期后，在 *_stale_ttl 秒内返回旧数据并在后台刷新，超出后阻塞加载
+
         # LOF缓存配置
         self.lof_cache_key = "lof_all_data"  # 全局LOF数据缓存键
-        self.lof_cache_ttl = 1800  # 30分钟（秒）
+        self.lof_stale_ttl = 1800  # 30分钟（秒）
 
         # 开放式基金缓存配置
         self.open_fund_cache_key = "open_fund_all_data"  # 全局开放式基金数据缓存键
-        self.open_fund_cache_ttl = 3600  # 1小时（秒）
+        self.open_fund_stale_ttl = 6 * 3600  # 6小时（秒），净值每日只更新一次
+
+        # ETF缓存配置（ETF净值每日收盘后公布一次）
+        self.etf_cache_key = "etf_all_data"  # 全局ETF数据缓存键
+        self.etf_stale_ttl = 4 * 3600  # 4小时（秒）
+
+        # 股票缓存配置（按代码缓存）
+        self.stock_stale_ttl = 300  # 5分钟（秒）
+
+        # 股票实时行情快照配置：一次查询的股票数达到阈值时获取全A股行情，代替逐只调用
+        self.stock_spot_cache_key = "stock_spot_all_data"
+        self.stock_spot_stale_ttl = 300  # 5分钟（秒）
+        self.stock_spot_threshold = settings.STOCK_SPOT_THRESHOLD
+
+        # 强制刷新的最小间隔：缓存写入不足该时间时，刷新请求直接返回现有数据
+        self.lof_min_refresh_age = 60  # 1分钟（秒），实时行情
+        self.open_fund_min_refresh_age = 600  # 10分钟（秒），日净值
+        self.etf_min_refresh_age = 600  # 10分钟（秒），日净值
+        self.stock_min_refresh_age = 30  # 30秒
+        self.stock_spot_min_refresh_age = 30  # 30秒
+
+        # 代码目录：合并各快照的 代码 → (类型, 名称, 交易所) 索引，快照刷新时同步
+        self.code_directory = CodeDirectory()
+
+        # 负缓存：已确认不存在的代码在数据可能变化前不再查询，新快照包含该代码时失效
+        self.negative_cache = NegativeCache(settings.NEGATIVE_CACHE_MAX_ENTRIES)
+
+        # 上游API调用计数（按快照类型），用于确认缓存和请求合并的效果
+        self.upstream_call_counts = Counter()
+        self._upstream_stats_lock = threading.Lock()
+
+        # 全量快照磁盘存储：获取后保存，启动时恢复仍然有效的快照（热启动）
+        if snapshot_store is None:
+            snapshot_store = SnapshotStore(
+                settings.SNAPSHOT_STORE_DIR, settings.SNAPSHOT_STORE_ENABLED, settings.SNAPSHOT_STORE_MEMORY_MAP
+            )
+        self.snapshot_store = snapshot_store
+        self.restore_snapshots()
+
+        # Redis 二级缓存：多个 API 节点共享按代码行情和全量快照，并广播强制刷新后的失效消息
+        if l2_cache is None:
+            l2_cache = RedisMarketCache(url=settings.REDIS_URL)
+        self.l2_cache = l2_cache
+        self.l2_cache.subscribe_invalidations(self.cache.delete)
+
+        # 所有 akshare 调用经由 upstream：限流、超时、重试和按接口熔断，熔断期间退回最近一次成功获取的数据
+        if upstream is None:
+            upstream = UpstreamClient(
+                timeout=settings.UPSTREAM_TIMEOUT,
+                deadline=settings.UPSTREAM_DEADLINE,
+                max_retries=settings.UPSTREAM_MAX_RETRIES,
+                backoff_base=settings.UPSTREAM_BACKOFF_BASE,
+                backoff_max=settings.UPSTREAM_BACKOFF_MAX,
+                failure_threshold=settings.UPSTREAM_FAILURE_THRESHOLD,
+                reset_timeout=settings.UPSTREAM_RESET_TIMEOUT,
+                max_workers=settings.UPSTREAM_MAX_WORKERS,
+                timeouts={self.STOCK_INFO_ENDPOINT: settings.UPSTREAM_QUOTE_TIMEOUT},
+                rate_limiter=self._build_rate_limiter(),
+            )
+        self.upstream = upstream
+
+    def _build_rate_limiter(self) -> Optional[RateLimiter]:
+        """按配置创建上游请求限流器；配置了 Redis 时在所有节点间共享预算"""
+        if not settings.UPSTREAM_RATE_LIMITS:
+            return None
+
+        shared = settings.UPSTREAM_RATE_LIMIT_SHARED and self.l2_cache.client is not None
+        return RateLimiter(
+            settings.UPSTREAM_RATE_LIMITS,
+            max_waits={Priority[lane.upper()]: wait for lane, wait in settings.UPSTREAM_RATE_MAX_WAIT.items()},
+            background_reserve=settings.UPSTREAM_RATE_BACKGROUND_RESERVE,
+            redis_client=self.l2_cache.client if shared else None,
+        )
 
-    def get_stock_info(self, code: str) -> Optional[Dict]:
-        """获取股票信息（简化版：代码、名称、价格）"""
-        if not AKSHARE_AVAILABLE:
+    def get_stock_info(self, code: str) -> Optional[Quote]:
+        """
+        获取股票信息，依次使用：
+        1. 按代码缓存的数据（未过期）
+        2. 全A股实时行情快照（已缓存且未过期时，不产生网络调用）
+        3. 逐只调用上游（代码、名称、价格、市值）
+        """
+        if not self.upstream_available:
             logger.warning("Akshare不可用，无法获取真实数据")
             return None
 
+        if self.negative_cache.contains(AssetType.STOCK, code):
+            return None
+
+        stock_info = self.cache.get(self._stock_cache_key(code))
+        if stock_info is not None:
+            return stock_info
+
+        spot_snapshot = self.cache.get(self.stock_spot_cache_key)
+        if isinstance(spot_snapshot, MarketSnapshot):
+            record = spot_snapshot.get_record(code)
+            stock_info = self._stock_quote_from_spot(spot_snapshot, record, code) if record else None
+            if stock_info is not None:
+                return stock_info
+
+        stock_info = self.cache.get_or_load(
+            self._stock_cache_key(code),
+            lambda: self._load_stock_info(code),
+            self.expiry_policy.get_ttl('stock'),
+            self.stock_stale_ttl,
+        )
+        if stock_info is None and self.upstream.is_open(self.STOCK_INFO_ENDPOINT):
+            return self._last_known_stock_info(code)
+        return stock_info
+
+    def _last_known_stock_info(self, code: str) -> Optional[Quote]:
+        """上游熔断中：退回缓存中最近一次获取的该股票信息（含已过期条目），其次是全A股实时行情快照"""
+        stock_info = self.cache.peek(self._stock_cache_key(code))
+        if stock_info is None:
+            spot_snapshot = self.cache.peek(self.stock_spot_cache_key)
+            if isinstance(spot_snapshot, MarketSnapshot):
+                record = spot_snapshot.get_record(code)
+                stock_info = self._stock_quote_from_spot(spot_snapshot, record, code) if record else None
+
+        if stock_info is not None:
+            self.upstream.record_fallback(self.STOCK_INFO_ENDPOINT)
+            logger.warning(f"上游接口 {self.STOCK_INFO_ENDPOINT} 熔断中，股票 {code} 使用最近一次获取的数据")
+        return stock_info
+
+    def _load_stock_info(self, code: str, max_age: Optional[int] = None) -> Optional[Quote]:
+        """L1 未命中时加载股票信息：先查 Redis L2，再调用上游"""
+        def on_l2_hit(stock_info: Quote) -> Quote:
+            if not isinstance(stock_info, Quote):  # 旧版本节点写入的字典
+                stock_info = Quote.from_mapping(stock_info)
+            self._register_stock(code, stock_info.name)
+            return stock_info
+
+        return self._load_through_l2(
+            self._stock_cache_key(code), 'stock', self.STOCK_INFO_ENDPOINT, lambda: self._fetch_stock_info(code),
+            max_age, on_l2_hit
+        )
+
+    def _load_through_l2(self, cache_key: str, data_kind: str, endpoint: str, load: Callable[[], Any],
+                         max_age: Optional[int] = None, on_hit: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        经由 Redis L2 加载：L2 命中直接返回，否则持有分布式锁调用 load 并写回 L2
+
+        等锁期间其他节点可能已写入，拿到锁后会再查一次 L2，保证每个TTL窗口全集群只调用一次上游。
+        Redis 不可用时直接调用 load。
+
+        Args:
+            endpoint: load 调用的上游接口，分布式锁的持有和等待时间按它的最长调用耗时设置
+            max_age: 强制刷新时传入，只接受获取时间不超过 max_age 秒的 L2 数据；
+                     刷新成功后广播失效消息
+            on_hit: L2 命中时对数据的后处理（如同步代码目录）
+        """
+        l2 = self.l2_cache
+        if not l2.available:
+            return load()
+
+        data = l2.get(cache_key, max_age)
+        if data is None:
+            with l2.lock(cache_key, self.upstream.max_call_duration(endpoint)):
+                data = l2.get(cache_key, max_age)
+                if data is None:
+                    data = load()
+                    if data is not None:
+                        l2.set(cache_key, data, self.expiry_policy.get_ttl(data_kind))
+                        if max_age is not None:
+                            l2.publish_invalidation(cache_key)
+                    return data
+
+        return on_hit(data) if on_hit else data
+
+    def _register_stock(self, code: str, name: Optional[str]) -> None:
+        """股票查询成功：登记到代码目录，并删除可能存在的负缓存条目"""
+        self.code_directory.register(code, AssetType.STOCK, name)
+        self.negative_cache.discard(AssetType.STOCK, code)
+
+    def _stock_cache_key(self, code: str) -> str:
+        """股票按代码缓存的键"""
+        return f"stock_{code}"
+
+    def _fetch_stock_info(self, code: str) -> Optional[Quote]:
+        """调用akshare API获取单只股票信息"""
         try:
             # 1. 调用akshare API
-            stock_info = ak.stock_individual_info_em(symbol=code)
+            stock_info = self._call_upstream('stock', self.STOCK_INFO_ENDPOINT, symbol=code)
 
-            # 2. 检查数据是否为空
+            # 2. 检查数据是否为空（代码不存在，记入负缓存）
             if stock_info.empty:
                 logger.warning(f"股票代码 {code} 未找到数据")
+                self._record_missing(code, AssetType.STOCK)
                 return None
 
             # 3. 将DataFrame转换为字典
             info_dict = dict(zip(stock_info['item'], stock_info['value']))
 
-            # 4. 提取需要的三个字段
-            return {
-                "code": info_dict.get("股票代码", code),
-                "name": info_dict.get("股票简称"),
-                "price": float(info_dict.get("最新", 0)),
-                "type": AssetType.STOCK,
-                "timestamp": datetime.now()
-            }
+            # 4. 提取代码、名称、价格和市值（逐只查询没有涨跌和开高低收）
+            stock_info = Quote(
+                code=info_dict.get("股票代码", code),
+                name=info_dict.get("股票简称"),
+                type=AssetType.STOCK,
+                price=float(info_dict.get("最新", 0)),
+                circulating_market_cap=self._clean_percentage_value(info_dict.get("流通市值")) or 0.0,
+                total_market_cap=self._clean_percentage_value(info_dict.get("总市值")) or 0.0,
+            )
+
+            # 5. 登记到代码目录
+            self._register_stock(code, stock_info.name)
+
+            return stock_info
 
         except Exception as e:
             logger.error(f"获取股票 {code} 信息失败: {e}")
             return None
 
-    def get_lof_fund_info(self, code: str) -> Optional[Dict]:
+    def _use_stock_spot(self, count: int) -> bool:
+        """一次查询 count 只股票时是否改用全A股实时行情快照"""
+        return bool(self.stock_spot_threshold) and count >= self.stock_spot_threshold
+
+    def _get_stock_spot_with_cache(self) -> Optional[MarketSnapshot]:
+        """
+        获取全A股实时行情快照（带缓存、请求合并和后台刷新）
+        一次API调用服务所有股票查询；快照自带代码索引
+        """
+        snapshot = self.cache.get_or_load(
+            self.stock_spot_cache_key, lambda: self._load_shared_or_fetch(AssetType.STOCK),
+            self.expiry_policy.get_ttl('stock_spot'), self.stock_spot_stale_ttl
+        )
+        return self._or_last_known_snapshot(AssetType.STOCK, snapshot)
+
+    def _fetch_stock_spot_snapshot(self) -> Optional[MarketSnapshot]:
+        """调用akshare API获取全A股实时行情并构建代码索引"""
+        logger.info("缓存未命中，调用API获取全A股实时行情")
+
+        try:
+            all_stock_data = self._call_upstream('stock_spot', self.SNAPSHOT_ENDPOINTS[AssetType.STOCK])
+
+            if all_stock_data.empty:
+                logger.warning("全A股实时行情为空")
+                return None
+
+            logger.info(f"成功获取 {len(all_stock_data)} 只股票实时行情")
+            spot_snapshot = MarketSnapshot(all_stock_data, '代码', '名称', 'stock_spot')
+            return self._publish_snapshot(AssetType.STOCK, spot_snapshot)
+
+        except Exception as e:
+            logger.error(f"获取全A股实时行情失败: {e}")
+            return None
+
+    def _stock_quote_from_spot(self, snapshot: MarketSnapshot, record: Dict, code: str) -> Optional[Quote]:
+        """
+        从实时行情快照记录构建股票信息（含涨跌、成交和开高低收）
+
+        停牌股票没有最新价，使用昨收价；二者都没有时返回 None。
+        """
+        def number(column: str) -> Optional[float]:
+            return self._clean_percentage_value(record.get(column))
+
+        price = number('最新价') or number('昨收')
+        if not price or price <= 0:
+            logger.warning(f"股票 {code} 实时行情没有有效价格")
+            return None
+
+        volume = number('成交量') or 0.0
+        return Quote.from_snapshot(
+            snapshot, code,
+            name=record.get('名称'),
+            type=AssetType.STOCK,
+            price=price,
+            change_amount=number('涨跌额') or 0.0,
+            change_percent=number('涨跌幅') or 0.0,
+            volume=int(volume) if volume > 0 else 0,
+            turnover=number('成交额') or 0.0,
+            open_price=number('今开') or price,
+            high_price=number('最高') or price,
+            low_price=number('最低') or price,
+            prev_close=number('昨收') or price,
+            turnover_rate=number('换手率') or 0.0,
+            circulating_market_cap=number('流通市值') or 0.0,
+            total_market_cap=number('总市值') or 0.0,
+        )
+
+    def get_lof_fund_info(self, code: str) -> Optional[Quote]:
         """
         获取LOF基金信息（带全局缓存机制）
         重点：避免多次API调用，一次获取全量数据服务所有查询
         """
-        if not AKSHARE_AVAILABLE:
+        if not self.upstream_available:
             logger.warning("Akshare不可用，无法获取真实数据")
             return None
 
@@ -286,62 +1233,51 @@ class RealMarketDataService(MarketDataService):
             logger.warning("Pandas不可用，无法处理LOF数据")
             return None
 
+        if self.negative_cache.contains(AssetType.LOF_FUND, code):
+            return None
+
         try:
-            # 1. 获取全量LOF数据（带缓存）
-            all_lof_data = self._get_all_lof_data_with_cache()
+            # 1. 获取全量LOF快照（带缓存）
+            lof_snapshot = self._get_all_lof_data_with_cache()
 
-            if all_lof_data is None or all_lof_data.empty:
+            if lof_snapshot is None or lof_snapshot.empty:
                 logger.warning("LOF数据为空")
                 return None
 
-            # 2. 从全量数据中筛选目标代码
-            found_lof = None
-            for idx in range(len(all_lof_data)):
-                lof_row = all_lof_data.iloc[idx]
-                lof_code = str(lof_row['代码']) if pd.notna(lof_row['代码']) else None
-
-                if lof_code == code:
-                    # 将找到的LOF数据转换为字典
-                    lof_dict = {}
-                    for col in all_lof_data.columns:
-                        value = lof_row[col]
-                        if pd.notna(value):
-                            lof_dict[col] = value
-                        else:
-                            lof_dict[col] = None
-
-                    found_lof = lof_dict
-                    logger.info(f"找到LOF基金 {code}: {lof_dict.get('名称')}")
-                    break
-
-                if found_lof:
-                    break
+            # 2. 通过代码索引查找目标LOF（O(1)）
+            found_lof = lof_snapshot.get_record(code)
 
             if not found_lof:
                 logger.warning(f"LOF基金代码 {code} 未在数据中找到")
+                self._record_missing(code, AssetType.LOF_FUND)
                 return None
 
-            # 3. 数据验证
-            validation = self._validate_lof_data(found_lof, code)
-            if not validation['valid']:
-                logger.warning(f"LOF基金 {code} 数据验证失败: {validation['issues']}")
-                return None
+            logger.info(f"找到LOF基金 {code}: {found_lof.get('名称')}")
 
-            # 4. 提取和转换数据
-            lof_info = self._extract_lof_info(found_lof, code)
-
-            return lof_info
+            # 3. 验证并提取数据
+            return self._build_lof_info(lof_snapshot, found_lof, code)
 
         except Exception as e:
             logger.error(f"获取LOF基金 {code} 数据失败: {e}")
             return None
 
-    def get_etf_fund_info(self, code: str) -> Optional[Dict]:
+    def _build_lof_info(self, snapshot: MarketSnapshot, found_lof: Dict, code: str) -> Optional[Quote]:
+        """从快照记录验证并构建LOF基金信息"""
+        # 1. 数据验证
+        validation = self._validate_lof_data(found_lof, code)
+        if not validation['valid']:
+            logger.warning(f"LOF基金 {code} 数据验证失败: {validation['issues']}")
+            return None
+
+        # 2. 提取和转换数据
+        return self._extract_lof_info(snapshot, found_lof, code, validation)
+
+    def get_etf_fund_info(self, code: str) -> Optional[Quote]:
         """
         获取ETF基金信息（带净值有效性验证和时间感知）
         重点：获取最近一个交易日的有效净值，而不是固定字段顺序
         """
-        if not AKSHARE_AVAILABLE:
+        if not self.upstream_available:
             logger.warning("Akshare不可用，无法获取真实数据")
             return None
 
@@ -349,104 +1285,84 @@ class RealMarketDataService(MarketDataService):
             logger.warning("Pandas不可用，无法处理ETF数据")
             return None
 
+        if self.negative_cache.contains(AssetType.ETF_FUND, code):
+            return None
+
         try:
             # 1. 获取当前交易日期
             current_trading_date = self.trading_helper.get_current_trading_date()
             logger.info(f"当前交易日期: {current_trading_date}")
 
-            # 2. 调用akshare API（无参数，获取所有ETF数据）
-            all_etf_data = ak.fund_etf_fund_daily_em()
+            # 2. 获取全量ETF快照（带缓存）
+            etf_snapshot = self._get_all_etf_data_with_cache()
 
             # 3. 检查数据是否为空
-            if all_etf_data.empty:
+            if etf_snapshot is None or etf_snapshot.empty:
                 logger.warning("ETF数据为空")
                 return None
 
-            # 4. 从全量数据中筛选对应代码
-            found_etf = None
-            for idx in range(len(all_etf_data)):
-                etf_row = all_etf_data.iloc[idx]
-                etf_code = str(etf_row['基金代码']) if pd.notna(etf_row['基金代码']) else None
-
-                if etf_code == code:
-                    # 将找到的ETF数据转换为字典
-                    etf_dict = {}
-                    for col in all_etf_data.columns:
-                        value = etf_row[col]
-                        if pd.notna(value):
-                            etf_dict[col] = value
-                        else:
-                            etf_dict[col] = None
-
-                    found_etf = etf_dict
-                    logger.info(f"找到ETF {code}: {etf_dict.get('基金简称')}")
-                    break
-
-                if found_etf:
-                    break
+            # 4. 通过代码索引查找对应ETF（O(1)）
+            found_etf = etf_snapshot.get_record(code)
 
             if not found_etf:
                 logger.warning(f"ETF代码 {code} 未在数据中找到")
+                self._record_missing(code, AssetType.ETF_FUND)
                 return None
 
-            # 5. 数据有效性验证
-            validation = self._validate_etf_data(found_etf, code, current_trading_date)
-            if not validation['valid']:
-                logger.warning(f"ETF {code} 数据验证失败: {validation['issues']}")
-                return None
-
-            # 6. 查找最新有效净值（考虑时间和交易日期）
-            latest_price = self._find_latest_valid_price(found_etf, code, current_trading_date)
+            logger.info(f"找到ETF {code}: {found_etf.get('基金简称')}")
 
-            if not latest_price:
-                logger.error(f"ETF {code} 无法找到有效净值")
-                return None
-
-            # 7. 获取其他数据字段
-            growth_rate = found_etf.get('增长率', '0.0')
-            discount_rate = found_etf.get('折价率', '0.0')
-
-            # 清理百分比数值
-            growth_rate_cleaned = self._clean_percentage_value(growth_rate)
-            discount_rate_cleaned = self._clean_percentage_value(discount_rate)
-
-            # 8. 构建返回数据
-            return {
-                "code": found_etf.get('基金代码', code),
-                "name": found_etf.get('基金简称'),
-                "price": latest_price['price'],
-                "type": AssetType.ETF_FUND,
-                "timestamp": datetime.now(),
-                "raw_data": found_etf,  # 保留原始数据用于调试
-                "price_field_used": latest_price['field'],
-                "price_date": latest_price['date'],
-                "trading_date": current_trading_date,
-                "validation": validation,
-
-                # 补充其他字段
-                "change_amount": 0.0,
-                "change_percent": growth_rate_cleaned if growth_rate_cleaned is not None else 0.0,
-                "volume": 0,
-                "turnover": 0,
-                "open_price": latest_price['price'],
-                "high_price": latest_price['price'],
-                "low_price": latest_price['price'],
-                "prev_close": latest_price['price'],
-                "turnover_rate": discount_rate_cleaned if discount_rate_cleaned is not None else 0.0,
-                "circulating_market_cap": 0.0,
-                "total_market_cap": 0.0,
-            }
+            # 5. 验证并构建返回数据
+            return self._build_etf_info(etf_snapshot, found_etf, code, current_trading_date)
 
         except Exception as e:
             logger.error(f"获取ETF {code} 数据失败: {e}")
             return None
 
-    def get_open_fund_info(self, code: str) -> Optional[Dict]:
+    def _build_etf_info(self, snapshot: MarketSnapshot, found_etf: Dict, code: str,
+                        current_trading_date: str) -> Optional[Quote]:
+        """从快照记录验证并构建ETF基金信息"""
+        # 1. 数据有效性验证
+        validation = self._validate_etf_data(found_etf, code, current_trading_date)
+        if not validation['valid']:
+            logger.warning(f"ETF {code} 数据验证失败: {validation['issues']}")
+            return None
+
+        # 2. 查找最新有效净值（考虑时间和交易日期）
+        latest_price = self._find_latest_valid_price(found_etf, code, current_trading_date)
+
+        if not latest_price:
+            logger.error(f"ETF {code} 无法找到有效净值")
+            return None
+
+        # 3. 获取其他数据字段
+        growth_rate = found_etf.get('增长率', '0.0')
+        discount_rate = found_etf.get('折价率', '0.0')
+
+        # 清理百分比数值
+        growth_rate_cleaned = self._clean_percentage_value(growth_rate)
+        discount_rate_cleaned = self._clean_percentage_value(discount_rate)
+
+        # 4. 构建返回数据（原始行不复制，需要时通过 raw_data 从快照读取）
+        return Quote.from_snapshot(
+            snapshot, code,
+            name=found_etf.get('基金简称'),
+            type=AssetType.ETF_FUND,
+            price=latest_price['price'],
+            price_field=latest_price['field'],
+            price_date=latest_price['date'],
+            trading_date=current_trading_date,
+            validation_flags=validation['flags'],
+            change_percent=growth_rate_cleaned if growth_rate_cleaned is not None else 0.0,
+            turnover_rate=discount_rate_cleaned if discount_rate_cleaned is not None else 0.0,
+            discount_rate=discount_rate_cleaned,
+        )
+
+    def get_open_fund_info(self, code: str) -> Optional[Quote]:
         """
         获取开放式基金信息（带全局缓存和智能净值提取）
         重点：动态解析净值字段，支持海外基金，避免多次API调用
         """
-        if not AKSHARE_AVAILABLE:
+        if not self.upstream_available:
             logger.warning("Akshare不可用，无法获取真实数据")
             return None
 
@@ -454,72 +1370,63 @@ class RealMarketDataService(MarketDataService):
             logger.warning("Pandas不可用，无法处理开放式基金数据")
             return None
 
+        if self.negative_cache.contains(AssetType.OPEN_FUND, code):
+            return None
+
         try:
             # 1. 获取当前交易日期
             current_trading_date = self.trading_helper.get_current_trading_date()
             logger.info(f"当前交易日期: {current_trading_date}")
 
-            # 2. 获取全量开放式基金数据（带缓存）
-            all_fund_data = self._get_all_open_fund_data_with_cache()
+            # 2. 获取全量开放式基金快照（带缓存）
+            fund_snapshot = self._get_all_open_fund_data_with_cache()
 
             # 检查数据有效性
-            if all_fund_data is None:
+            if fund_snapshot is None:
                 logger.warning("开放式基金全量数据为None")
                 return None
 
-            if hasattr(all_fund_data, 'empty') and all_fund_data.empty:
+            if fund_snapshot.empty:
                 logger.warning("开放式基金全量数据为空")
                 return None
 
-            # 3. 从全量数据中筛选目标代码
-            found_fund = None
-            try:
-                # 使用DataFrame的query方法，更高效
-                fund_data_rows = all_fund_data[all_fund_data['基金代码'].astype(str) == str(code)]
-
-                if not fund_data_rows.empty:
-                    # 转换为字典
-                    fund_dict = fund_data_rows.iloc[0].to_dict()
-
-                    # 处理NaN值
-                    fund_dict_cleaned = {}
-                    for key, value in fund_dict.items():
-                        if pd.isna(value):
-                            fund_dict_cleaned[key] = None
-                        else:
-                            fund_dict_cleaned[key] = value
-
-                    found_fund = fund_dict_cleaned
-                    fund_name = fund_dict_cleaned.get('基金简称', '')
-                    logger.info(f"找到开放式基金 {code}: {fund_name}")
-                else:
-                    logger.warning(f"开放式基金代码 {code} 未在数据中找到")
+            # 3. 通过代码索引查找目标基金（O(1)）
+            found_fund = fund_snapshot.get_record(code)
 
-            except Exception as e:
-                logger.error(f"处理开放式基金 {code} 数据时出错: {e}")
+            if not found_fund:
+                logger.warning(f"开放式基金代码 {code} 未在数据中找到")
+                self._record_missing(code, AssetType.OPEN_FUND)
                 return None
 
-            # 4. 数据验证
-            validation = self._validate_open_fund_data(found_fund, code)
-            if not validation['valid']:
-                logger.warning(f"开放式基金 {code} 数据验证失败: {validation['issues']}")
-                return None
+            logger.info(f"找到开放式基金 {code}: {found_fund.get('基金简称', '')}")
 
-            # 5. 智能净值提取（考虑时间和海外基金）
-            latest_nav = self._find_latest_valid_nav_for_open_fund(found_fund, code, current_trading_date)
-
-            if not latest_nav:
-                logger.error(f"开放式基金 {code} 无法找到有效净值")
-                return None
-
-            # 6. 构建返回数据
-            return self._extract_open_fund_info(found_fund, code, latest_nav, current_trading_date, validation)
+            # 4. 验证并构建返回数据
+            return self._build_open_fund_info(fund_snapshot, found_fund, code, current_trading_date)
 
         except Exception as e:
             logger.error(f"获取开放式基金 {code} 数据失败: {e}")
             return None
 
-    def get_market_data(self, code: str, asset_type: AssetType) -> Optional[Dict]:
+    def _build_open_fund_info(self, snapshot: MarketSnapshot, found_fund: Dict, code: str,
+                              current_trading_date: str) -> Optional[Quote]:
+        """从快照记录验证并构建开放式基金信息"""
+        # 1. 数据验证
+        validation = self._validate_open_fund_data(found_fund, code)
+        if not validation['valid']:
+            logger.warning(f"开放式基金 {code} 数据验证失败: {validation['issues']}")
+            return None
+
+        # 2. 智能净值提取（考虑时间和海外基金）
+        latest_nav = self._find_latest_valid_nav_for_open_fund(found_fund, code, current_trading_date)
+
+        if not latest_nav:
+            logger.error(f"开放式基金 {code} 无法找到有效净值")
+            return None
+
+        # 3. 构建返回数据
+        return self._extract_open_fund_info(snapshot, found_fund, code, latest_nav, current_trading_date, validation)
+
+    def get_market_data(self, code: str, asset_type: AssetType) -> Optional[Quote]:
         """
         获取市场数据（智能决策）
         根据交易时间和缓存情况决定是否调用API
@@ -528,10 +1435,7 @@ class RealMarketDataService(MarketDataService):
 
         # 根据资产类型调用相应的获取方法
         if asset_type == AssetType.STOCK:
-            stock_info = self.get_stock_info(code)
-            if not stock_info:
-                return None
-            return self._build_market_data_from_stock(stock_info)
+            return self.get_stock_info(code)
 
         elif asset_type == AssetType.ETF_FUND:
             etf_info = self.get_etf_fund_info(code)
@@ -554,282 +1458,668 @@ class RealMarketDataService(MarketDataService):
         else:
             raise NotImplementedError(f"资产类型 {asset_type} 的真实数据获取待实现")
 
-    def _build_market_data_from_stock(self, stock_info: Dict) -> Dict:
-        """从股票信息构建市场数据格式"""
-        price = stock_info.get("price", 0)
+    def get_market_data_many(self, requests: List[Tuple[str, AssetType]]) -> Dict:
+        """
+        批量获取市场数据
 
-        return {
-            "name": stock_info.get("name"),
-            "code": stock_info.get("code"),
-            "price": price,
-            "type": stock_info.get("type"),
-
-            # 补充其他字段（使用默认值）
-            "change_amount": 0.0,
-            "change_percent": 0.0,
-            "volume": 0,
-            "turnover": 0,
-            "open_price": price,
-            "high_price": price,
-            "low_price": price,
-            "prev_close": price,
-            "turnover_rate": 0.0,
-            "circulating_market_cap": 0.0,
-            "total_market_cap": 0.0,
+        按资产类型分组：每种基金类型只访问一次全量快照，并一次性按代码索引取出所有请求的记录；
+        股票数达到阈值时同样使用全A股实时行情快照，否则（或快照中没有的代码）逐个获取。
+
+        Args:
+            requests: [(代码, 资产类型), ...]
+
+        Returns:
+            {'results': {code: 市场数据}, 'errors': {code: 错误信息}}
+
+        Raises:
+            ValueError: 同一代码以多个资产类型请求
+        """
+        requests = self._unique_requests(requests)
+        results, errors = {}, {}
+
+        # 1. 按资产类型分组
+        codes_by_type: Dict[AssetType, List[str]] = {}
+        for code, asset_type in requests:
+            codes_by_type.setdefault(AssetType(asset_type), []).append(code)
+
+        current_trading_date = self.trading_helper.get_current_trading_date()
+        snapshot_sources = {
+            AssetType.LOF_FUND: (
+                self._get_all_lof_data_with_cache,
+                lambda snapshot, record, code: self._build_lof_info(snapshot, record, code),
+            ),
+            AssetType.ETF_FUND: (
+                self._get_all_etf_data_with_cache,
+                lambda snapshot, record, code: self._build_etf_info(snapshot, record, code, current_trading_date),
+            ),
+            AssetType.OPEN_FUND: (
+                self._get_all_open_fund_data_with_cache,
+                lambda snapshot, record, code: self._build_open_fund_info(snapshot, record, code, current_trading_date),
+            ),
         }
 
-    def get_all_lof_funds(self) -> List[Dict]:
-        """获取所有LOF基金列表"""
-        all_lof_data = self._get_all_lof_data_with_cache()
+        for asset_type, codes in codes_by_type.items():
+            # 2. 负缓存中的代码直接返回错误，全部命中时不访问快照
+            missing = [code for code in codes if self.negative_cache.contains(asset_type, code)]
+            for code in missing:
+                errors[code] = "代码不存在"
+            codes = [code for code in codes if code not in missing]
+            if not codes:
+                continue
+
+            # 3. 股票数达到阈值时从实时行情快照一次性取出，快照中没有的代码再逐个获取
+            if asset_type == AssetType.STOCK and self._use_stock_spot(len(codes)):
+                codes = self._collect_stocks_from_spot(codes, results)
+
+            # 4. 没有全量快照的类型逐个获取
+            if asset_type not in snapshot_sources:
+                for code in codes:
+                    try:
+                        market_data = self.get_market_data(code, asset_type)
+                    except Exception as e:
+                        errors[code] = str(e)
+                        continue
+                    if market_data:
+                        results[code] = market_data
+                    else:
+                        errors[code] = "无法获取市场数据"
+                continue
+
+            # 5. 每种类型只访问一次快照
+            get_snapshot, build_info = snapshot_sources[asset_type]
+            snapshot = get_snapshot() if (self.upstream_available and PANDAS_AVAILABLE) else None
+            if snapshot is None or snapshot.empty:
+                for code in codes:
+                    errors[code] = f"{asset_type.value} 全量数据获取失败"
+                continue
+
+            # 6. 一次性取出所有请求代码的记录
+            records = snapshot.get_records(codes)
+            for code in codes:
+                record = records.get(code)
+                if record is None:
+                    errors[code] = "未在数据中找到"
+                    self._record_missing(code, asset_type)
+                    continue
 
-        if all_lof_data is None or all_lof_data.empty:
-            return []
+                try:
+                    market_data = build_info(snapshot, record, code)
+                except Exception as e:
+                    logger.error(f"构建 {code} 市场数据失败: {e}")
+                    errors[code] = str(e)
+                    continue
 
-        # 将DataFrame转换为字典列表
-        lof_list = []
-        for idx in range(len(all_lof_data)):
-            lof_row = all_lof_data.iloc[idx]
-
-            # 提取基础信息
-            lof_dict = {
-                'code': str(lof_row['代码']) if pd.notna(lof_row['代码']) else None,
-                'name': lof_row.get('名称'),
-                'type': AssetType.LOF_FUND,
-                'price': float(lof_row['最新价']) if pd.notna(lof_row['最新价']) else 0.0,
-                'updated_at': datetime.now()
-            }
+                if market_data:
+                    results[code] = market_data
+                else:
+                    errors[code] = "数据验证失败或无有效净值"
 
-            # 添加市场数据
-            lof_dict.update({
-                'change_amount': float(lof_row['涨跌额']) if pd.notna(lof_row['涨跌额']) else 0.0,
-                'volume': float(lof_row['成交量']) if pd.notna(lof_row['成交量']) else 0.0,
-                'turnover': float(lof_row['成交额']) if pd.notna(lof_row['成交额']) else 0.0,
-            })
+        logger.info(f"批量获取市场数据: 请求 {len(requests)} 个，成功 {len(results)} 个，失败 {len(errors)} 个")
+        return {'results': results, 'errors': errors}
 
-            lof_list.append(lof_dict)
+    def _collect_stocks_from_spot(self, codes: List[str], results: Dict) -> List[str]:
+        """
+        从全A股实时行情快照取出股票市场数据写入 results
 
-        logger.info(f"返回 {len(lof_list)} 只LOF基金")
-        return lof_list
+        Returns:
+            快照中没有（或快照获取失败）需要逐个获取的代码
+        """
+        snapshot = self._get_stock_spot_with_cache() if PANDAS_AVAILABLE else None
+        if snapshot is None or snapshot.empty:
+            logger.warning("全A股实时行情获取失败，改为逐只查询")
+            return codes
+
+        remaining = []
+        records = snapshot.get_records(codes)
+        for code in codes:
+            record = records.get(code)
+            stock_info = self._stock_quote_from_spot(snapshot, record, code) if record else None
+            if stock_info is None:
+                remaining.append(code)
+                continue
+            results[code] = stock_info
+
+        logger.info(f"从实时行情快照取出 {len(codes) - len(remaining)} 只股票，{len(remaining)} 只逐只查询")
+        return remaining
+
+    def get_all_lof_funds(self) -> List[Dict]:
+        """获取所有LOF基金列表（按快照缓存，返回的字典由所有调用方共享，不应修改）"""
+        return self._fund_listing_records(AssetType.LOF_FUND)
 
     def get_all_etf_funds(self) -> List[Dict]:
-        """获取所有ETF基金列表（待实现）"""
-        raise NotImplementedError("ETF基金列表获取待实现")
+        """获取所有ETF基金列表（按快照缓存，返回的字典由所有调用方共享，不应修改）"""
+        return self._fund_listing_records(AssetType.ETF_FUND)
 
     def get_all_open_funds(self) -> List[Dict]:
-        """获取所有开放式基金列表"""
-        all_fund_data = self._get_all_open_fund_data_with_cache()
+        """获取所有开放式基金列表（按快照缓存，返回的字典由所有调用方共享，不应修改）"""
+        return self._fund_listing_records(AssetType.OPEN_FUND)
+
+    def list_funds(self, asset_type: AssetType, keyword: Optional[str] = None,
+                   page: int = 1, page_size: int = 50) -> Dict:
+        """
+        分页获取基金列表
+
+        在按快照缓存的列表 DataFrame 上向量化筛选，只把当前页转换为字典。
+        """
+        listing = self._fund_listing(AssetType(asset_type))
+        if listing is None:
+            listing = pd.DataFrame(columns=['code', 'name'])
+
+        if keyword:
+            matched = (listing['code'].str.startswith(keyword, na=False)
+                       | listing['name'].str.contains(keyword, case=False, regex=False, na=False))
+            listing = listing[matched]
 
-        if all_fund_data is None or all_fund_data.empty:
+        start, end, total_pages = self._page_bounds(len(listing), page, page_size)
+        return {
+            'items': self._listing_to_records(listing.iloc[start:end]),
+            'total': len(listing),
+            'page': page,
+            'page_size': page_size,
+            'total_pages': total_pages,
+        }
+
+    def _fund_listing_records(self, asset_type: AssetType) -> List[Dict]:
+        """完整基金列表（字典形式，按快照缓存）"""
+        snapshot = self._fund_listing_snapshot(asset_type)
+        if snapshot is None:
             return []
 
-        # 将DataFrame转换为字典列表
-        fund_list = []
-        for idx in range(len(all_fund_data)):
-            fund_row = all_fund_data.iloc[idx]
-
-            # 提取基础信息
-            fund_dict = {
-                'code': str(fund_row['基金代码']) if pd.notna(fund_row['基金代码']) else None,
-                'name': fund_row.get('基金简称'),
-                'type': AssetType.OPEN_FUND,
-                'updated_at': datetime.now()
-            }
+        records = snapshot.memoize('listing_records', lambda s: self._listing_to_records(self._fund_listing(asset_type, s)))
+        logger.info(f"返回 {len(records)} 只{asset_type.value}基金")
+        return list(records)
 
-            # 尝试获取净值信息
-            fund_code = str(fund_row['基金代码']) if pd.notna(fund_row['基金代码']) else None
-            nav_fields = self._parse_nav_fields(fund_row.to_dict())
-
-            if nav_fields and len(nav_fields) > 0:
-                # 找最新的净值
-                latest_nav_field = nav_fields[0] if nav_fields else None
-                if latest_nav_field:
-                    nav_value = fund_row.get(latest_nav_field['field'])
-                    if nav_value and pd.notna(nav_value):
-                        try:
-                            fund_dict['price'] = float(nav_value)
-                        except (ValueError, TypeError):
-                            fund_dict['price'] = 0.0
-                    else:
-                        fund_dict['price'] = 0.0
-            else:
-                fund_dict['price'] = 0.0
+    def _fund_listing_snapshot(self, asset_type: AssetType) -> Optional[MarketSnapshot]:
+        """获取基金列表使用的全量快照"""
+        getters = {
+            AssetType.LOF_FUND: self._get_all_lof_data_with_cache,
+            AssetType.ETF_FUND: self._get_all_etf_data_with_cache,
+            AssetType.OPEN_FUND: self._get_all_open_fund_data_with_cache,
+        }
+        if asset_type not in getters:
+            raise ValueError(f"资产类型 {asset_type.value} 不支持基金列表")
+        if not (self.upstream_available and PANDAS_AVAILABLE):
+            return None
 
-            fund_list.append(fund_dict)
+        snapshot = getters[asset_type]()
+        if snapshot is None or snapshot.empty:
+            return None
+        return snapshot
 
-        logger.info(f"返回 {len(fund_list)} 只开放式基金")
-        return fund_list
+    def _fund_listing(self, asset_type: AssetType, snapshot: Optional[MarketSnapshot] = None) -> Optional['pd.DataFrame']:
+        """
+        基金列表 DataFrame（列式计算，按快照版本缓存）
 
-    def get_asset_info(self, code: str) -> Optional[Dict]:
-        """根据代码获取资产信息（自动识别类型）"""
-        # 按优先级尝试不同类型
-        # 先尝试股票
-        stock_info = self.get_stock_info(code)
-        if stock_info:
-            return stock_info
+        快照刷新后是新对象，下一次访问时重新构建。
+        """
+        snapshot = snapshot or self._fund_listing_snapshot(asset_type)
+        if snapshot is None:
+            return None
 
-        # 再尝试ETF
-        etf_info = self.get_etf_fund_info(code)
-        if etf_info:
-            return etf_info
+        builders = {
+            AssetType.LOF_FUND: self._build_lof_listing,
+            AssetType.ETF_FUND: self._build_etf_listing,
+            AssetType.OPEN_FUND: self._build_open_fund_listing,
+        }
+        return snapshot.memoize('listing', builders[asset_type])
 
-        # 然后尝试LOF
-        lof_info = self.get_lof_fund_info(code)
-        if lof_info:
-            return lof_info
+    @staticmethod
+    def _listing_base(snapshot: MarketSnapshot, frame: 'pd.DataFrame', asset_type: AssetType) -> 'pd.DataFrame':
+        """列表的公共列：代码、名称、类型、更新时间（快照获取时间）"""
+        codes = frame[snapshot.code_column]
+        names = frame[snapshot.name_column]
+        return pd.DataFrame({
+            'code': codes.astype(str).where(codes.notna(), None),
+            'name': names.astype(object).where(names.notna(), None),
+            'type': asset_type,
+            'updated_at': snapshot.fetched_at,
+        })
 
-        # 最后尝试开放式基金
-        open_fund_info = self.get_open_fund_info(code)
-        if open_fund_info:
-            return open_fund_info
+    @staticmethod
+    def _numeric_column(frame: 'pd.DataFrame', column: str, fill: Optional[float] = 0.0) -> 'pd.Series':
+        """数值列（缺失或无法转换的值填充为 fill，fill 为 None 时保留 NaN）"""
+        if column not in frame.columns:
+            values = pd.Series(float('nan'), index=frame.index)
+        else:
+            values = pd.to_numeric(frame[column], errors='coerce').astype(float)
+        return values if fill is None else values.fillna(fill)
+
+    def _build_lof_listing(self, snapshot: MarketSnapshot) -> 'pd.DataFrame':
+        """LOF基金列表：代码、名称、最新价、涨跌额、成交量、成交额"""
+        frame = snapshot.select_frame([snapshot.code_column, snapshot.name_column, '最新价', '涨跌额', '成交量', '成交额'])
+        listing = self._listing_base(snapshot, frame, AssetType.LOF_FUND)
+        listing['price'] = self._numeric_column(frame, '最新价')
+        listing['change_amount'] = self._numeric_column(frame, '涨跌额')
+        listing['volume'] = self._numeric_column(frame, '成交量')
+        listing['turnover'] = self._numeric_column(frame, '成交额')
+        return listing
+
+    def _build_etf_listing(self, snapshot: MarketSnapshot) -> 'pd.DataFrame':
+        """ETF基金列表：代码、名称、最新有效净值"""
+        frame = snapshot.select_frame([snapshot.code_column, snapshot.name_column, LATEST_NAV.value])
+        listing = self._listing_base(snapshot, frame, AssetType.ETF_FUND)
+        listing['price'] = self._numeric_column(frame, LATEST_NAV.value)
+        return listing
+
+    def _build_open_fund_listing(self, snapshot: MarketSnapshot) -> 'pd.DataFrame':
+        """开放式基金列表：代码、名称、最新有效净值（优先单位净值，其次累计净值）"""
+        frame = snapshot.select_frame([
+            snapshot.code_column, snapshot.name_column, LATEST_UNIT_NAV.value, LATEST_ACCUMULATED_NAV.value
+        ])
+        listing = self._listing_base(snapshot, frame, AssetType.OPEN_FUND)
+        unit_nav = self._numeric_column(frame, LATEST_UNIT_NAV.value, fill=None)
+        accumulated_nav = self._numeric_column(frame, LATEST_ACCUMULATED_NAV.value, fill=None)
+        listing['price'] = unit_nav.fillna(accumulated_nav).fillna(0.0)
+        return listing
 
-        return None
+    @staticmethod
+    def _listing_to_records(listing: 'pd.DataFrame') -> List[Dict]:
+        """列表 DataFrame 转换为字典列表（恢复资产类型枚举，时间列转换为 datetime）"""
+        records = listing.to_dict('records')
+        for record in records:
+            record['type'] = AssetType(record['type'])
+            updated_at = record.get('updated_at')
+            if isinstance(updated_at, pd.Timestamp):
+                record['updated_at'] = updated_at.to_pydatetime()
+        return records
+
+    def get_asset_info(self, code: str) -> Optional[Quote]:
+        """根据代码获取资产信息（通过代码目录识别类型）"""
+        entry = self._resolve_code(code)
+        if not entry:
+            return None
+
+        info_getters = {
+            AssetType.STOCK: self.get_stock_info,
+            AssetType.ETF_FUND: self.get_etf_fund_info,
+            AssetType.LOF_FUND: self.get_lof_fund_info,
+            AssetType.OPEN_FUND: self.get_open_fund_info,
+        }
+        return info_getters[entry.asset_type](code)
 
     def get_asset_type(self, code: str) -> Optional[AssetType]:
-        """根据代码获取资产类型"""
-        # 按优先级检查不同类型
-        if self.get_stock_info(code):
-            return AssetType.STOCK
-        if self.get_etf_fund_info(code):
-            return AssetType.ETF_FUND
-        if self.get_lof_fund_info(code):
-            return AssetType.LOF_FUND
-        if self.get_open_fund_info(code):
-            return AssetType.OPEN_FUND
-        return None
+        """根据代码获取资产类型（通过代码目录识别）"""
+        entry = self._resolve_code(code)
+        return entry.asset_type if entry else None
 
     def get_asset_name(self, code: str) -> Optional[str]:
-        """根据代码获取资产名称"""
-        # 按优先级检查不同类型
-        stock_info = self.get_stock_info(code)
-        if stock_info:
-            return stock_info.get("name")
+        """根据代码获取资产名称（通过代码目录识别）"""
+        entry = self._resolve_code(code)
+        return entry.name if entry else None
 
-        etf_info = self.get_etf_fund_info(code)
-        if etf_info:
-            return etf_info.get("name")
+    def _resolve_code(self, code: str) -> Optional[CodeEntry]:
+        """
+        通过代码目录识别代码，优先级与原逐个探测一致（股票 → ETF → LOF → 开放式基金）
+
+        1. 目录中已登记为股票：直接返回
+        2. 所有类型都在负缓存中：直接返回 None（不加载快照、不探测上游）
+        3. 只有符合股票代码前缀规则的代码才探测一次股票接口；是股票时直接返回，
+           不加载基金快照（冷缓存时那是三次全市场下载）
+        4. 确保基金快照已加载（通常命中缓存），目录随快照刷新同步
+        5. 按优先级返回基金条目；仍未识别时把各类型记入负缓存
+        """
+        stock_entry = self.code_directory.get(code, AssetType.STOCK)
+        if stock_entry:
+            return stock_entry
 
-        lof_info = self.get_lof_fund_info(code)
-        if lof_info:
-            return lof_info.get("name")
+        if all(self.negative_cache.contains(asset_type, code) for asset_type in CodeDirectory.TYPE_PRIORITY):
+            return None
 
-        open_fund_info = self.get_open_fund_info(code)
-        if open_fund_info:
-            return open_fund_info.get("name")
+        if self.code_directory.may_be_stock(code) and self.get_stock_info(code):
+            return self.code_directory.get(code, AssetType.STOCK)
 
-        return None
+        snapshots = self._load_fund_snapshots()
+
+        entry = self.code_directory.resolve(code)
+        if entry is None:
+            # 只记录确实查过的类型：快照获取失败的类型下次仍会查询
+            if not self.code_directory.may_be_stock(code):
+                self._record_missing(code, AssetType.STOCK)
+            for asset_type, snapshot in snapshots.items():
+                if snapshot is not None and not snapshot.empty:
+                    self._record_missing(code, asset_type)
+        return entry
+
+    def _load_fund_snapshots(self) -> Dict[AssetType, Optional[MarketSnapshot]]:
+        """确保所有基金全量快照已加载（缓存命中时没有网络调用）"""
+        return {
+            AssetType.ETF_FUND: self._get_all_etf_data_with_cache(),
+            AssetType.LOF_FUND: self._get_all_lof_data_with_cache(),
+            AssetType.OPEN_FUND: self._get_all_open_fund_data_with_cache(),
+        }
+
+    def _record_missing(self, code: str, asset_type: AssetType) -> None:
+        """把不存在的代码记入负缓存，有效到该类型数据下一次可能变化的时刻"""
+        data_kind = self.NEGATIVE_CACHE_DATA_KINDS[AssetType(asset_type)]
+        self.negative_cache.add(asset_type, code, self.expiry_policy.get_expiry(data_kind))
+
+    def _sync_snapshot_codes(self, asset_type: AssetType, snapshot: MarketSnapshot) -> None:
+        """新快照到达：同步代码目录，并让快照中已出现的代码的负缓存失效"""
+        self.code_directory.sync_snapshot(asset_type, snapshot)
+        self.negative_cache.invalidate_present(asset_type, snapshot)
 
     def force_refresh_asset(self, code: str, asset_type: AssetType) -> bool:
         """强制刷新资产数据"""
-        try:
-            # 清除缓存
-            self.cache.delete(code)
-
-            # 对于LOF、ETF和开放式基金，还需要清除全局数据缓存
-            if asset_type in [AssetType.LOF_FUND, AssetType.ETF_FUND, AssetType.OPEN_FUND]:
-                if asset_type == AssetType.LOF_FUND:
-                    self.cache.delete(self.lof_cache_key)
-                    logger.info(f"已清除LOF全局缓存，准备刷新数据")
-                elif asset_type == AssetType.OPEN_FUND:
-                    self.cache.delete(self.open_fund_cache_key)
-                    logger.info(f"已清除开放式基金全局缓存，准备刷新数据")
-                # ETF的全局缓存可以根据需要添加
-
-            # 重新获取数据
-            if asset_type == AssetType.STOCK:
-                stock_info = self.get_stock_info(code)
-                if stock_info:
-                    self.cache.set(code, stock_info)
-                    logger.info(f"强制刷新成功: {code}")
-                    return True
-            elif asset_type == AssetType.ETF_FUND:
-                etf_info = self.get_etf_fund_info(code)
-                if etf_info:
-                    self.cache.set(code, etf_info)
-                    logger.info(f"强制刷新成功: {code}")
-                    return True
-            elif asset_type == AssetType.LOF_FUND:
-                lof_info = self.get_lof_fund_info(code)
-                if lof_info:
-                    self.cache.set(code, lof_info)
-                    logger.info(f"强制刷新成功: {code}")
-                    return True
-            elif asset_type == AssetType.OPEN_FUND:
-                open_fund_info = self.get_open_fund_info(code)
-                if open_fund_info:
-                    self.cache.set(code, open_fund_info)
-                    logger.info(f"强制刷新成功: {code}")
-                    return True
-            else:
-                logger.warning(f"资产类型 {asset_type} 强制刷新待实现")
-                return False
+        return self.refresh_market_data(code, asset_type) is not None
 
-        except Exception as e:
-            logger.error(f"强制刷新失败: {code}, 错误: {e}")
-            return False
-
-    def _find_latest_valid_price(self, etf_dict: Dict, code: str, current_trading_date: str) -> Optional[Dict]:
+    def refresh_market_data(self, code: str, asset_type: AssetType) -> Optional[Quote]:
         """
-        查找最新的有效净值（考虑时间和交易日期）
-        逻辑：
-        1. 动态解析所有日期格式的净值字段
-        2. 按日期降序排序，找到最近的有效净值
-        3. 返回价格、字段名、日期和获取方法
+        刷新并返回资产的最新市场数据
+
+        Returns:
+            刷新后的市场数据，刷新失败时返回 None
         """
-        # 1. 动态解析所有日期格式的净值字段
-        nav_fields = self._parse_nav_fields(etf_dict)
+        batch = self.refresh_market_data_many([(code, asset_type)])
+        return batch['results'].get(code)
 
-        if not nav_fields:
-            logger.error(f"ETF {code} 无法找到任何净值字段")
-            return None
+    def refresh_market_data_many(self, requests: List[Tuple[str, AssetType]]) -> Dict:
+        """
+        批量刷新并返回市场数据
 
-        # 2. 按日期降序排序（最近的日期在前）
-        nav_fields.sort(key=lambda x: x['date'], reverse=True)
-        logger.info(f"ETF {code} 找到 {len(nav_fields)} 个净值字段，按日期排序")
+        - 基金：每种类型的全量快照最多重新获取一次，且快照写入不足最小刷新间隔时不重新获取；
+          新快照替换旧快照，不会删除其他用户正在使用的共享缓存
+        - 股票：按代码重新获取（同样遵守最小刷新间隔）；股票数达到阈值时改为刷新一次全A股实时行情快照
+        刷新后直接用 get_market_data_many 返回数据，不需要再次请求上游。
 
-        # 3. 查找第一个有效的净值值
-        for nav_field in nav_fields:
-            field_name = nav_field['field']
-            nav_value = etf_dict.get(field_name)
+        Returns:
+            {'results': {code: 市场数据}, 'errors': {code: 错误信息}}
 
-            if nav_value:
+        Raises:
+            ValueError: 同一代码以多个资产类型请求
+        """
+        requests = self._unique_requests(requests)
+        if not self.upstream_available:
+            logger.warning("Akshare不可用，无法刷新真实数据")
+            return {'results': {}, 'errors': {code: "Akshare不可用" for code, _ in requests}}
+
+        errors = {}
+        refreshed_requests = []
+        refreshed_types: Dict[AssetType, bool] = {}
+
+        # 股票数达到阈值时刷新一次全A股实时行情快照，代替逐只刷新
+        stock_count = sum(1 for _, asset_type in requests if AssetType(asset_type) == AssetType.STOCK)
+        use_stock_spot = self._use_stock_spot(stock_count)
+
+        # 强制刷新的上游调用排在普通用户请求之后、后台刷新之前（见 rate_limiter）
+        with upstream_priority(Priority.REFRESH):
+            for code, asset_type in requests:
+                asset_type = AssetType(asset_type)
                 try:
-                    # 尝试转换为float
-                    price = float(nav_value)
-
-                    if self._is_valid_nav_value(price):
-                        logger.info(f"ETF {code} 使用净值字段: {field_name} = {price}, 日期: {nav_field['date']}")
-
-                        return {
-                            'price': price,
-                            'field': field_name,
-                            'date': nav_field['date'],
-                            'method': 'dynamic_nav_parsing'
-                        }
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"ETF {code} 净值字段 {field_name} 转换失败: {nav_value}, 错误: {e}")
+                    if asset_type == AssetType.STOCK and not use_stock_spot:
+                        succeeded = self.cache.refresh(
+                            self._stock_cache_key(code),
+                            lambda code=code: self._load_stock_info(code, max_age=self.stock_min_refresh_age),
+                            self.expiry_policy.get_ttl('stock'),
+                            self.stock_stale_ttl,
+                            self.stock_min_refresh_age,
+                        ) is not None
+                    elif asset_type in self.SNAPSHOT_DATA_KINDS:
+                        if asset_type not in refreshed_types:
+                            refreshed_types[asset_type] = self._refresh_snapshot(asset_type) is not None
+                        succeeded = refreshed_types[asset_type]
+                    else:
+                        logger.warning(f"资产类型 {asset_type} 强制刷新待实现")
+                        errors[code] = f"资产类型 {asset_type.value} 强制刷新待实现"
+                        continue
+                except Exception as e:
+                    logger.error(f"强制刷新失败: {code}, 错误: {e}")
+                    errors[code] = str(e)
                     continue
 
-        # 4. 如果还是没有找到有效净值
-        logger.error(f"ETF {code} 找到了净值字段但无有效值")
-        return None
+                if succeeded:
+                    refreshed_requests.append((code, asset_type))
+                else:
+                    errors[code] = "刷新市场数据失败"
+
+        batch = self.get_market_data_many(refreshed_requests) if refreshed_requests else {'results': {}, 'errors': {}}
+        batch['errors'].update(errors)
+        logger.info(f"强制刷新: 请求 {len(requests)} 个，成功 {len(batch['results'])} 个")
+        return batch
+
+    def _snapshot_cache_config(self, asset_type: AssetType) -> Tuple[str, Callable[[], Optional[MarketSnapshot]], int, int]:
+        """某类型全量快照的缓存配置：(缓存键, 获取函数, 旧数据可用时间, 最小刷新间隔)"""
+        return {
+            AssetType.LOF_FUND: (self.lof_cache_key, self._fetch_lof_snapshot,
+                                 self.lof_stale_ttl, self.lof_min_refresh_age),
+            AssetType.OPEN_FUND: (self.open_fund_cache_key, self._fetch_open_fund_snapshot,
+                                  self.open_fund_stale_ttl, self.open_fund_min_refresh_age),
+            AssetType.ETF_FUND: (self.etf_cache_key, self._fetch_etf_snapshot,
+                                 self.etf_stale_ttl, self.etf_min_refresh_age),
+            AssetType.STOCK: (self.stock_spot_cache_key, self._fetch_stock_spot_snapshot,
+                              self.stock_spot_stale_ttl, self.stock_spot_min_refresh_age),
+        }[asset_type]
+
+    def _refresh_snapshot(self, asset_type: AssetType) -> Optional[MarketSnapshot]:
+        """按最小刷新间隔重新获取某类型的全量快照，失败时保留旧快照并返回 None"""
+        cache_key, _, stale_ttl, min_age = self._snapshot_cache_config(asset_type)
+        return self.cache.refresh(
+            cache_key, lambda: self._load_shared_or_fetch(asset_type, max_age=min_age),
+            self.expiry_policy.get_ttl(self.SNAPSHOT_DATA_KINDS[asset_type]), stale_ttl, min_age
+        )
+
+    def _load_shared_or_fetch(self, asset_type: AssetType, max_age: Optional[int] = None) -> Optional[MarketSnapshot]:
+        """
+        加载全量快照，依次尝试：
+        1. 本机共享存储中的有效快照（其他 worker 或预热进程写入，直接内存映射）
+        2. Redis L2 中的快照（其他节点写入），取回后写入本机共享存储
+        3. 调用上游获取
+
+        持有该类快照的跨进程锁，多个 worker 同时过期时只有一个真正下载，
+        其余等待后直接映射它写入的新版本。
+
+        Args:
+            max_age: 强制刷新时传入，只接受获取时间不超过 max_age 秒的共享快照；
+                     默认按交易日历判断共享快照是否仍在有效期内
+        """
+        data_kind = self.SNAPSHOT_DATA_KINDS[asset_type]
+        cache_key, fetch, _, _ = self._snapshot_cache_config(asset_type)
+
+        with self.snapshot_store.lock(data_kind):
+            # 其他节点强制刷新后 L2 中的版本更新，此时不能再使用本机的旧版本
+            l2_fetched_at = self.l2_cache.get_fetched_at(cache_key)
+            snapshot = self._load_shared_snapshot(asset_type, max_age, not_before=l2_fetched_at)
+            if snapshot is not None:
+                return snapshot
+
+            return self._load_through_l2(
+                cache_key, data_kind, self.SNAPSHOT_ENDPOINTS[asset_type], fetch, max_age,
+                lambda snapshot: self._publish_snapshot(asset_type, snapshot)
+            )
+
+    def _load_shared_snapshot(self, asset_type: AssetType, max_age: Optional[int] = None,
+                              not_before: Optional[datetime] = None) -> Optional[MarketSnapshot]:
+        """
+        从存储加载仍然有效的共享快照（可能由其他 worker 或预热进程写入）
+
+        Args:
+            not_before: 只接受获取时间不早于该时间的快照
+        """
+        data_kind = self.SNAPSHOT_DATA_KINDS[asset_type]
+        metadata = self.snapshot_store.read_metadata(data_kind)
+        if metadata is None:
+            return None
 
-    def _get_all_lof_data_with_cache(self) -> Optional[any]:
+        now = datetime.now()
+        fetched_at = datetime.fromisoformat(metadata['fetched_at'])
+        if not_before is not None and fetched_at < not_before:
+            return None
+        if max_age is not None:
+            is_valid = now - fetched_at < timedelta(seconds=max_age)
+        else:
+            is_valid = now < self.expiry_policy.get_expiry(data_kind, fetched_at)
+        if not is_valid:
+            return None
+
+        loaded = self.snapshot_store.load(data_kind)
+        if loaded is None:
+            return None
+
+        snapshot, _ = loaded
+        self._sync_snapshot_codes(asset_type, snapshot)
+        logger.info(f"使用共享存储中的 {data_kind} 快照（获取于 {fetched_at:%Y-%m-%d %H:%M:%S}），跳过上游调用")
+        return snapshot
+
+    def _or_last_known_snapshot(self, asset_type: AssetType,
+                                snapshot: Optional[MarketSnapshot]) -> Optional[MarketSnapshot]:
+        """快照加载失败且上游接口熔断中时，退回最近一次成功获取的快照"""
+        if snapshot is not None or not self.upstream.is_open(self.SNAPSHOT_ENDPOINTS[asset_type]):
+            return snapshot
+        return self._last_known_snapshot(asset_type)
+
+    def _last_known_snapshot(self, asset_type: AssetType) -> Optional[MarketSnapshot]:
         """
-        获取全量LOF基金数据（带缓存）
-        一次API调用服务所有LOF查询，避免API限流
+        最近一次成功获取的快照（不论是否过期）：先查缓存，再查磁盘存储
+
+        超过 UPSTREAM_FALLBACK_MAX_AGE 的快照不再使用。找到的快照写回缓存，有效期到熔断器
+        放行探测调用为止：熔断期间的请求直接命中缓存，之后的缓存未命中会再尝试上游。
         """
-        # 1. 尝试从缓存获取
-        cached_data = self.cache.get(self.lof_cache_key)
-        if cached_data:
-            logger.info(f"从缓存获取LOF全量数据")
-            return cached_data
+        data_kind = self.SNAPSHOT_DATA_KINDS[asset_type]
+        endpoint = self.SNAPSHOT_ENDPOINTS[asset_type]
+        cache_key = self._snapshot_cache_config(asset_type)[0]
+
+        snapshot = self.cache.peek(cache_key)
+        from_store = not isinstance(snapshot, MarketSnapshot)
+        if from_store:
+            loaded = self.snapshot_store.load(data_kind)
+            snapshot = loaded[0] if loaded is not None else None
+        if snapshot is None:
+            return None
+
+        age = (datetime.now() - snapshot.fetched_at).total_seconds()
+        if age > settings.UPSTREAM_FALLBACK_MAX_AGE:
+            return None
+
+        ttl = int(age + self.upstream.breaker(endpoint).retry_after()) + 1
+        self.cache.set(cache_key, snapshot, ttl, timestamp=snapshot.fetched_at)
+        if from_store:
+            self._sync_snapshot_codes(asset_type, snapshot)
 
-        # 2. 缓存未命中，调用API获取数据
+        self.upstream.record_fallback(endpoint)
+        logger.warning(f"上游接口 {endpoint} 熔断中，使用最近一次成功获取的 {data_kind} 快照"
+                       f"（获取于 {snapshot.fetched_at:%Y-%m-%d %H:%M:%S}）")
+        return snapshot
+
+    def _publish_snapshot(self, asset_type: AssetType, snapshot: MarketSnapshot) -> MarketSnapshot:
+        """
+        新快照获取成功后：保存到共享存储并同步代码目录
+
+        启用内存映射时返回映射存储文件得到的零拷贝快照，释放本进程内的 DataFrame 副本。
+        """
+        data_kind = self.SNAPSHOT_DATA_KINDS[asset_type]
+        if self.snapshot_store.save(snapshot, self.trading_helper.get_current_trading_date()) \
+                and self.snapshot_store.memory_map:
+            loaded = self.snapshot_store.load(data_kind)
+            if loaded is not None:
+                snapshot = loaded[0]
+
+        self._sync_snapshot_codes(asset_type, snapshot)
+        return snapshot
+
+    def restore_snapshots(self) -> Dict[str, str]:
+        """
+        从磁盘存储恢复全量快照到缓存（启动时调用）
+
+        快照的有效期按获取时间和交易日历重新计算：
+        - 仍在有效期内：作为新鲜数据放入缓存
+        - 已软过期但仍在旧数据可用时间内：放入缓存，首次访问时立即返回并在后台刷新
+        - 已硬过期：忽略
+
+        Returns:
+            {快照类型: 'fresh' / 'stale' / 'expired' / 'missing'}
+        """
+        status = {}
+        if not self.snapshot_store.enabled:
+            return status
+
+        now = datetime.now()
+        for asset_type, data_kind in self.SNAPSHOT_DATA_KINDS.items():
+            cache_key, _, stale_ttl, _ = self._snapshot_cache_config(asset_type)
+
+            metadata = self.snapshot_store.read_metadata(data_kind)
+            if metadata is None:
+                status[data_kind] = 'missing'
+                continue
+
+            fetched_at = datetime.fromisoformat(metadata['fetched_at'])
+            ttl = self.expiry_policy.get_ttl(data_kind, fetched_at)
+            expiry = fetched_at + timedelta(seconds=ttl)
+            if now > expiry + timedelta(seconds=stale_ttl):
+                status[data_kind] = 'expired'
+                continue
+
+            loaded = self.snapshot_store.load(data_kind)
+            if loaded is None:
+                status[data_kind] = 'missing'
+                continue
+
+            snapshot, _ = loaded
+            self.cache.set(cache_key, snapshot, ttl, stale_ttl, timestamp=snapshot.fetched_at)
+            self._sync_snapshot_codes(asset_type, snapshot)
+            status[data_kind] = 'fresh' if now <= expiry else 'stale'
+
+        logger.info(f"从磁盘恢复全量快照: {status}")
+        return status
+
+    def warm_snapshots(self, force: bool = False) -> Dict[str, int]:
+        """
+        获取所有全量快照（写入缓存和磁盘存储），用于预热；按需获取的快照除外
+
+        Args:
+            force: 是否忽略缓存重新获取（仍遵守最小刷新间隔）
+
+        Returns:
+            {快照类型: 行数}，获取失败的类型为 0
+        """
+        rows = {}
+        for asset_type, data_kind in self.SNAPSHOT_DATA_KINDS.items():
+            if asset_type in self.ON_DEMAND_SNAPSHOTS:
+                continue
+            # 预热的上游调用排在用户请求之后（见 rate_limiter）
+            with upstream_priority(Priority.BACKGROUND):
+                if force:
+                    snapshot = self._refresh_snapshot(asset_type)
+                else:
+                    cache_key, _, stale_ttl, _ = self._snapshot_cache_config(asset_type)
+                    snapshot = self._or_last_known_snapshot(asset_type, self.cache.get_or_load(
+                        cache_key, lambda: self._load_shared_or_fetch(asset_type),
+                        self.expiry_policy.get_ttl(data_kind), stale_ttl
+                    ))
+            rows[data_kind] = len(snapshot) if snapshot is not None else 0
+        return rows
+
+    def _find_latest_valid_price(self, etf_dict: Dict, code: str, current_trading_date: str) -> Optional[Dict]:
+        """
+        查找最新的有效净值（考虑时间和交易日期）
+
+        最新有效净值在快照构建时已对所有ETF向量化算出（见 nav_columns），这里只读取派生列：
+        所有日期格式的净值字段按日期降序排列后的第一个有效值。
+        """
+        latest = read_nav(ensure_nav_columns(etf_dict), LATEST_NAV)
+
+        if not latest:
+            logger.error(f"ETF {code} 无法找到有效净值")
+            return None
+
+        logger.info(f"ETF {code} 使用净值字段: {latest['field']} = {latest['price']}, 日期: {latest['date']}")
+        return {**latest, 'method': 'dynamic_nav_parsing'}
+
+    def _get_all_lof_data_with_cache(self) -> Optional[MarketSnapshot]:
+        """
+        获取全量LOF基金快照（带缓存、请求合并和后台刷新）
+        一次API调用服务所有LOF查询，避免API限流；快照自带代码索引
+        """
+        snapshot = self.cache.get_or_load(
+            self.lof_cache_key, lambda: self._load_shared_or_fetch(AssetType.LOF_FUND),
+            self.expiry_policy.get_ttl('lof'), self.lof_stale_ttl
+        )
+        return self._or_last_known_snapshot(AssetType.LOF_FUND, snapshot)
+
+    def _fetch_lof_snapshot(self) -> Optional[MarketSnapshot]:
+        """调用akshare API获取所有LOF基金数据并构建代码索引"""
         logger.info(f"缓存未命中，调用API获取LOF全量数据")
 
         try:
-            # 调用akshare API获取所有LOF基金数据
-            all_lof_data = ak.fund_lof_spot_em()
+            all_lof_data = self._call_upstream('lof', self.SNAPSHOT_ENDPOINTS[AssetType.LOF_FUND])
 
             # 检查数据是否为空
             if all_lof_data.empty:
@@ -837,64 +2127,20 @@ class RealMarketDataService(MarketDataService):
                 return None
 
             logger.info(f"成功获取 {len(all_lof_data)} 只LOF基金数据")
-
-            # 3. 将数据存入缓存
-            self.cache.set(self.lof_cache_key, all_lof_data, self.lof_cache_ttl)
-            cache_info = self.cache.get_info()
-            logger.info(f"LOF数据已缓存，当前缓存状态: {cache_info}")
-
-            return all_lof_data
+            lof_snapshot = MarketSnapshot(
+                self._validated_frame(AssetType.LOF_FUND, all_lof_data, '代码', '名称'), '代码', '名称', 'lof'
+            )
+            return self._publish_snapshot(AssetType.LOF_FUND, lof_snapshot)
 
         except Exception as e:
             logger.error(f"获取LOF基金全量数据失败: {e}")
             return None
 
     def _validate_lof_data(self, lof_dict: Dict, code: str) -> Dict:
-        """验证LOF基金数据有效性"""
-        issues = []
-
-        # 检查核心字段是否存在
-        code_value = lof_dict.get('代码')
-        name_value = lof_dict.get('名称')
-        price_value = lof_dict.get('最新价')
-
-        if not code_value:
-            issues.append("代码为空")
-
-        if not name_value:
-            issues.append("名称为空")
-
-        if price_value is None or price_value == '':
-            issues.append("最新价为空")
-
-        # 验证价格有效性
-        if price_value is not None and price_value != '':
-            try:
-                price_float = float(price_value)
-                if price_float <= 0:
-                    issues.append(f"价格异常: {price_value}")
-                if price_float > 1000:  # LOF基金一般不会超过1000
-                    issues.append(f"价格可能异常: {price_value}")
-            except (ValueError, TypeError):
-                issues.append(f"价格格式错误: {price_value}")
-
-        # 检查成交量（如果有）
-        volume_value = lof_dict.get('成交量')
-        if volume_value is not None:
-            try:
-                volume_float = float(volume_value)
-                if volume_float < 0:
-                    issues.append(f"成交量为负数: {volume_value}")
-            except (ValueError, TypeError):
-                # 成交量数据格式错误，不作为严重错误
-                pass
-
-        return {
-            'valid': len(issues) == 0,
-            'issues': issues
-        }
+        """验证LOF基金数据有效性（读取快照构建时整表算出的校验标记）"""
+        return validate_record(lof_dict, 'lof', '代码', '名称')
 
-    def _extract_lof_info(self, lof_dict: Dict, code: str) -> Dict:
+    def _extract_lof_info(self, snapshot: MarketSnapshot, lof_dict: Dict, code: str, validation: Dict) -> Quote:
         """
         从LOF基金原始数据中提取并转换信息
         返回标准化的LOF基金信息格式
@@ -936,55 +2182,48 @@ class RealMarketDataService(MarketDataService):
             low_price = 0.0
             prev_close = 0.0
 
-        # 构建标准化的LOF基金信息
-        return {
-            "code": code,
-            "name": lof_dict.get('名称', ''),
-            "price": price,
-            "type": AssetType.LOF_FUND,
-            "timestamp": datetime.now(),
+        # 构建标准化的LOF基金信息（原始行不复制，需要时通过 raw_data 从快照读取）
+        return Quote.from_snapshot(
+            snapshot, code,
+            name=lof_dict.get('名称', ''),
+            type=AssetType.LOF_FUND,
+            price=price,
 
             # 市场数据字段
-            "change_amount": change_amount,
-            "change_percent": change_percent_cleaned if change_percent_cleaned is not None else 0.0,
-            "volume": int(volume) if volume > 0 else 0,
-            "turnover": turnover,
-            "open_price": open_price,
-            "high_price": high_price,
-            "low_price": low_price,
-            "prev_close": prev_close,
-            "turnover_rate": turnover_rate_cleaned if turnover_rate_cleaned is not None else 0.0,
+            change_amount=change_amount,
+            change_percent=change_percent_cleaned if change_percent_cleaned is not None else 0.0,
+            volume=int(volume) if volume > 0 else 0,
+            turnover=turnover,
+            open_price=open_price,
+            high_price=high_price,
+            low_price=low_price,
+            prev_close=prev_close,
+            turnover_rate=turnover_rate_cleaned if turnover_rate_cleaned is not None else 0.0,
 
             # LOF特有字段
-            "circulating_market_cap": lof_dict.get('流通市值', 0.0),
-            "total_market_cap": lof_dict.get('总市值', 0.0),
+            circulating_market_cap=lof_dict.get('流通市值', 0.0),
+            total_market_cap=lof_dict.get('总市值', 0.0),
 
-            # 原始数据（用于调试）
-            "raw_data": lof_dict,
-            "validation": {"valid": True, "issues": []}
-        }
+            validation_flags=validation['flags'],
+        )
 
-    def _get_all_open_fund_data_with_cache(self) -> Optional[any]:
+    def _get_all_open_fund_data_with_cache(self) -> Optional[MarketSnapshot]:
         """
-        获取全量开放式基金数据（带缓存）
-        一次API调用服务所有开放式基金查询，避免API限流
+        获取全量开放式基金快照（带缓存、请求合并和后台刷新）
+        一次API调用服务所有开放式基金查询，避免API限流；快照自带代码索引
         """
-        # 1. 尝试从缓存获取
-        cached_data = self.cache.get(self.open_fund_cache_key)
-        if cached_data is not None:
-            logger.info(f"从缓存获取开放式基金全量数据")
-            # 确保返回的数据类型正确
-            if cached_data is None or (hasattr(cached_data, 'empty') and cached_data.empty):
-                logger.warning("缓存数据为空")
-                return None
-            return cached_data
-
-        # 2. 缓存未命中，调用API获取数据
+        snapshot = self.cache.get_or_load(
+            self.open_fund_cache_key, lambda: self._load_shared_or_fetch(AssetType.OPEN_FUND),
+            self.expiry_policy.get_ttl('open_fund'), self.open_fund_stale_ttl
+        )
+        return self._or_last_known_snapshot(AssetType.OPEN_FUND, snapshot)
+
+    def _fetch_open_fund_snapshot(self) -> Optional[MarketSnapshot]:
+        """调用akshare API获取所有开放式基金数据并构建代码索引"""
         logger.info(f"缓存未命中，调用API获取开放式基金全量数据")
 
         try:
-            # 调用akshare API获取所有开放式基金数据
-            all_fund_data = ak.fund_open_fund_daily_em()
+            all_fund_data = self._call_upstream('open_fund', self.SNAPSHOT_ENDPOINTS[AssetType.OPEN_FUND])
 
             # 检查数据是否为空
             if all_fund_data.empty:
@@ -992,161 +2231,142 @@ class RealMarketDataService(MarketDataService):
                 return None
 
             logger.info(f"成功获取 {len(all_fund_data)} 只开放式基金数据")
-
-            # 3. 将数据存入缓存
-            self.cache.set(self.open_fund_cache_key, all_fund_data, self.open_fund_cache_ttl)
-            cache_info = self.cache.get_info()
-            logger.info(f"开放式基金数据已缓存，当前缓存状态: {cache_info}")
-
-            return all_fund_data
+            # 一次性解析净值列结构并为所有基金算出最新有效净值，再对整表做校验
+            fund_frame = self._validated_frame(AssetType.OPEN_FUND, add_nav_columns(all_fund_data), '基金代码', '基金简称')
+            fund_snapshot = MarketSnapshot(fund_frame, '基金代码', '基金简称', 'open_fund')
+            return self._publish_snapshot(AssetType.OPEN_FUND, fund_snapshot)
 
         except Exception as e:
             logger.error(f"获取开放式基金全量数据失败: {e}")
             return None
 
-    def _is_overseas_fund(self, fund_name: str) -> bool:
-        """识别海外基金"""
-        if not fund_name:
-            return False
-
-        overseas_keywords = [
-            '海外', '美元', '港币', '美股',
-            '日经', '恒生', '纳指', '标普',
-            'QDII', 'H股', '美股', '港股'
-        ]
-
-        return any(keyword in fund_name for keyword in overseas_keywords)
+    def _get_all_etf_data_with_cache(self) -> Optional[MarketSnapshot]:
+        """
+        获取全量ETF快照（带缓存、请求合并和后台刷新）
+        并发的缓存未命中只会触发一次API调用
+        """
+        snapshot = self.cache.get_or_load(
+            self.etf_cache_key, lambda: self._load_shared_or_fetch(AssetType.ETF_FUND),
+            self.expiry_policy.get_ttl('etf'), self.etf_stale_ttl
+        )
+        return self._or_last_known_snapshot(AssetType.ETF_FUND, snapshot)
 
-    def _find_latest_valid_nav_for_open_fund(self, fund_dict: Dict, code: str, current_trading_date: str) -> Optional[Dict]:
+    def _fetch_etf_snapshot(self) -> Optional[MarketSnapshot]:
         """
-        查找开放式基金最新的有效净值（智能选择，支持海外基金）
-        逻辑：
-        1. 动态解析所有日期格式的净值字段（单位净值和累计净值）
-        2. 按日期降序排序，优先选择最近的净值
-        3. 支持回退到历史日期（针对海外基金）
+        获取全量ETF快照
+        调用akshare API（无参数，获取所有ETF数据）并构建代码索引
         """
-        # 1. 动态解析所有净值字段
-        nav_fields = self._parse_nav_fields(fund_dict)
+        logger.info(f"缓存未命中，调用API获取ETF全量数据")
 
-        if not nav_fields:
-            logger.error(f"开放式基金 {code} 无法找到任何净值字段")
-            return None
+        try:
+            all_etf_data = self._call_upstream('etf', self.SNAPSHOT_ENDPOINTS[AssetType.ETF_FUND])
 
-        # 2. 按日期降序排序（最近的日期在前）
-        nav_fields.sort(key=lambda x: x['date'], reverse=True)
-        logger.info(f"开放式基金 {code} 找到 {len(nav_fields)} 个净值字段，按日期排序")
+            if all_etf_data.empty:
+                logger.warning("ETF全量数据为空")
+                return None
 
-        # 3. 智能查找有效净值
-        fund_name = fund_dict.get('基金简称', '')
-        is_overseas = self._is_overseas_fund(fund_name)
+            logger.info(f"成功获取 {len(all_etf_data)} 只ETF数据")
+            # 一次性解析净值列结构并为所有ETF算出最新有效净值，再对整表做校验
+            etf_frame = self._validated_frame(AssetType.ETF_FUND, add_nav_columns(all_etf_data), '基金代码', '基金简称')
+            etf_snapshot = MarketSnapshot(etf_frame, '基金代码', '基金简称', 'etf')
+            return self._publish_snapshot(AssetType.ETF_FUND, etf_snapshot)
 
-        # 优先查找"单位净值"
-        unit_nav_pattern = re.compile(r'(\d{4}-\d{2}-\d{2})-单位净值$')
-        accumulated_nav_pattern = re.compile(r'(\d{4}-\d{2}-\d{2})-累计净值$')
+        except Exception as e:
+            logger.error(f"获取ETF全量数据失败: {e}")
+            return None
 
-        # 提取单位净值字段和累计净值字段
-        unit_nav_fields = [nav for nav in nav_fields if unit_nav_pattern.match(nav['field'])]
-        accumulated_nav_fields = [nav for nav in nav_fields if accumulated_nav_pattern.match(nav['field'])]
+    def _validated_frame(self, asset_type: AssetType, frame: 'pd.DataFrame', code_column: str,
+                         name_column: str) -> 'pd.DataFrame':
+        """对新获取的全量数据做整表校验，增加校验标记列（与缓存中的上一版本快照比较价格跳变）"""
+        cache_key = self._snapshot_cache_config(asset_type)[0]
+        previous = self.cache.peek(cache_key)
+        if not isinstance(previous, MarketSnapshot):
+            previous = None
+        return add_validation_column(frame, self.SNAPSHOT_DATA_KINDS[asset_type], code_column, name_column, previous)
 
-        # 优先使用单位净值
-        for nav_field in unit_nav_fields:
-            field_name = nav_field['field']
-            nav_value = fund_dict.get(field_name)
+    def get_snapshot_quality(self) -> Dict[str, Dict]:
+        """
+        缓存中各全量快照的质量报告（每个快照只统计一次，不触发上游调用）
 
-            if nav_value:
-                try:
-                    nav_float = float(nav_value)
-                    if self._is_valid_nav_value(nav_float):
-                        logger.info(f"开放式基金 {code} 使用单位净值字段: {field_name} = {nav_float}, 日期: {nav_field['date']}")
-
-                        return {
-                            'price': nav_float,
-                            'field': field_name,
-                            'date': nav_field['date'],
-                            'method': 'unit_nav',
-                            'nav_type': '单位净值'
-                        }
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"开放式基金 {code} 单位净值字段 {field_name} 转换失败: {nav_value}, 错误: {e}")
-                    continue
+        Returns:
+            {快照类型: 各检查项未通过的行数等}，尚未加载的快照不包含在内
+        """
+        reports = {}
+        for asset_type, data_kind in self.SNAPSHOT_DATA_KINDS.items():
+            snapshot = self.cache.peek(self._snapshot_cache_config(asset_type)[0])
+            if isinstance(snapshot, MarketSnapshot) and VALIDATION_COLUMN in snapshot.columns:
+                reports[data_kind] = snapshot.memoize('quality', quality_report)
+        return reports
+
+    @property
+    def upstream_available(self) -> bool:
+        """上游数据源是否可用（akshare 已安装）"""
+        return AKSHARE_AVAILABLE
+
+    def _upstream_function(self, endpoint: str) -> Callable[..., Any]:
+        """接口名对应的上游函数（接口名即 akshare 函数名）"""
+        return getattr(ak, endpoint)
+
+    def _call_upstream(self, snapshot_type: str, endpoint: str, **kwargs) -> Any:
+        """经由上游调用保护调用 akshare（每次实际尝试都计入调用次数，熔断拒绝的调用不计入）"""
+        func = self._upstream_function(endpoint)
+
+        def attempt():
+            self._record_upstream_call(snapshot_type)
+            return func(**kwargs)
+
+        return self.upstream.call(endpoint, attempt)
+
+    def _record_upstream_call(self, snapshot_type: str) -> None:
+        """记录一次上游API调用"""
+        with self._upstream_stats_lock:
+            self.upstream_call_counts[snapshot_type] += 1
+            count = self.upstream_call_counts[snapshot_type]
+        logger.info(f"上游API调用: {snapshot_type}（累计 {count} 次）")
+
+    def get_upstream_stats(self) -> Dict[str, int]:
+        """获取按快照类型统计的上游API调用次数"""
+        with self._upstream_stats_lock:
+            return dict(self.upstream_call_counts)
 
-        # 如果单位净值无效，尝试累计净值
-        for nav_field in accumulated_nav_fields:
-            field_name = nav_field['field']
-            nav_value = fund_dict.get(field_name)
+    def _find_latest_valid_nav_for_open_fund(self, fund_dict: Dict, code: str, current_trading_date: str) -> Optional[Dict]:
+        """
+        查找开放式基金最新的有效净值（支持海外基金）
 
-            if nav_value:
-                try:
-                    nav_float = float(nav_value)
-                    if self._is_valid_nav_value(nav_float):
-                        logger.info(f"开放式基金 {code} 使用累计净值字段: {field_name} = {nav_float}, 日期: {nav_field['date']}")
-
-                        return {
-                            'price': nav_float,
-                            'field': field_name,
-                            'date': nav_field['date'],
-                            'method': 'accumulated_nav',
-                            'nav_type': '累计净值'
-                        }
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"开放式基金 {code} 累计净值字段 {field_name} 转换失败: {nav_value}, 错误: {e}")
-                    continue
+        优先使用最新的有效单位净值，没有时使用最新的有效累计净值；二者都回退到历史日期
+        （海外基金净值公布较晚）。派生列在快照构建时已对所有基金向量化算出。
+        """
+        record = ensure_nav_columns(fund_dict)
+
+        for columns, method, nav_type in (
+            (LATEST_UNIT_NAV, 'unit_nav', '单位净值'),
+            (LATEST_ACCUMULATED_NAV, 'accumulated_nav', '累计净值'),
+        ):
+            latest = read_nav(record, columns)
+            if latest:
+                logger.info(f"开放式基金 {code} 使用{nav_type}字段: {latest['field']} = {latest['price']}, 日期: {latest['date']}")
+                return {**latest, 'method': method, 'nav_type': nav_type}
 
-        # 如果还是没有找到有效净值
         logger.error(f"开放式基金 {code} 无法找到有效净值")
         return None
 
     def _validate_open_fund_data(self, fund_dict: Dict, code: str) -> Dict:
-        """验证开放式基金数据有效性"""
-        issues = []
-
-        # 检查核心字段是否存在
-        code_value = fund_dict.get('基金代码')
-        name_value = fund_dict.get('基金简称')
-
-        if not code_value:
-            issues.append("基金代码为空")
-
-        if not name_value:
-            issues.append("基金简称为空")
-
-        # 检查是否有任何净值数据
-        nav_fields = self._parse_nav_fields(fund_dict)
-
-        has_any_nav = False
-        for nav_field in nav_fields:
-            nav_value = fund_dict.get(nav_field['field'])
-            if nav_value:
-                try:
-                    nav_float = float(nav_value)
-                    if self._is_valid_nav_value(nav_float):
-                        has_any_nav = True
-                        break
-                except (ValueError, TypeError):
-                    continue
-
-        if not has_any_nav:
-            issues.append("没有有效的净值数据")
-            return {
-                'valid': False,
-                'issues': issues
-            }
-
-        # 检查交易状态
-        purchase_status = fund_dict.get('申购状态')
-        redemption_status = fund_dict.get('赎回状态')
-
-        if purchase_status:
-            logger.info(f"基金 {code} 申购状态: {purchase_status}")
-        if redemption_status:
-            logger.info(f"基金 {code} 赎回状态: {redemption_status}")
-
-        return {
-            'valid': len(issues) == 0,
-            'issues': issues
-        }
-
-    def _extract_open_fund_info(self, fund_dict: Dict, code: str, latest_nav: Dict, current_trading_date: str, validation: Dict) -> Dict:
+        """验证开放式基金数据有效性（读取快照构建时整表算出的校验标记）"""
+        validation = validate_record(fund_dict, 'open_fund', '基金代码', '基金简称')
+
+        # 记录交易状态
+        if validation['valid']:
+            purchase_status = fund_dict.get('申购状态')
+            redemption_status = fund_dict.get('赎回状态')
+            if purchase_status:
+                logger.info(f"基金 {code} 申购状态: {purchase_status}")
+            if redemption_status:
+                logger.info(f"基金 {code} 赎回状态: {redemption_status}")
+
+        return validation
+
+    def _extract_open_fund_info(self, snapshot: MarketSnapshot, fund_dict: Dict, code: str, latest_nav: Dict,
+                                current_trading_date: str, validation: Dict) -> Quote:
         """
         从开放式基金原始数据中提取并转换信息
         返回标准化的开放式基金信息格式
@@ -1167,72 +2387,32 @@ class RealMarketDataService(MarketDataService):
         except (ValueError, TypeError):
             change_amount = 0.0
 
-        # 构建标准化的开放式基金信息
-        return {
-            "code": code,
-            "name": fund_name,
-            "price": latest_nav['price'],
-            "type": AssetType.OPEN_FUND,
-            "timestamp": datetime.now(),
+        # 构建标准化的开放式基金信息（开放式基金没有实时行情，开高低收为净值；原始行按需从快照读取）
+        return Quote.from_snapshot(
+            snapshot, code,
+            name=fund_name,
+            type=AssetType.OPEN_FUND,
+            price=latest_nav['price'],
 
             # 净值信息
-            "unit_net_value": latest_nav['price'] if latest_nav.get('nav_type') == '单位净值' else 0.0,
-            "accumulated_net_value": latest_nav['price'] if latest_nav.get('nav_type') == '累计净值' else 0.0,
-            "nav_field_used": latest_nav['field'],
-            "nav_date": latest_nav['date'],
-            "nav_method": latest_nav['method'],
+            unit_net_value=latest_nav['price'] if latest_nav.get('nav_type') == '单位净值' else 0.0,
+            accumulated_net_value=latest_nav['price'] if latest_nav.get('nav_type') == '累计净值' else 0.0,
+            price_field=latest_nav['field'],
+            price_date=latest_nav['date'],
+            price_method=latest_nav['method'],
 
             # 变动数据
-            "change_amount": change_amount,
-            "change_percent": change_percent_cleaned if change_percent_cleaned is not None else 0.0,
+            change_amount=change_amount,
+            change_percent=change_percent_cleaned if change_percent_cleaned is not None else 0.0,
 
             # 状态信息
-            "purchase_status": fund_dict.get('申购状态', ''),
-            "redemption_status": fund_dict.get('赎回状态', ''),
-            "fee_rate": fund_dict.get('手续费', 0.0),
-
-            # 补充市场数据字段（开放式基金通常没有实时行情）
-            "volume": 0,
-            "turnover": 0,
-            "open_price": latest_nav['price'],
-            "high_price": latest_nav['price'],
-            "low_price": latest_nav['price'],
-            "prev_close": latest_nav['price'],
-            "turnover_rate": 0.0,
-            "circulating_market_cap": 0.0,
-            "total_market_cap": 0.0,
-
-            # 额外信息
-            "trading_date": current_trading_date,
-            "validation": validation,
-
-            # 原始数据（用于调试）
-            "raw_data": fund_dict
-        }
-
-    def _parse_nav_fields(self, etf_dict: Dict) -> List[Dict]:
-        """
-        动态解析ETF字典中所有日期格式的净值字段
-        返回格式: [{'field': '2026-03-08-单位净值', 'date': datetime(2026, 3, 8)}, ...]
-        """
-        nav_fields = []
-        date_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2})-.+$')  # 匹配日期开头的字段
-
-        for field_name in etf_dict.keys():
-            match = date_pattern.match(field_name)
-            if match:
-                date_str = match.group(1)
-                try:
-                    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                    nav_fields.append({
-                        'field': field_name,
-                        'date': date_obj
-                    })
-                except ValueError:
-                    # 日期格式不正确，跳过
-                    continue
+            purchase_status=fund_dict.get('申购状态', ''),
+            redemption_status=fund_dict.get('赎回状态', ''),
+            fee_rate=fund_dict.get('手续费', 0.0),
 
-        return nav_fields
+            trading_date=current_trading_date,
+            validation_flags=validation['flags'],
+        )
 
     def _clean_percentage_value(self, value) -> Optional[float]:
         """清理百分比数值，去除百分号并转换为float"""
@@ -1254,62 +2434,6 @@ class RealMarketDataService(MarketDataService):
             logger.warning(f"无法转换百分比数值: {value}")
             return None
 
-    def _is_valid_nav_value(self, value: float) -> bool:
-        """验证净值是否有效"""
-        # 排除零值和负值
-        # 检查是否在合理范围内
-        return 0.001 < value < 10000  # 一般ETF净值范围
-
     def _validate_etf_data(self, etf_dict: Dict, code: str, current_trading_date: str) -> Dict:
-        """验证ETF数据有效性"""
-        issues = []
-
-        # 动态解析净值字段并检查是否有任何净值数据
-        nav_fields = self._parse_nav_fields(etf_dict)
-
-        has_any_nav = False
-        for nav_field in nav_fields:
-            nav_value = etf_dict.get(nav_field['field'])
-            if nav_value:
-                try:
-                    nav_float = float(nav_value)
-                    if self._is_valid_nav_value(nav_float):
-                        has_any_nav = True
-                        break
-                except (ValueError, TypeError):
-                    continue
-
-        if not has_any_nav:
-            issues.append("没有有效的净值数据")
-            return {
-                'valid': False,
-                'issues': issues
-            }
-
-        # 检查增长率数据
-        growth_rate = etf_dict.get('增长率')
-        if growth_rate:
-            growth_cleaned = self._clean_percentage_value(growth_rate)
-            if growth_cleaned is not None and abs(growth_cleaned) > 50:  # 增长率超过50%可能是异常
-                issues.append(f"增长率异常: {growth_rate}")
-
-        # 检查折价率
-        discount_rate = etf_dict.get('折价率')
-        if discount_rate:
-            discount_cleaned = self._clean_percentage_value(discount_rate)
-            if discount_cleaned is not None and abs(discount_cleaned) > 20:  # 折价率超过20%可能是异常
-                issues.append(f"折价率异常: {discount_rate}")
-
-        # 检查基金简称
-        fund_name = etf_dict.get('基金简称')
-        if not fund_name or not pd.notna(fund_name):
-            issues.append("基金简称为空")
-
-        return {
-            'valid': len(issues) == 0,
-            'issues': issues
-        }
-
-
-# 创建真实数据服务实例
-real_data_service = RealMarketDataService() if (AKSHARE_AVAILABLE and PANDAS_AVAILABLE) else None
+        """验证ETF数据有效性（读取快照构建时整表算出的校验标记）"""
+        return validate_record(etf_dict, 'etf', '基金代码', '基金简称')
@@ -0,0 +1,402 @@
+"""
+Redis 二级市场数据缓存（L2）
+
+进程内的 AssetCache 是 L1；水平扩展的多个 API 节点之间通过 Redis（L2）共享：
+- 按代码缓存的行情（如股票），以压缩的 JSON 保存
+- 压缩后的全量快照（Arrow IPC + zstd）
+
+Redis 可能被多个服务共享，读到的值不能当作可信数据：不使用 pickle 等会执行对象构造的格式，
+行情按字段解码为 Quote。
+
+缓存TTL由交易日历决定（与 L1 相同的 CacheExpiryPolicy）。某个节点从上游获取前先持有
+Redis 分布式锁，其他节点等待后直接读取它写入的结果，每个TTL窗口全集群只调用一次上游。
+强制刷新后通过 pub/sub 频道广播失效消息，其他节点丢弃各自的 L1 条目。
+订阅连接断开（或启动时 Redis 不可用）后，在 retry_interval 秒后的第一次成功的 Redis 操作时重新订阅。
+
+Redis 不可用（未配置、未安装、连接失败）时自动退化为仅使用 L1，
+并在 retry_interval 秒后再次尝试连接。
+
+可以注入任意兼容 redis-py 的客户端（如 fakeredis）。
+"""
+from typing import Any, Callable, Dict, Iterator, Optional
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import json
+import logging
+import threading
+import time
+import uuid
+import zlib
+
+from ..models.enums import AssetType
+from .market_snapshot import MarketSnapshot
+from .quote import Quote
+from .snapshot_store import PYARROW_AVAILABLE, build_snapshot_table, snapshot_from_table
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    """JSON 编码 Quote、datetime 和 numpy 标量"""
+    if isinstance(value, Quote):
+        return {'__quote__': {key: value[key] for key in value}}
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if hasattr(value, 'item'):  # numpy 标量
+        return value.item()
+    raise TypeError(f"无法编码为 JSON 的类型: {type(value).__name__}")
+
+
+def _json_object_hook(data: Dict) -> Any:
+    """还原 _json_default 编码的对象"""
+    if '__datetime__' in data:
+        return datetime.fromisoformat(data['__datetime__'])
+    if '__quote__' in data:
+        values = data['__quote__']
+        return Quote.from_mapping(values, type=AssetType(values['type']))
+    return data
+
+
+class RedisMarketCache:
+    """Redis 二级缓存"""
+
+    KEY_PREFIX = "bafangce:market:"
+    INVALIDATION_CHANNEL = "bafangce:market:invalidate"
+
+    # 值的编码格式标记（第一个字节）
+    FORMAT_ARROW = b'A'  # 全量快照：Arrow IPC 流（zstd 压缩）
+    FORMAT_JSON = b'J'  # 行情和其他数据：zlib 压缩的 JSON
+    # 旧版本写入的 b'P'（pickle）不再解码，按未知格式处理（视为未命中）
+
+    LOCK_POLL_INTERVAL = 0.1  # 等待分布式锁时的轮询间隔（秒）
+    LOCK_MARGIN = 30  # 按持锁时长设置锁时，在上游调用之外为解析、校验和写入 L2 预留的时间（秒）
+
+    def __init__(
+        self,
+        client: Any = None,
+        url: Optional[str] = None,
+        retry_interval: float = 30,
+        lock_timeout: int = 60,
+        lock_wait: int = 30,
+    ):
+        """
+        Args:
+            client: 兼容 redis-py 的客户端（如 fakeredis.FakeRedis），优先于 url
+            url: Redis 连接地址（如 redis://localhost:6379/0）
+            retry_interval: 连接失败后多少秒内不再尝试（仅使用 L1）
+            lock_timeout: 分布式锁自动释放时间（秒），防止持锁节点崩溃后死锁
+            lock_wait: 等待其他节点获取上游数据的最长时间（秒）
+        """
+        if client is None and url:
+            if REDIS_AVAILABLE:
+                client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+            else:
+                logger.warning("已配置 REDIS_URL 但 redis 未安装，仅使用进程内缓存")
+
+        self.client = client
+        self.node_id = uuid.uuid4().hex  # 用于忽略自己发出的失效消息
+        self.retry_interval = retry_interval
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+
+        self._unavailable_until: Optional[datetime] = None
+        self._listener = None
+        self._listener_lock = threading.Lock()  # 防止并发（或在 _call 中递归）启动订阅线程
+        self._invalidation_callback: Optional[Callable[[str], None]] = None
+        self._resubscribe_at: Optional[datetime] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'errors': 0,
+            'invalidations_sent': 0,
+            'invalidations_received': 0,
+            'resubscriptions': 0,
+        }
+
+        if self.client is not None:
+            self._call(self.client.ping)
+
+    @property
+    def available(self) -> bool:
+        """当前是否可以使用 Redis"""
+        if self.client is None:
+            return False
+        return self._unavailable_until is None or datetime.now() >= self._unavailable_until
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def _call(self, func: Callable, *args, default: Any = None, **kwargs) -> Any:
+        """
+        执行 Redis 操作；失败时记录并在 retry_interval 秒内退化为仅使用 L1
+
+        成功时如果失效频道的订阅已中断且到了重试时间，顺便重新订阅。
+        """
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._count('errors')
+            if self._unavailable_until is None or datetime.now() >= self._unavailable_until:
+                logger.warning(f"Redis 不可用，{self.retry_interval} 秒内仅使用进程内缓存: {e}")
+            self._unavailable_until = datetime.now() + timedelta(seconds=self.retry_interval)
+            return default
+
+        self._unavailable_until = None
+        if self._listener is None and self._invalidation_callback is not None:
+            if self._resubscribe_at is None or datetime.now() >= self._resubscribe_at:
+                self._start_listener()
+        return result
+
+    def _key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}{key}"
+
+    # ---------- 编码 ----------
+
+    def _encode(self, data: Any) -> bytes:
+        """编码缓存值：快照用 Arrow IPC（zstd 压缩），其他数据用压缩的 JSON"""
+        if isinstance(data, MarketSnapshot) and PYARROW_AVAILABLE:
+            table = build_snapshot_table(data)
+            compression = 'zstd' if pa.Codec.is_available('zstd') else None
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression=compression)) as writer:
+                writer.write_table(table)
+            return self.FORMAT_ARROW + sink.getvalue().to_pybytes()
+
+        body = json.dumps(data, default=_json_default, ensure_ascii=False, separators=(',', ':'))
+        return self.FORMAT_JSON + zlib.compress(body.encode('utf-8'))
+
+    def _decode(self, raw: bytes) -> Any:
+        """解码缓存值"""
+        marker, body = raw[:1], raw[1:]
+        if marker == self.FORMAT_ARROW:
+            table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+            return snapshot_from_table(table)
+        if marker == self.FORMAT_JSON:
+            return json.loads(zlib.decompress(body).decode('utf-8'), object_hook=_json_object_hook)
+        raise ValueError(f"未知的缓存值格式: {marker!r}")
+
+    # ---------- 读写 ----------
+
+    def get_fetched_at(self, key: str) -> Optional[datetime]:
+        """获取 L2 条目的数据获取时间（不读取数据本身）"""
+        if not self.available:
+            return None
+
+        raw = self._call(self.client.get, self._key(f"{key}:fetched_at"))
+        return datetime.fromisoformat(raw.decode() if isinstance(raw, bytes) else raw) if raw else None
+
+    def get(self, key: str, max_age: Optional[int] = None) -> Any:
+        """
+        读取 L2 条目
+
+        Args:
+            max_age: 只接受获取时间不超过 max_age 秒的数据（强制刷新时使用）
+        """
+        if not self.available:
+            return None
+
+        if max_age is not None:
+            fetched_at = self.get_fetched_at(key)
+            if fetched_at is None or datetime.now() - fetched_at >= timedelta(seconds=max_age):
+                self._count('misses')
+                return None
+
+        raw = self._call(self.client.get, self._key(key))
+        if raw is None:
+            self._count('misses')
+            return None
+
+        try:
+            data = self._decode(raw)
+        except Exception as e:
+            logger.error(f"解码 Redis 缓存 {key} 失败: {e}")
+            self._count('errors')
+            return None
+
+        self._count('hits')
+        return data
+
+    def set(self, key: str, data: Any, ttl: int, fetched_at: Optional[datetime] = None) -> bool:
+        """写入 L2 条目（数据和获取时间使用相同的TTL）"""
+        if not self.available:
+            return False
+
+        fetched_at = fetched_at or getattr(data, 'fetched_at', None) or datetime.now()
+        try:
+            value = self._encode(data)
+        except Exception as e:
+            logger.error(f"编码 Redis 缓存 {key} 失败: {e}")
+            return False
+
+        def write():
+            pipe = self.client.pipeline()
+            pipe.set(self._key(key), value, ex=ttl)
+            pipe.set(self._key(f"{key}:fetched_at"), fetched_at.isoformat(), ex=ttl)
+            pipe.execute()
+            return True
+
+        written = self._call(write, default=False)
+        if written:
+            self._count('writes')
+            logger.info(f"写入 Redis 缓存 {key}（{len(value) / 1024:.1f} KB，TTL {ttl} 秒）")
+        return written
+
+    def delete(self, key: str) -> None:
+        """删除 L2 条目"""
+        if self.available:
+            self._call(self.client.delete, self._key(key), self._key(f"{key}:fetched_at"))
+
+    @contextmanager
+    def lock(self, key: str, hold: Optional[float] = None) -> Iterator[bool]:
+        """
+        某个键的分布式锁（保证全集群同一时间只有一个节点从上游获取）
+
+        基于 SET NX PX 实现（不依赖 Lua 脚本，fakeredis 同样可用），锁在 lock_timeout 秒后
+        自动释放，防止持锁节点崩溃后死锁。最多等待 lock_wait 秒；Redis 不可用或等待超时时
+        返回 False，调用方自行获取。
+
+        Args:
+            hold: 持锁期间最长的上游调用耗时（秒，见 UpstreamClient.max_call_duration）。
+                  锁的自动释放时间和等待时间都至少为 hold + LOCK_MARGIN，
+                  避免慢速获取期间锁提前释放、等待者提前放弃而重复调用上游
+        """
+        if not self.available:
+            yield False
+            return
+
+        lock_timeout, lock_wait = self.lock_timeout, self.lock_wait
+        if hold:
+            lock_timeout = max(lock_timeout, hold + self.LOCK_MARGIN)
+            lock_wait = max(lock_wait, hold + self.LOCK_MARGIN)
+
+        lock_key = self._key(f"{key}:lock")
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + lock_wait
+        acquired = False
+
+        while self.available:
+            acquired = bool(self._call(self.client.set, lock_key, token, nx=True, px=int(lock_timeout * 1000)))
+            if acquired or time.monotonic() >= deadline:
+                break
+            time.sleep(self.LOCK_POLL_INTERVAL)
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                # 只释放自己持有的锁（锁可能已因超时自动释放并被其他节点获取）
+                holder = self._call(self.client.get, lock_key)
+                if holder is not None and (holder.decode() if isinstance(holder, bytes) else holder) == token:
+                    self._call(self.client.delete, lock_key)
+
+    # ---------- 失效广播 ----------
+
+    def publish_invalidation(self, key: str) -> None:
+        """广播某个键已更新，其他节点应丢弃各自的 L1 条目"""
+        if not self.available:
+            return
+
+        message = json.dumps({'node': self.node_id, 'key': key})
+        if self._call(self.client.publish, self.INVALIDATION_CHANNEL, message) is not None:
+            self._count('invalidations_sent')
+
+    def subscribe_invalidations(self, callback: Callable[[str], None]) -> bool:
+        """
+        在后台线程中订阅失效频道
+
+        Redis 暂时不可用或订阅连接中断时记住 callback，恢复后自动重新订阅。
+
+        Args:
+            callback: 收到其他节点的失效消息时调用，参数为缓存键
+
+        Returns:
+            当前是否已订阅
+        """
+        if self.client is None:
+            return False
+
+        self._invalidation_callback = callback
+        if self.available:
+            self._start_listener()
+        return self._listener is not None
+
+    def _start_listener(self) -> None:
+        """启动订阅线程（已在运行或正在由其他线程启动时直接返回）"""
+        if not self._listener_lock.acquire(blocking=False):
+            return
+        try:
+            if self._listener is not None or self._invalidation_callback is None:
+                return
+
+            callback = self._invalidation_callback
+
+            def handle(message):
+                try:
+                    payload = json.loads(message['data'])
+                except (TypeError, ValueError):
+                    return
+                if payload.get('node') == self.node_id:
+                    return
+
+                self._count('invalidations_received')
+                logger.info(f"收到缓存失效消息: {payload.get('key')}")
+                try:
+                    callback(payload.get('key'))
+                except Exception as e:
+                    logger.error(f"处理缓存失效消息 {payload.get('key')} 失败: {e}")
+
+            def start():
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.INVALIDATION_CHANNEL: handle})
+                return pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error)
+
+            resubscribe = self._resubscribe_at is not None
+            self._resubscribe_at = datetime.now() + timedelta(seconds=self.retry_interval)
+            self._listener = self._call(start)
+            if self._listener is not None:
+                self._resubscribe_at = None
+                if resubscribe:
+                    self._count('resubscriptions')
+                    logger.info("已重新订阅缓存失效频道")
+        finally:
+            self._listener_lock.release()
+
+    def _on_listener_error(self, error: BaseException, pubsub: Any, thread: Any) -> None:
+        """订阅线程中的连接错误：停止该线程，retry_interval 秒后重新订阅"""
+        self._count('errors')
+        logger.warning(f"缓存失效频道订阅中断，{self.retry_interval} 秒后重新订阅: {error}")
+        thread.stop()  # 线程退出循环后关闭 pubsub 连接
+        with self._listener_lock:
+            if self._listener is thread:
+                self._listener = None
+                self._resubscribe_at = datetime.now() + timedelta(seconds=self.retry_interval)
+
+    def close(self) -> None:
+        """停止订阅线程（不再重新订阅）"""
+        self._invalidation_callback = None
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+
+    def get_info(self) -> Dict:
+        """获取 L2 统计信息"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            'configured': self.client is not None,
+            'available': self.available,
+            'subscribed': self._listener is not None,
+            **stats,
+        }
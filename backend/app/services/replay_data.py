@@ -0,0 +1,263 @@
+"""
+上游数据录制与回放
+
+RealMarketDataService 只能对着真实 akshare 运行，MockDataService 只认识少量代码，
+在没有网络的机器上无法确定性地测试真实的解析、净值解析和校验路径。
+
+- MarketDataRecording：录制目录。每次上游调用（接口名 + 参数）的返回 DataFrame 保存为
+  一个 pickle 文件（保留 akshare 原始的列类型和混合类型列，回放时与真实返回完全一致），
+  manifest.json 记录录制时间、行数和当时的调用耗时
+- MarketDataRecorder / RecordingMarketDataService：有网络时调用真实 akshare 并录制结果
+- ReplayMarketDataService：RealMarketDataService 的子类，只把“调用 akshare”替换为读取录制文件，
+  之后的快照构建、净值列、校验、缓存和查询全部走真实代码；可注入固定延迟或按录制时的耗时回放
+
+录制文件只应来自自己录制的数据（pickle 加载时会执行其中的对象构造）。
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+import pandas as pd
+
+from .real_data import RealMarketDataService
+from .redis_cache import RedisMarketCache
+from .snapshot_store import SnapshotStore
+from .upstream import UpstreamClient
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMissError(LookupError):
+    """录制目录中没有这次调用的数据"""
+
+
+class MarketDataRecording:
+    """录制目录：按 接口名 + 参数 保存上游返回的 DataFrame"""
+
+    MANIFEST = 'manifest.json'
+    FILE_SUFFIX = '.pkl.gz'
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def call_key(endpoint: str, kwargs: Optional[Dict[str, Any]] = None) -> str:
+        """调用的唯一键（同时用作文件名），如 'stock_individual_info_em__symbol=600000'"""
+        parts = [endpoint] + [f"{name}={value}" for name, value in sorted((kwargs or {}).items())]
+        return re.sub(r'[^\w=.-]', '_', '__'.join(parts))
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.FILE_SUFFIX}"
+
+    def manifest(self) -> Dict[str, Dict]:
+        """格式: {调用键: {'endpoint', 'kwargs', 'rows', 'columns', 'elapsed', 'recorded_at'}}"""
+        path = self.directory / self.MANIFEST
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def save(self, endpoint: str, kwargs: Optional[Dict[str, Any]], frame: pd.DataFrame, elapsed: float) -> str:
+        """
+        保存一次调用的返回数据
+
+        Args:
+            elapsed: 录制时这次调用的耗时（秒），回放时可按此注入延迟
+
+        Returns:
+            调用键
+        """
+        key = self.call_key(endpoint, kwargs)
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            frame.to_pickle(self.path(key), compression='gzip')
+
+            manifest = self.manifest()
+            manifest[key] = {
+                'endpoint': endpoint,
+                'kwargs': dict(kwargs or {}),
+                'rows': len(frame),
+                'columns': [str(column) for column in frame.columns],
+                'elapsed': round(elapsed, 4),
+                'recorded_at': datetime.now().isoformat(),
+            }
+            (self.directory / self.MANIFEST).write_text(
+                json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8'
+            )
+
+        logger.info(f"已录制 {key}：{len(frame)} 行，耗时 {elapsed:.2f} 秒")
+        return key
+
+    def load(self, endpoint: str, kwargs: Optional[Dict[str, Any]] = None) -> Tuple[pd.DataFrame, Dict]:
+        """
+        读取一次调用的录制数据
+
+        Returns:
+            (DataFrame, manifest 条目)
+
+        Raises:
+            ReplayMissError: 没有录制这次调用
+        """
+        key = self.call_key(endpoint, kwargs)
+        path = self.path(key)
+        if not path.exists():
+            raise ReplayMissError(f"录制目录 {self.directory} 中没有 {key}")
+        return pd.read_pickle(path, compression='gzip'), self.manifest().get(key, {})
+
+
+class MarketDataRecorder:
+    """包装上游函数：调用真实接口并录制返回的 DataFrame"""
+
+    def __init__(self, recording: MarketDataRecording):
+        self.recording = recording
+
+    def wrap(self, endpoint: str, func: Callable[..., pd.DataFrame]) -> Callable[..., pd.DataFrame]:
+        def recorded(**kwargs) -> pd.DataFrame:
+            started = time.perf_counter()
+            frame = func(**kwargs)
+            self.recording.save(endpoint, kwargs, frame, time.perf_counter() - started)
+            return frame
+        return recorded
+
+    def record(self, endpoint: str, func: Callable[..., pd.DataFrame], **kwargs) -> pd.DataFrame:
+        """调用一次并录制"""
+        return self.wrap(endpoint, func)(**kwargs)
+
+
+class RecordingMarketDataService(RealMarketDataService):
+    """真实数据服务，同时把每次上游调用的返回数据录制到目录中"""
+
+    def __init__(self, recording_dir: Union[str, Path], **kwargs):
+        self.recorder = MarketDataRecorder(MarketDataRecording(recording_dir))
+        super().__init__(**kwargs)
+
+    def _upstream_function(self, endpoint: str) -> Callable[..., Any]:
+        return self.recorder.wrap(endpoint, super()._upstream_function(endpoint))
+
+
+class ReplayMarketDataService(RealMarketDataService):
+    """
+    回放录制数据的真实数据服务
+
+    只替换上游调用；快照、净值、校验、缓存等全部使用 RealMarketDataService 的实现。
+    默认不使用磁盘快照存储、Redis 和限流（避免与真实服务共享状态），上游调用保护不重试、不熔断。
+    """
+
+    def __init__(
+        self,
+        recording_dir: Union[str, Path],
+        latency: Union[None, float, Dict[str, float]] = None,
+        latency_scale: float = 1.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+        snapshot_store: Optional[SnapshotStore] = None,
+        l2_cache: Optional[RedisMarketCache] = None,
+        upstream: Optional[UpstreamClient] = None,
+    ):
+        """
+        Args:
+            recording_dir: 录制目录
+            latency: 注入的延迟（秒）：None 表示按录制时的耗时，数字为每次调用的固定延迟，
+                     字典按接口名指定（未列出的接口按录制耗时）
+            latency_scale: 延迟的缩放比例（0 表示不注入延迟）
+            jitter: 延迟的随机波动比例（如 0.2 表示 ±20%），由 seed 决定，结果可复现
+        """
+        self.recording = MarketDataRecording(recording_dir)
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._frames: Dict[str, Tuple[pd.DataFrame, Dict]] = {}  # 已读取的录制数据（回放时返回副本）
+        self._frames_lock = threading.Lock()
+        self.replay_counts: Dict[str, int] = {}
+
+        if snapshot_store is None:
+            snapshot_store = SnapshotStore(str(self.recording.directory / 'snapshots'), enabled=False)
+        if l2_cache is None:
+            l2_cache = RedisMarketCache()
+        if upstream is None:
+            upstream = UpstreamClient(timeout=0, max_retries=0, failure_threshold=0)
+        super().__init__(snapshot_store=snapshot_store, l2_cache=l2_cache, upstream=upstream)
+
+    @property
+    def upstream_available(self) -> bool:
+        return True
+
+    def _upstream_function(self, endpoint: str) -> Callable[..., Any]:
+        return lambda **kwargs: self._replay(endpoint, kwargs)
+
+    def _replay(self, endpoint: str, kwargs: Dict[str, Any]) -> pd.DataFrame:
+        """返回录制数据的副本（调用方修改不影响下一次回放），并按配置等待"""
+        key = self.recording.call_key(endpoint, kwargs)
+        with self._frames_lock:
+            loaded = self._frames.get(key)
+            if loaded is None:
+                loaded = self._frames[key] = self.recording.load(endpoint, kwargs)
+            self.replay_counts[key] = self.replay_counts.get(key, 0) + 1
+
+        frame, entry = loaded
+        delay = self._delay(endpoint, entry)
+        if delay > 0:
+            time.sleep(delay)
+        return frame.copy()
+
+    def _delay(self, endpoint: str, entry: Dict) -> float:
+        """本次回放注入的延迟（秒）"""
+        if isinstance(self.latency, dict):
+            base = self.latency.get(endpoint, entry.get('elapsed', 0.0))
+        elif self.latency is None:
+            base = entry.get('elapsed', 0.0)
+        else:
+            base = self.latency
+
+        delay = base * self.latency_scale
+        if self.jitter and delay > 0:
+            with self._rng_lock:
+                delay *= 1 + self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+    def get_replay_info(self) -> Dict:
+        """录制目录、可回放的调用和各调用的回放次数"""
+        with self._frames_lock:
+            counts = dict(self.replay_counts)
+        return {
+            'recording_dir': str(self.recording.directory),
+            'recorded': {key: entry['rows'] for key, entry in self.recording.manifest().items()},
+            'replays': counts,
+        }
+
+
+def record_market_data(recording_dir: Union[str, Path], stock_codes: Iterable[str] = (),
+                       endpoints: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    调用真实 akshare 录制全量接口（以及指定股票的个股信息）
+
+    Args:
+        stock_codes: 需要录制个股信息（stock_individual_info_em）的股票代码
+        endpoints: 需要录制的全量接口，默认为 RealMarketDataService 使用的全部全量接口
+
+    Returns:
+        {调用键: 行数}；失败的调用为 0
+    """
+    import akshare as ak
+
+    recorder = MarketDataRecorder(MarketDataRecording(recording_dir))
+    calls = [(endpoint, {}) for endpoint in (endpoints or RealMarketDataService.SNAPSHOT_ENDPOINTS.values())]
+    calls += [(RealMarketDataService.STOCK_INFO_ENDPOINT, {'symbol': code}) for code in stock_codes]
+
+    rows = {}
+    for endpoint, kwargs in calls:
+        key = MarketDataRecording.call_key(endpoint, kwargs)
+        try:
+            rows[key] = len(recorder.record(endpoint, getattr(ak, endpoint), **kwargs))
+        except Exception as e:
+            logger.error(f"录制 {key} 失败: {e}")
+            rows[key] = 0
+    return rows
@@ -0,0 +1,130 @@
+"""
+请求合并（single-flight）
+
+当缓存过期时，并发请求会同时发现缓存未命中并各自调用上游API（惊群效应）。
+SingleFlight 按键合并并发调用：同一个键同一时间只有一个调用方（leader）真正执行，
+其余调用方等待并复用 leader 的结果或异常。
+
+同时支持两类调用方，且二者共享同一张进行中调用表：
+- 同步代码（包括 FastAPI 放在线程池中运行的同步函数）：do()
+- asyncio 协程：do_async()，等待时不阻塞事件循环
+"""
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import Executor, Future
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """按键合并并发调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # 仅保护进行中调用表，不在持锁期间执行调用
+        self._calls: Dict[str, Future] = {}  # 格式: {key: 该键进行中调用的Future}
+        self._stats = {
+            'executions': 0,  # 实际执行次数（leader）
+            'coalesced_waits': 0,  # 同步调用方合并等待次数
+            'async_coalesced_waits': 0,  # 异步调用方合并等待次数
+        }
+
+    def _join_or_lead(self, key: str, wait_stat: str):
+        """
+        加入已有调用或成为leader
+
+        Returns:
+            (future, is_leader)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats[wait_stat] += 1
+                return future, False
+
+            future = Future()
+            self._calls[key] = future
+            self._stats['executions'] += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """leader 完成调用：先移出进行中调用表，再唤醒所有等待者"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        同步执行（或等待）键为 key 的调用
+
+        Args:
+            key: 合并键
+            fn: 无参可调用对象，仅由 leader 执行
+
+        Returns:
+            fn 的返回值；leader 抛出的异常会传递给所有等待者
+        """
+        future, is_leader = self._join_or_lead(key, 'coalesced_waits')
+        if not is_leader:
+            logger.debug(f"合并等待进行中的调用: {key}")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+
+        self._finish(key, future, result=result)
+        return result
+
+    async def do_async(self, key: str, fn: Callable[[], Any], executor: Optional[Executor] = None) -> Any:
+        """
+        异步执行（或等待）键为 key 的调用
+
+        leader 在线程池中执行阻塞的 fn，所有调用方（包括 leader）通过 asyncio.shield 等待共享结果，
+        都不会阻塞事件循环。取消某个调用方（如客户端断开）只影响它自己：
+        共享的 Future 不会被取消，fn 继续执行完毕，其余同步/异步等待者照常拿到结果。
+
+        Args:
+            key: 合并键
+            fn: 无参同步可调用对象，仅由 leader 执行
+            executor: 执行 fn 的线程池，默认使用事件循环的默认线程池
+        """
+        future, is_leader = self._join_or_lead(key, 'async_coalesced_waits')
+        if not is_leader:
+            logger.debug(f"异步合并等待进行中的调用: {key}")
+        else:
+            def run() -> None:
+                # 在工作线程中完成共享 Future，与 leader 协程是否被取消无关
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self._finish(key, future, error=e)
+                else:
+                    self._finish(key, future, result=result)
+
+            try:
+                asyncio.get_running_loop().run_in_executor(executor, run)
+            except BaseException as e:
+                # 线程池已关闭等提交失败的情况
+                self._finish(key, future, error=e)
+                raise
+
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def in_flight(self) -> int:
+        """当前进行中的调用数"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取合并统计信息"""
+        with self._lock:
+            return {**self._stats, 'in_flight': len(self._calls)}
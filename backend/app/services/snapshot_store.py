@@ -0,0 +1,290 @@
+"""
+全量快照磁盘存储
+
+AssetCache 只存在于进程内存中，每次重启或部署后第一批请求都要重新下载
+LOF、ETF、开放式基金的全量数据。SnapshotStore 把获取到的快照以 Arrow IPC（Feather v2）
+列式格式保存到磁盘，并在文件的 schema 元数据中记录：
+- 快照类型、代码列、名称列
+- 获取时间（fetched_at）和对应的交易日（trading_date）
+
+服务启动时读取这些文件，按交易日历判断是否仍然有效，有效则直接放入缓存。
+
+多 worker 共享：
+- 文件以不压缩的 Arrow IPC 格式写入，读取时内存映射（只读），列数据零拷贝，
+  所有 worker 共享操作系统页缓存中的同一份数据
+- 新版本写入临时文件后用 os.replace 原子替换；已映射旧版本的进程不受影响，
+  下次加载时读到新版本
+- Windows 不允许替换仍被映射的文件，因此在 Windows 上不使用内存映射（读取时复制到进程内存）
+- 获取上游数据前持有跨进程文件锁，同一时间只有一个进程下载同一类快照，
+  其他进程等待后直接映射它写入的新版本
+
+依赖 pyarrow（可选），未安装时存储功能自动禁用。
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import os
+
+import pandas as pd
+
+from .market_snapshot import MarketSnapshot
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，跨进程锁退化为空操作
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+METADATA_KEY = b'bafangce.snapshot'  # schema 元数据中保存快照信息的键
+FORMAT_VERSION = 4  # 2: 不压缩，支持内存映射零拷贝读取；3: ETF和开放式基金快照包含派生净值列；4: 包含校验标记列
+
+
+def _frame_to_table(frame: pd.DataFrame) -> 'pa.Table':
+    """
+    DataFrame 转换为 Arrow 表
+
+    akshare 返回的部分列混有数字和字符串（如 '---'），无法推断统一类型；
+    这些列按字符串保存（空值保持为空）。
+    """
+    try:
+        return pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        frame = frame.copy()
+        for column in frame.columns:
+            if frame[column].dtype == object:
+                frame[column] = frame[column].map(lambda value: None if pd.isna(value) else str(value))
+        return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def build_snapshot_table(snapshot: MarketSnapshot, trading_date: Optional[str] = None) -> 'pa.Table':
+    """把快照转换为带快照元数据的 Arrow 表（磁盘存储和 Redis 共用同一格式）"""
+    table = snapshot.arrow_table if snapshot.is_memory_mapped else _frame_to_table(snapshot.frame)
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'snapshot_type': snapshot.snapshot_type,
+        'code_column': snapshot.code_column,
+        'name_column': snapshot.name_column,
+        'fetched_at': snapshot.fetched_at.isoformat(),
+        'trading_date': trading_date,
+        'rows': len(snapshot),
+    }
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[METADATA_KEY] = json.dumps(metadata).encode('utf-8')
+    return table.replace_schema_metadata(schema_metadata)
+
+
+def parse_snapshot_metadata(schema: 'pa.Schema') -> Optional[Dict]:
+    """从 schema 元数据中解析快照信息，缺少元数据或格式版本不符时返回 None"""
+    raw = (schema.metadata or {}).get(METADATA_KEY)
+    if raw is None:
+        return None
+
+    metadata = json.loads(raw.decode('utf-8'))
+    if metadata.get('format_version') != FORMAT_VERSION:
+        return None
+    return metadata
+
+
+def snapshot_from_table(table: 'pa.Table', zero_copy: bool = True) -> Optional[MarketSnapshot]:
+    """
+    从带快照元数据的 Arrow 表恢复快照
+
+    Args:
+        zero_copy: True 时直接基于 Arrow 表（不复制列数据），否则转换为 DataFrame
+    """
+    metadata = parse_snapshot_metadata(table.schema)
+    if metadata is None:
+        return None
+
+    fetched_at = datetime.fromisoformat(metadata['fetched_at'])
+    if zero_copy:
+        return MarketSnapshot.from_arrow(
+            table, metadata['code_column'], metadata['name_column'], metadata['snapshot_type'], fetched_at
+        )
+    return MarketSnapshot(
+        table.to_pandas(), metadata['code_column'], metadata['name_column'], metadata['snapshot_type'],
+        fetched_at=fetched_at,
+    )
+
+
+class SnapshotStore:
+    """全量快照的磁盘存储（Arrow IPC 格式）"""
+
+    FILE_SUFFIX = '.arrow'
+    LOCK_SUFFIX = '.lock'
+
+    def __init__(self, directory: str, enabled: bool = True, memory_map: bool = True):
+        """
+        Args:
+            directory: 快照文件目录
+            enabled: 是否启用（pyarrow 不可用时总是禁用）
+            memory_map: 加载时是否内存映射（零拷贝，多进程共享页缓存）
+        """
+        self.directory = Path(directory)
+        self.enabled = enabled and PYARROW_AVAILABLE
+        self.memory_map = memory_map
+
+        if memory_map and os.name == 'nt':
+            # 映射中的快照文件无法被 os.replace 覆盖，第一次保存之后的所有保存都会失败
+            logger.warning("Windows 下无法替换已内存映射的快照文件，快照存储改为非映射读取")
+            self.memory_map = False
+
+        if enabled and not PYARROW_AVAILABLE:
+            logger.warning("pyarrow不可用，快照磁盘存储已禁用")
+
+    def path(self, snapshot_type: str) -> Path:
+        """快照文件路径"""
+        return self.directory / f"{snapshot_type}{self.FILE_SUFFIX}"
+
+    def save(self, snapshot: MarketSnapshot, trading_date: str) -> bool:
+        """
+        保存快照
+
+        先写入临时文件再原子替换，读取方不会读到写了一半的文件。
+
+        Args:
+            snapshot: 要保存的快照
+            trading_date: 快照对应的交易日（YYYY-MM-DD）
+        """
+        if not self.enabled:
+            return False
+
+        try:
+            table = build_snapshot_table(snapshot, trading_date)
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            target = self.path(snapshot.snapshot_type)
+            temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+            # 不压缩：读取时可以直接内存映射，无需解压到进程内存
+            feather.write_feather(table, str(temp), compression='uncompressed')
+            try:
+                os.replace(temp, target)
+            except OSError:
+                temp.unlink(missing_ok=True)
+                raise
+
+            logger.info(f"快照已保存: {target}（{len(snapshot)} 行，交易日 {trading_date}）")
+            return True
+
+        except PermissionError as e:
+            logger.error(f"保存 {snapshot.snapshot_type} 快照失败（文件被占用或被其他进程映射，无法替换）: {e}")
+            return False
+
+        except Exception as e:
+            logger.error(f"保存 {snapshot.snapshot_type} 快照失败: {e}")
+            return False
+
+    def read_metadata(self, snapshot_type: str) -> Optional[Dict]:
+        """只读取快照元数据（不加载数据）"""
+        if not self.enabled:
+            return None
+
+        path = self.path(snapshot_type)
+        if not path.exists():
+            return None
+
+        try:
+            with pa.memory_map(str(path), 'r') as source:
+                schema = pa.ipc.open_file(source).schema
+            return parse_snapshot_metadata(schema)
+        except Exception as e:
+            logger.error(f"读取 {snapshot_type} 快照元数据失败: {e}")
+            return None
+
+    def load(self, snapshot_type: str) -> Optional[Tuple[MarketSnapshot, Dict]]:
+        """
+        加载快照
+
+        启用内存映射时返回基于映射文件的 Arrow 快照（零拷贝）；文件随后被新版本替换
+        也不影响已返回的快照，映射会一直有效到快照被释放。
+
+        Returns:
+            (快照, 元数据)；文件不存在、格式版本不符或读取失败时返回 None
+        """
+        if not self.enabled:
+            return None
+
+        path = self.path(snapshot_type)
+        if not path.exists():
+            return None
+
+        try:
+            if self.memory_map:
+                with pa.memory_map(str(path), 'r') as source:
+                    table = pa.ipc.open_file(source).read_all()
+            else:
+                table = feather.read_table(str(path), memory_map=False)
+
+            snapshot = snapshot_from_table(table, zero_copy=self.memory_map)
+            if snapshot is None:
+                logger.warning(f"快照文件 {path} 缺少元数据或格式版本不符，忽略")
+                return None
+
+            return snapshot, parse_snapshot_metadata(table.schema)
+
+        except Exception as e:
+            logger.error(f"加载 {snapshot_type} 快照失败: {e}")
+            return None
+
+    @contextmanager
+    def lock(self, snapshot_type: str) -> Iterator[None]:
+        """
+        某类快照的跨进程排他锁（用于保证同一时间只有一个进程从上游获取）
+
+        存储禁用或平台不支持 fcntl 时为空操作。
+        """
+        if not self.enabled or fcntl is None:
+            yield
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / f"{snapshot_type}{self.LOCK_SUFFIX}", 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def delete(self, snapshot_type: str) -> bool:
+        """删除快照文件"""
+        path = self.path(snapshot_type)
+        if path.exists():
+            path.unlink()
+            return True
+        return False
+
+    def snapshot_types(self) -> List[str]:
+        """已保存的快照类型"""
+        if not self.enabled or not self.directory.exists():
+            return []
+        return sorted(p.stem for p in self.directory.glob(f"*{self.FILE_SUFFIX}"))
+
+    def get_info(self) -> Dict:
+        """获取存储信息"""
+        snapshots = {}
+        for snapshot_type in self.snapshot_types():
+            metadata = self.read_metadata(snapshot_type) or {}
+            snapshots[snapshot_type] = {
+                'fetched_at': metadata.get('fetched_at'),
+                'trading_date': metadata.get('trading_date'),
+                'rows': metadata.get('rows'),
+                'size_bytes': self.path(snapshot_type).stat().st_size,
+            }
+
+        return {
+            'enabled': self.enabled,
+            'memory_map': self.memory_map,
+            'directory': str(self.directory),
+            'snapshots': snapshots,
+        }
@@ -0,0 +1,263 @@
+"""
+全量快照的向量化校验
+
+原实现每次查询一只基金都对它的行字典重新做一遍同样的检查（代码、名称、价格、净值等）。
+这里在每次获取快照后对整张表一次性做列式检查，把结果保存为每行一个位掩码（校验标记列），
+查询时只需读取该行的掩码并解码为原因。
+
+检查项：
+- 代码、名称缺失
+- 价格/净值缺失、格式错误、非正数或超出合理范围
+- 净值日期落后于快照中最新的净值日期（该基金当日净值尚未公布，如海外基金）
+- 与上一版本快照相比价格跳变过大
+
+每种快照有各自的致命检查项（与原逐行校验一致，命中即视为无效）；其余检查项只作为警告。
+"""
+from typing import Dict, Optional
+from enum import IntFlag
+
+import numpy as np
+import pandas as pd
+
+from .market_snapshot import MarketSnapshot
+from .nav_columns import (
+    LATEST_ACCUMULATED_NAV, LATEST_NAV, LATEST_UNIT_NAV, MAX_VALID_NAV, MIN_VALID_NAV,
+    ensure_nav_columns, parse_nav_fields,
+)
+
+VALIDATION_COLUMN = '校验标记'  # 每行的校验位掩码
+
+LOF_MAX_PRICE = 1000  # LOF基金价格一般不会超过1000
+MAX_GROWTH_RATE = 50  # 增长率超过50%可能是异常
+MAX_DISCOUNT_RATE = 20  # 折价率超过20%可能是异常
+PRICE_JUMP_THRESHOLD = 0.2  # 与上一版本快照相比价格变动超过20%视为跳变
+
+
+class ValidationFlag(IntFlag):
+    """校验位"""
+    MISSING_CODE = 1 << 0
+    MISSING_NAME = 1 << 1
+    MISSING_PRICE = 1 << 2
+    MALFORMED_PRICE = 1 << 3
+    NON_POSITIVE_PRICE = 1 << 4
+    PRICE_OUT_OF_RANGE = 1 << 5
+    NEGATIVE_VOLUME = 1 << 6
+    NO_VALID_NAV = 1 << 7
+    ABNORMAL_GROWTH = 1 << 8
+    ABNORMAL_DISCOUNT = 1 << 9
+    STALE_NAV = 1 << 10
+    PRICE_JUMP = 1 << 11
+
+
+# 校验位 → (原因代码, 说明)
+FLAG_REASONS = {
+    ValidationFlag.MISSING_CODE: ('missing_code', '代码为空'),
+    ValidationFlag.MISSING_NAME: ('missing_name', '名称为空'),
+    ValidationFlag.MISSING_PRICE: ('missing_price', '价格为空'),
+    ValidationFlag.MALFORMED_PRICE: ('malformed_price', '价格格式错误'),
+    ValidationFlag.NON_POSITIVE_PRICE: ('non_positive_price', '价格或最新净值非正数'),
+    ValidationFlag.PRICE_OUT_OF_RANGE: ('price_out_of_range', '价格或最新净值超出合理范围'),
+    ValidationFlag.NEGATIVE_VOLUME: ('negative_volume', '成交量为负数'),
+    ValidationFlag.NO_VALID_NAV: ('no_valid_nav', '没有有效的净值数据'),
+    ValidationFlag.ABNORMAL_GROWTH: ('abnormal_growth', '增长率异常'),
+    ValidationFlag.ABNORMAL_DISCOUNT: ('abnormal_discount', '折价率异常'),
+    ValidationFlag.STALE_NAV: ('stale_nav', '净值日期落后于最新净值日期'),
+    ValidationFlag.PRICE_JUMP: ('price_jump', '与上一版本快照相比价格跳变'),
+}
+
+# 各类快照的致命检查项（与原逐行校验一致），其余为警告
+FATAL_FLAGS = {
+    'lof': (ValidationFlag.MISSING_CODE | ValidationFlag.MISSING_NAME | ValidationFlag.MISSING_PRICE
+            | ValidationFlag.MALFORMED_PRICE | ValidationFlag.NON_POSITIVE_PRICE
+            | ValidationFlag.PRICE_OUT_OF_RANGE | ValidationFlag.NEGATIVE_VOLUME),
+    'etf': (ValidationFlag.MISSING_NAME | ValidationFlag.NO_VALID_NAV
+            | ValidationFlag.ABNORMAL_GROWTH | ValidationFlag.ABNORMAL_DISCOUNT),
+    'open_fund': ValidationFlag.MISSING_CODE | ValidationFlag.MISSING_NAME | ValidationFlag.NO_VALID_NAV,
+}
+
+
+def _is_blank(values: pd.Series) -> np.ndarray:
+    """空值或空字符串"""
+    return (values.isna() | (values.astype(object) == '')).to_numpy()
+
+
+def _percentage(values: pd.Series) -> pd.Series:
+    """百分比列转换为数值（去除百分号，无法转换为 NaN）"""
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype(object).map(lambda value: value.strip().replace('%', '') if isinstance(value, str) else value)
+    return pd.to_numeric(values, errors='coerce')
+
+
+def _column(frame: pd.DataFrame, column: str) -> pd.Series:
+    if column in frame.columns:
+        return frame[column]
+    return pd.Series(None, index=frame.index, dtype=object)
+
+
+def _set(mask: np.ndarray, condition, flag: ValidationFlag) -> None:
+    mask[np.asarray(condition, dtype=bool)] |= int(flag)
+
+
+def snapshot_prices(frame: pd.DataFrame, snapshot_type: str) -> pd.Series:
+    """快照的价格列：LOF 为最新价，ETF 为最新净值，开放式基金为最新单位净值（其次累计净值）"""
+    if snapshot_type == 'lof':
+        return pd.to_numeric(_column(frame, '最新价'), errors='coerce')
+    if snapshot_type == 'etf':
+        return pd.to_numeric(_column(frame, LATEST_NAV.value), errors='coerce')
+    unit_nav = pd.to_numeric(_column(frame, LATEST_UNIT_NAV.value), errors='coerce')
+    return unit_nav.fillna(pd.to_numeric(_column(frame, LATEST_ACCUMULATED_NAV.value), errors='coerce'))
+
+
+def _nav_dates(frame: pd.DataFrame, snapshot_type: str) -> pd.Series:
+    """每行所用净值的日期"""
+    if snapshot_type == 'etf':
+        return pd.to_datetime(_column(frame, LATEST_NAV.date))
+    unit_dates = pd.to_datetime(_column(frame, LATEST_UNIT_NAV.date))
+    return unit_dates.fillna(pd.to_datetime(_column(frame, LATEST_ACCUMULATED_NAV.date)))
+
+
+def add_validation_column(
+    frame: pd.DataFrame,
+    snapshot_type: str,
+    code_column: str,
+    name_column: str,
+    previous: Optional[MarketSnapshot] = None,
+) -> pd.DataFrame:
+    """
+    对整张表做列式校验，返回增加了校验标记列的新 DataFrame
+
+    ETF 和开放式基金需要先经过 add_nav_columns 处理（使用派生净值列）。
+
+    Args:
+        snapshot_type: 'lof' / 'etf' / 'open_fund'
+        previous: 上一版本的同类快照，用于检查价格跳变
+    """
+    mask = np.zeros(len(frame), dtype=np.int32)
+
+    _set(mask, _is_blank(_column(frame, code_column)), ValidationFlag.MISSING_CODE)
+    _set(mask, _is_blank(_column(frame, name_column)), ValidationFlag.MISSING_NAME)
+
+    if snapshot_type == 'lof':
+        raw_price = _column(frame, '最新价')
+        missing = _is_blank(raw_price)
+        price = pd.to_numeric(raw_price, errors='coerce').to_numpy(dtype=float)
+        with np.errstate(invalid='ignore'):
+            _set(mask, missing, ValidationFlag.MISSING_PRICE)
+            _set(mask, ~missing & np.isnan(price), ValidationFlag.MALFORMED_PRICE)
+            _set(mask, price <= 0, ValidationFlag.NON_POSITIVE_PRICE)
+            _set(mask, price > LOF_MAX_PRICE, ValidationFlag.PRICE_OUT_OF_RANGE)
+            volume = pd.to_numeric(_column(frame, '成交量'), errors='coerce').to_numpy(dtype=float)
+            _set(mask, volume < 0, ValidationFlag.NEGATIVE_VOLUME)
+    else:
+        _set(mask, snapshot_prices(frame, snapshot_type).isna(), ValidationFlag.NO_VALID_NAV)
+
+        # 最新日期的净值字段有值但不在有效范围内（可能回退到了历史净值）
+        nav_fields = parse_nav_fields(frame.columns)
+        if nav_fields:
+            newest = nav_fields[0].date
+            for nav_field in nav_fields:
+                if nav_field.date != newest:
+                    break
+                values = pd.to_numeric(frame[nav_field.field], errors='coerce').to_numpy(dtype=float)
+                with np.errstate(invalid='ignore'):
+                    _set(mask, values <= 0, ValidationFlag.NON_POSITIVE_PRICE)
+                    _set(mask, (values > 0) & ((values <= MIN_VALID_NAV) | (values >= MAX_VALID_NAV)),
+                         ValidationFlag.PRICE_OUT_OF_RANGE)
+
+            nav_dates = _nav_dates(frame, snapshot_type)
+            _set(mask, nav_dates.notna() & (nav_dates < pd.Timestamp(newest)), ValidationFlag.STALE_NAV)
+
+        if snapshot_type == 'etf':
+            with np.errstate(invalid='ignore'):
+                _set(mask, _percentage(_column(frame, '增长率')).abs() > MAX_GROWTH_RATE, ValidationFlag.ABNORMAL_GROWTH)
+                _set(mask, _percentage(_column(frame, '折价率')).abs() > MAX_DISCOUNT_RATE, ValidationFlag.ABNORMAL_DISCOUNT)
+
+    if previous is not None and not previous.empty:
+        _set(mask, _price_jumps(frame, snapshot_type, code_column, previous), ValidationFlag.PRICE_JUMP)
+
+    return frame.assign(**{VALIDATION_COLUMN: mask})
+
+
+def _price_jumps(frame: pd.DataFrame, snapshot_type: str, code_column: str, previous: MarketSnapshot) -> np.ndarray:
+    """与上一版本快照（按代码对齐）相比价格变动超过阈值的行"""
+    previous_frame = previous.select_frame([
+        previous.code_column, '最新价', LATEST_NAV.value, LATEST_UNIT_NAV.value, LATEST_ACCUMULATED_NAV.value,
+    ])
+    previous_prices = pd.Series(
+        snapshot_prices(previous_frame, snapshot_type).to_numpy(),
+        index=previous_frame[previous.code_column].astype(str),
+    )
+    previous_prices = previous_prices[~previous_prices.index.duplicated(keep='first')]
+
+    current = snapshot_prices(frame, snapshot_type).to_numpy(dtype=float)
+    before = frame[code_column].astype(str).map(previous_prices).to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (before > 0) & (current > 0) & (np.abs(current / before - 1) > PRICE_JUMP_THRESHOLD)
+
+
+def decode_flags(flags: int, snapshot_type: str) -> Dict:
+    """
+    把校验位掩码解码为校验结果
+
+    Returns:
+        {'valid': 是否通过致命检查, 'issues': 致命问题说明, 'warnings': 警告说明,
+         'reasons': 全部原因代码, 'flags': 位掩码}
+    """
+    flags = int(flags or 0)
+    fatal = int(FATAL_FLAGS[snapshot_type])
+    issues, warnings, reasons = [], [], []
+    for flag, (reason, message) in FLAG_REASONS.items():
+        if flags & flag:
+            reasons.append(reason)
+            (issues if flag & fatal else warnings).append(message)
+
+    return {
+        'valid': not flags & fatal,
+        'issues': issues,
+        'warnings': warnings,
+        'reasons': reasons,
+        'flags': flags,
+    }
+
+
+def quality_report(snapshot: MarketSnapshot) -> Dict:
+    """
+    快照质量报告：各检查项未通过的行数
+
+    Returns:
+        {'snapshot_type', 'fetched_at', 'rows', 'valid_rows', 'invalid_rows',
+         'fatal_checks': [导致该类快照的行无效的原因代码],
+         'checks': {原因代码: 行数}}
+    """
+    flags = snapshot.select_frame([VALIDATION_COLUMN]).get(VALIDATION_COLUMN)
+    flags = np.zeros(len(snapshot), dtype=np.int32) if flags is None else flags.fillna(0).to_numpy(dtype=np.int32)
+    fatal = int(FATAL_FLAGS[snapshot.snapshot_type])
+
+    checks = {
+        reason: int(np.count_nonzero(flags & int(flag)))
+        for flag, (reason, _) in FLAG_REASONS.items()
+    }
+    invalid = int(np.count_nonzero(flags & fatal))
+
+    return {
+        'snapshot_type': snapshot.snapshot_type,
+        'fetched_at': snapshot.fetched_at.isoformat(),
+        'rows': len(snapshot),
+        'valid_rows': len(snapshot) - invalid,
+        'invalid_rows': invalid,
+        'fatal_checks': [reason for flag, (reason, _) in FLAG_REASONS.items() if flag & fatal],
+        'checks': checks,
+    }
+
+
+def validate_record(record: Dict, snapshot_type: str, code_column: str, name_column: str) -> Dict:
+    """
+    单行记录的校验结果：快照记录直接解码校验标记列，其他来源的单行数据现场计算
+
+    现场计算时没有上一版本快照，不检查价格跳变。
+    """
+    flags = record.get(VALIDATION_COLUMN)
+    if flags is None:
+        frame = pd.DataFrame([record if snapshot_type == 'lof' else ensure_nav_columns(record)])
+        flags = add_validation_column(frame, snapshot_type, code_column, name_column)[VALIDATION_COLUMN].iloc[0]
+    return decode_flags(flags, snapshot_type)
@@ -0,0 +1,398 @@
+"""
+合成市场数据生成器
+
+按随机种子生成任意规模的股票、ETF、LOF 和开放式基金（可复现），供 MockDataService 和基准测试使用：
+- 代码按各类型真实的代码段分配，互不重复
+- 名称由基金公司/主题/份额类别组合而成，覆盖 AssetCategoryMappingService 的分类关键字
+- 每个资产沿最近 days 个交易日生成几何布朗运动（GBM）价格/净值路径，波动率按主题区分（债券、货币基金波动很小）
+- 可导出与 akshare 全量接口同结构的 DataFrame（带日期的净值列、百分比字符串、当日净值未公布等情况）
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ..models.enums import AssetType
+from .trading_calendar import trading_calendar
+
+TRADING_DAYS_PER_YEAR = 250
+
+# 各类型的代码段 [起, 止)，按顺序分配
+CODE_RANGES: Dict[AssetType, List[Tuple[int, int]]] = {
+    AssetType.STOCK: [(600000, 610000), (1, 5000), (300000, 302000), (688000, 690000), (830000, 840000)],
+    AssetType.ETF_FUND: [(510000, 520000), (159000, 160000), (560000, 564000), (588000, 589000)],
+    AssetType.LOF_FUND: [(160000, 170000), (501000, 503000)],
+    AssetType.OPEN_FUND: [(5000, 100000), (960000, 1000000)],
+}
+
+# 全市场各类型数量的大致比例（开放式基金约 2 万只、A 股约 5400 只、ETF 约 1200 只、LOF 约 400 只）
+MARKET_SHARES: Dict[AssetType, float] = {
+    AssetType.OPEN_FUND: 0.74,
+    AssetType.STOCK: 0.20,
+    AssetType.ETF_FUND: 0.045,
+    AssetType.LOF_FUND: 0.015,
+}
+
+FUND_COMPANIES = [
+    "华夏", "易方达", "南方", "嘉实", "广发", "博时", "华安", "富国", "招商", "国泰",
+    "汇添富", "天弘", "工银", "建信", "鹏华", "景顺长城", "大成", "银华", "兴全", "中欧",
+]
+
+# 主题：(名称片段, 年化波动率)
+ETF_THEMES = [
+    ("沪深300", 0.20), ("中证500", 0.24), ("中证1000", 0.28), ("科创50", 0.32), ("创业板", 0.30),
+    ("半导体", 0.38), ("证券", 0.30), ("医药", 0.26), ("银行", 0.18), ("红利", 0.15),
+    ("黄金", 0.15), ("白银", 0.28), ("豆粕", 0.22), ("能源化工", 0.26), ("有色金属", 0.28), ("原油", 0.35),
+    ("日经225", 0.22), ("纳指100", 0.25), ("标普500", 0.18),
+    ("国债", 0.03), ("10年期国债", 0.04), ("信用债", 0.02), ("可转债", 0.10), ("短债", 0.01), ("长久期国债", 0.06),
+]
+LOF_THEMES = [
+    ("原油", 0.35), ("白银", 0.28), ("黄金", 0.15), ("豆粕", 0.22), ("能源", 0.26), ("有色", 0.28),
+    ("日经", 0.22), ("纳指", 0.25), ("标普", 0.18), ("恒生", 0.24), ("沪深300", 0.20), ("中证500", 0.24),
+    ("美元债", 0.04), ("债券", 0.03), ("国债", 0.03), ("信用债", 0.02), ("可转债", 0.10), ("短债", 0.01), ("纯债", 0.02),
+]
+OPEN_FUND_THEMES = [
+    ("纯债债券", 0.02), ("中短债债券", 0.01), ("短债债券", 0.01), ("信用债债券", 0.02), ("可转债债券", 0.10),
+    ("企业债债券", 0.02), ("国债债券", 0.03), ("长久期纯债", 0.04), ("短融债券", 0.005),
+    ("货币", 0.0), ("黄金ETF联接", 0.15), ("原油", 0.35), ("美元债", 0.04), ("商品", 0.20),
+    ("成长混合", 0.28), ("价值精选混合", 0.22), ("医疗健康股票", 0.28), ("新能源混合", 0.34),
+    ("沪深300指数增强", 0.20), ("中证红利指数", 0.15), ("消费升级混合", 0.25), ("科技创新混合", 0.32),
+]
+STOCK_PREFIXES = ["中", "华", "东方", "海", "国", "长江", "新", "金", "恒", "天", "宏", "泰", "安", "远", "永", "中科", "航天"]
+STOCK_MIDDLES = ["信", "达", "通", "科", "泰", "丰", "源", "瑞", "康", "宇", "德", "晟"]
+STOCK_SUFFIXES = ["银行", "证券", "科技", "电子", "医药", "能源", "股份", "集团", "控股", "新材", "智能", "电气", "化工", "食品", "地产"]
+
+
+def allocate_codes(asset_type: AssetType, count: int, exclude: Iterable[str] = ()) -> List[str]:
+    """
+    按代码段顺序分配 count 个代码（跳过 exclude 中的代码）
+
+    Raises:
+        ValueError: 代码段容量不足
+    """
+    excluded = set(exclude)
+    codes = []
+    for start, stop in CODE_RANGES[asset_type]:
+        for number in range(start, stop):
+            if len(codes) >= count:
+                return codes
+            code = f"{number:06d}"
+            if code not in excluded:
+                codes.append(code)
+    if len(codes) < count:
+        raise ValueError(f"{asset_type.value} 代码段只能容纳 {len(codes)} 个代码，无法生成 {count} 个")
+    return codes
+
+
+class SyntheticMarket:
+    """
+    可复现的合成市场
+
+    相同的参数和种子生成完全相同的代码、名称和价格路径。
+    价格路径存放在 (资产数, 交易日数) 的矩阵中，最后一列为最新交易日。
+    """
+
+    def __init__(
+        self,
+        stocks: int = 0,
+        etfs: int = 0,
+        lofs: int = 0,
+        open_funds: int = 0,
+        days: int = 60,
+        seed: int = 0,
+        end_date: Optional[date] = None,
+        exclude: Iterable[str] = (),
+    ):
+        """
+        Args:
+            days: 价格路径覆盖的交易日数（至少 2 天，用于计算涨跌）
+            end_date: 最新交易日，默认为今天或之前最近的交易日
+            exclude: 不分配的代码（如 MockDataService 中手写的资产）
+        """
+        if days < 2:
+            raise ValueError("days 至少为 2")
+
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+
+        end_date = trading_calendar.latest_trading_day(end_date or date.today())
+        self.dates: List[date] = [trading_calendar.shift_trading_days(end_date, offset - days + 1) for offset in range(days)]
+
+        counts = {
+            AssetType.STOCK: stocks,
+            AssetType.ETF_FUND: etfs,
+            AssetType.LOF_FUND: lofs,
+            AssetType.OPEN_FUND: open_funds,
+        }
+        self.codes: Dict[AssetType, List[str]] = {}
+        self.names: Dict[AssetType, List[str]] = {}
+        self.paths: Dict[AssetType, np.ndarray] = {}
+        self._positions: Dict[str, Tuple[AssetType, int]] = {}
+
+        excluded = set(exclude)
+        for asset_type, count in counts.items():
+            codes = allocate_codes(asset_type, count, excluded)
+            names, sigma = self._generate_names(asset_type, count)
+            self.codes[asset_type] = codes
+            self.names[asset_type] = names
+            self.paths[asset_type] = self._generate_paths(asset_type, sigma, days)
+            for index, code in enumerate(codes):
+                self._positions[code] = (asset_type, index)
+
+        # 各类型的附加字段（同样由种子决定）
+        self._accumulated_offset = {
+            asset_type: self._rng.uniform(0, 1.5, count).round(4) for asset_type, count in counts.items()
+        }
+        self._volumes = {
+            asset_type: self._rng.lognormal(13, 1.5, count).astype(np.int64) for asset_type, count in counts.items()
+        }
+        self._premiums = {
+            asset_type: self._rng.normal(0, 0.005, count) for asset_type, count in counts.items()
+        }
+
+    @classmethod
+    def of_size(cls, total: int, **kwargs) -> 'SyntheticMarket':
+        """按全市场各类型的比例生成共约 total 个资产"""
+        counts = {asset_type: int(total * share) for asset_type, share in MARKET_SHARES.items()}
+        counts[AssetType.OPEN_FUND] += total - sum(counts.values())
+        return cls(
+            stocks=counts[AssetType.STOCK],
+            etfs=counts[AssetType.ETF_FUND],
+            lofs=counts[AssetType.LOF_FUND],
+            open_funds=counts[AssetType.OPEN_FUND],
+            **kwargs,
+        )
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._positions
+
+    @property
+    def latest_date(self) -> date:
+        return self.dates[-1]
+
+    def _generate_names(self, asset_type: AssetType, count: int) -> Tuple[List[str], np.ndarray]:
+        """生成名称和对应主题的年化波动率"""
+        rng = self._rng
+        if asset_type == AssetType.STOCK:
+            prefixes = rng.integers(len(STOCK_PREFIXES), size=count)
+            middles = rng.integers(len(STOCK_MIDDLES), size=count)
+            suffixes = rng.integers(len(STOCK_SUFFIXES), size=count)
+            names = [
+                f"{STOCK_PREFIXES[p]}{STOCK_MIDDLES[m]}{STOCK_SUFFIXES[s]}"
+                for p, m, s in zip(prefixes, middles, suffixes)
+            ]
+            return names, rng.uniform(0.25, 0.55, count)
+
+        themes = {
+            AssetType.ETF_FUND: ETF_THEMES,
+            AssetType.LOF_FUND: LOF_THEMES,
+            AssetType.OPEN_FUND: OPEN_FUND_THEMES,
+        }[asset_type]
+        companies = rng.integers(len(FUND_COMPANIES), size=count)
+        picks = rng.integers(len(themes), size=count)
+        share_classes = rng.integers(2, size=count)
+
+        names = []
+        for company, pick, share_class in zip(companies, picks, share_classes):
+            theme = themes[pick][0]
+            if asset_type == AssetType.ETF_FUND:
+                names.append(f"{FUND_COMPANIES[company]}{theme}ETF")
+            elif asset_type == AssetType.LOF_FUND:
+                names.append(f"{FUND_COMPANIES[company]}{theme}LOF")
+            else:
+                names.append(f"{FUND_COMPANIES[company]}{theme}{'AC'[share_class]}")
+        sigma = np.array([themes[pick][1] for pick in picks], dtype=float)
+        return names, sigma
+
+    def _generate_paths(self, asset_type: AssetType, sigma: np.ndarray, days: int) -> np.ndarray:
+        """几何布朗运动：S_t = S_0 · exp(Σ((μ - σ²/2)Δt + σ√Δt · Z))"""
+        rng = self._rng
+        count = len(sigma)
+        if asset_type == AssetType.STOCK:
+            start = rng.lognormal(2.5, 0.8, count).clip(1.5, 1500)
+        elif asset_type == AssetType.OPEN_FUND:
+            start = rng.uniform(0.8, 3.5, count)
+        else:
+            start = rng.uniform(0.5, 5.0, count)
+        # 货币基金净值固定为 1
+        start = np.where(sigma == 0, 1.0, start)
+
+        dt = 1 / TRADING_DAYS_PER_YEAR
+        mu = rng.normal(0.05, 0.1, count) * (sigma > 0)
+        shocks = rng.standard_normal((count, days - 1))
+        drift = ((mu - sigma ** 2 / 2) * dt)[:, None]
+        steps = drift + (sigma * np.sqrt(dt))[:, None] * shocks
+
+        log_paths = np.zeros((count, days))
+        log_paths[:, 1:] = np.cumsum(steps, axis=1)
+        decimals = 2 if asset_type == AssetType.STOCK else 4
+        return (start[:, None] * np.exp(log_paths)).round(decimals)
+
+    def price_history(self, code: str) -> List[Tuple[date, float]]:
+        """代码的价格（净值）路径 [(交易日, 价格), ...]；代码不存在时为空列表"""
+        position = self._positions.get(code)
+        if position is None:
+            return []
+        asset_type, index = position
+        return list(zip(self.dates, self.paths[asset_type][index].tolist()))
+
+    def iter_assets(self) -> Iterator[Dict]:
+        """逐个生成与 MockDataService.MOCK_ASSETS 同结构的资产字典（最新交易日的行情）"""
+        for asset_type, codes in self.codes.items():
+            paths = self.paths[asset_type]
+            if not codes:
+                continue
+            latest, previous = paths[:, -1], paths[:, -2]
+            change = latest - previous
+            percent = np.divide(change, previous, out=np.zeros_like(change), where=previous != 0) * 100
+            volumes = self._volumes[asset_type]
+            offsets = self._accumulated_offset[asset_type]
+            premiums = self._premiums[asset_type]
+
+            for index, code in enumerate(codes):
+                price = float(latest[index])
+                asset = {
+                    "code": code,
+                    "name": self.names[asset_type][index],
+                    "type": asset_type,
+                    "price": price,
+                    "change_amount": round(float(change[index]), 4),
+                    "change_percent": round(float(percent[index]), 2),
+                    "prev_close": float(previous[index]),
+                }
+                if asset_type != AssetType.OPEN_FUND:
+                    asset["volume"] = int(volumes[index])
+                    asset["turnover"] = round(float(volumes[index]) * price, 2)
+                if asset_type != AssetType.STOCK:
+                    nav = price if asset_type == AssetType.OPEN_FUND else round(price / (1 + premiums[index]), 4)
+                    asset["unit_net_value"] = nav
+                    asset["accumulated_net_value"] = round(nav + float(offsets[index]), 4)
+                yield asset
+
+    def assets(self) -> Dict[str, Dict]:
+        """{代码: 资产字典}"""
+        return {asset["code"]: asset for asset in self.iter_assets()}
+
+    def _frame_rng(self, asset_type: AssetType) -> np.random.Generator:
+        """导出全量数据用的独立随机源（结果与调用顺序无关）"""
+        return np.random.default_rng([self.seed, list(AssetType).index(asset_type)])
+
+    def _nav_columns(self, asset_type: AssetType, unpublished: float = 0.0) -> Dict[str, np.ndarray]:
+        """最近两个交易日的 '{日期}-单位净值' / '{日期}-累计净值' 列（unpublished 比例的当日净值为空）"""
+        paths = self.paths[asset_type]
+        nav_latest = paths[:, -1].astype(float)
+        nav_previous = paths[:, -2]
+        if asset_type != AssetType.OPEN_FUND:
+            nav_latest = (nav_latest / (1 + self._premiums[asset_type])).round(4)
+            nav_previous = (nav_previous / (1 + self._premiums[asset_type])).round(4)
+        if unpublished:
+            nav_latest[self._frame_rng(asset_type).random(len(nav_latest)) < unpublished] = np.nan
+
+        offsets = self._accumulated_offset[asset_type]
+        latest, previous = self.dates[-1].isoformat(), self.dates[-2].isoformat()
+        return {
+            f"{latest}-单位净值": nav_latest,
+            f"{latest}-累计净值": (nav_latest + offsets).round(4),
+            f"{previous}-单位净值": nav_previous,
+            f"{previous}-累计净值": (nav_previous + offsets).round(4),
+        }
+
+    def open_fund_frame(self, unpublished: float = 0.1) -> pd.DataFrame:
+        """与 ak.fund_open_fund_daily_em() 同结构（当日净值未公布的行为空）"""
+        columns = self._nav_columns(AssetType.OPEN_FUND, unpublished)
+        latest, previous = list(columns.values())[0], list(columns.values())[2]
+        growth = latest - previous
+        return pd.DataFrame({
+            '基金代码': self.codes[AssetType.OPEN_FUND],
+            '基金简称': self.names[AssetType.OPEN_FUND],
+            **columns,
+            '日增长值': growth.round(4),
+            '日增长率': (growth / previous * 100).round(2),
+            '申购状态': '开放申购',
+            '赎回状态': '开放赎回',
+            '手续费': '0.15%',
+        })
+
+    def etf_frame(self, unpublished: float = 0.02) -> pd.DataFrame:
+        """与 ak.fund_etf_fund_daily_em() 同结构（增长率、折价率为百分比字符串）"""
+        columns = self._nav_columns(AssetType.ETF_FUND, unpublished)
+        latest, previous = list(columns.values())[0], list(columns.values())[2]
+        growth = latest - previous
+        market_price = self.paths[AssetType.ETF_FUND][:, -1]
+        discount = (market_price / latest - 1) * 100
+        return pd.DataFrame({
+            '基金代码': self.codes[AssetType.ETF_FUND],
+            '基金简称': self.names[AssetType.ETF_FUND],
+            '类型': '指数型-股票',
+            **columns,
+            '增长值': growth.round(4),
+            '增长率': [f"{value:.2f}%" if np.isfinite(value) else '' for value in growth / previous * 100],
+            '市价': market_price,
+            '折价率': [f"{value:.2f}%" if np.isfinite(value) else '' for value in discount],
+        })
+
+    def _spot_columns(self, asset_type: AssetType) -> Dict[str, np.ndarray]:
+        """实时行情的公共列"""
+        rng = self._frame_rng(asset_type)
+        paths = self.paths[asset_type]
+        price, prev_close = paths[:, -1], paths[:, -2]
+        count = len(price)
+        decimals = 2 if asset_type == AssetType.STOCK else 3
+        intraday = np.abs(rng.normal(0, 0.01, (2, count)))
+        volumes = self._volumes[asset_type]
+        market_cap = rng.lognormal(22, 1.2, count).round(0)
+        return {
+            '最新价': price,
+            '涨跌幅': ((price / prev_close - 1) * 100).round(2),
+            '涨跌额': (price - prev_close).round(decimals),
+            '成交量': volumes,
+            '成交额': (volumes * price).round(0),
+            '最高': (np.maximum(price, prev_close) * (1 + intraday[0])).round(decimals),
+            '最低': (np.minimum(price, prev_close) * (1 - intraday[1])).round(decimals),
+            '今开': prev_close,
+            '昨收': prev_close,
+            '换手率': rng.uniform(0.1, 10, count).round(2),
+            '总市值': market_cap,
+            '流通市值': (market_cap * rng.uniform(0.3, 1.0, count)).round(0),
+        }
+
+    def lof_frame(self) -> pd.DataFrame:
+        """与 ak.fund_lof_spot_em() 同结构"""
+        spot = self._spot_columns(AssetType.LOF_FUND)
+        return pd.DataFrame({
+            '代码': self.codes[AssetType.LOF_FUND],
+            '名称': self.names[AssetType.LOF_FUND],
+            '最新价': spot['最新价'],
+            '涨跌额': spot['涨跌额'],
+            '涨跌幅': spot['涨跌幅'],
+            '成交量': spot['成交量'],
+            '成交额': spot['成交额'],
+            '开盘价': spot['今开'],
+            '最高价': spot['最高'],
+            '最低价': spot['最低'],
+            '昨收': spot['昨收'],
+            '换手率': spot['换手率'],
+            '流通市值': spot['流通市值'],
+            '总市值': spot['总市值'],
+        })
+
+    def stock_spot_frame(self) -> pd.DataFrame:
+        """与 ak.stock_zh_a_spot_em() 同结构"""
+        return pd.DataFrame({
+            '代码': self.codes[AssetType.STOCK],
+            '名称': self.names[AssetType.STOCK],
+            **self._spot_columns(AssetType.STOCK),
+        })
+
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        """{akshare 接口名: 全量数据}，可直接保存为回放录制"""
+        return {
+            'fund_open_fund_daily_em': self.open_fund_frame(),
+            'fund_etf_fund_daily_em': self.etf_frame(),
+            'fund_lof_spot_em': self.lof_frame(),
+            'stock_zh_a_spot_em': self.stock_spot_frame(),
+        }
@@ -0,0 +1,189 @@
+"""
+沪深交易所交易日历
+
+内置上交所/深交所历年休市安排（仅列出落在工作日的休市日，周末本就不交易；
+调休上班的周末交易所同样休市）。日历加载为覆盖区间内逐日的位图和前缀和数组：
+- 是否交易日：O(1) 位图查询
+- 两个日期之间的交易日数：O(1) 前缀和相减
+- 下一个/上一个交易日、前后第N个交易日：O(log n) 二分查找
+
+覆盖区间之外的日期退化为"工作日即交易日"的规则，每年新的休市安排公布后
+在 EXCHANGE_HOLIDAYS 中补充即可。
+"""
+from typing import Dict, List, Optional, Union
+from datetime import date, datetime, timedelta
+from array import array
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 交易所休市日（工作日部分），来源：上交所、深交所年度休市安排公告
+EXCHANGE_HOLIDAYS: Dict[int, List[str]] = {
+    2023: [
+        "2023-01-02",  # 元旦
+        "2023-01-23", "2023-01-24", "2023-01-25", "2023-01-26", "2023-01-27",  # 春节
+        "2023-04-05",  # 清明节
+        "2023-05-01", "2023-05-02", "2023-05-03",  # 劳动节
+        "2023-06-22", "2023-06-23",  # 端午节
+        "2023-09-29", "2023-10-02", "2023-10-03", "2023-10-04", "2023-10-05", "2023-10-06",  # 中秋节、国庆节
+    ],
+    2024: [
+        "2024-01-01",  # 元旦
+        "2024-02-09", "2024-02-12", "2024-02-13", "2024-02-14", "2024-02-15", "2024-02-16",  # 春节
+        "2024-04-04", "2024-04-05",  # 清明节
+        "2024-05-01", "2024-05-02", "2024-05-03",  # 劳动节
+        "2024-06-10",  # 端午节
+        "2024-09-16", "2024-09-17",  # 中秋节
+        "2024-10-01", "2024-10-02", "2024-10-03", "2024-10-04", "2024-10-07",  # 国庆节
+    ],
+    2025: [
+        "2025-01-01",  # 元旦
+        "2025-01-28", "2025-01-29", "2025-01-30", "2025-01-31", "2025-02-03", "2025-02-04",  # 春节
+        "2025-04-04",  # 清明节
+        "2025-05-01", "2025-05-02", "2025-05-05",  # 劳动节
+        "2025-06-02",  # 端午节
+        "2025-10-01", "2025-10-02", "2025-10-03", "2025-10-06", "2025-10-07", "2025-10-08",  # 国庆节、中秋节
+    ],
+    2026: [
+        "2026-01-01", "2026-01-02",  # 元旦
+        "2026-02-16", "2026-02-17", "2026-02-18", "2026-02-19", "2026-02-20", "2026-02-23",  # 春节
+        "2026-04-06",  # 清明节
+        "2026-05-01", "2026-05-04", "2026-05-05",  # 劳动节
+        "2026-06-19",  # 端午节
+        "2026-09-25",  # 中秋节
+        "2026-10-01", "2026-10-02", "2026-10-05", "2026-10-06", "2026-10-07",  # 国庆节
+    ],
+}
+
+DateLike = Union[date, datetime, str]
+
+
+def _to_date(value: DateLike) -> date:
+    """统一转换为 date（支持 date、datetime 和 'YYYY-MM-DD' 字符串）"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class TradingCalendar:
+    """交易日历（预计算位图）"""
+
+    def __init__(self, holidays: Optional[Dict[int, List[str]]] = None):
+        holidays = EXCHANGE_HOLIDAYS if holidays is None else holidays
+        years = sorted(holidays)
+
+        self.first_day = date(years[0], 1, 1)
+        self.last_day = date(years[-1], 12, 31)
+        self._base = self.first_day.toordinal()
+        span = self.last_day.toordinal() - self._base + 1
+
+        holiday_ordinals = {
+            _to_date(day).toordinal() for year in years for day in holidays[year]
+        }
+
+        # 位图：第 i 位表示 first_day + i 天是否为交易日
+        self._bitmap = bytearray(span)
+        # 前缀和：_prefix[i] 为 [first_day, first_day + i) 内的交易日数
+        self._prefix = array('I', [0]) * (span + 1)
+        # 所有交易日的序数（升序），用于二分查找
+        self._trading_ordinals: List[int] = []
+
+        for i in range(span):
+            ordinal = self._base + i
+            is_trading = date.fromordinal(ordinal).weekday() < 5 and ordinal not in holiday_ordinals
+            self._bitmap[i] = is_trading
+            self._prefix[i + 1] = self._prefix[i] + is_trading
+            if is_trading:
+                self._trading_ordinals.append(ordinal)
+
+        self._warned_years = set()
+        logger.info(f"交易日历已加载: {self.first_day} ~ {self.last_day}，共 {len(self._trading_ordinals)} 个交易日")
+
+    def covers(self, day: DateLike) -> bool:
+        """日期是否在内置日历覆盖范围内"""
+        return self.first_day <= _to_date(day) <= self.last_day
+
+    def _warn_uncovered(self, day: date) -> None:
+        """超出覆盖范围时按年提示一次"""
+        if day.year not in self._warned_years:
+            self._warned_years.add(day.year)
+            logger.warning(f"{day.year} 年不在内置交易日历中，按工作日规则判断交易日")
+
+    def is_trading_day(self, day: DateLike) -> bool:
+        """是否为交易日"""
+        day = _to_date(day)
+        if not self.covers(day):
+            self._warn_uncovered(day)
+            return day.weekday() < 5
+        return bool(self._bitmap[day.toordinal() - self._base])
+
+    def next_trading_day(self, day: DateLike) -> date:
+        """指定日期之后（不含当天）的下一个交易日"""
+        return self.shift_trading_days(day, 1)
+
+    def previous_trading_day(self, day: DateLike) -> date:
+        """指定日期之前（不含当天）的上一个交易日"""
+        return self.shift_trading_days(day, -1)
+
+    def latest_trading_day(self, day: DateLike) -> date:
+        """不晚于指定日期的最近一个交易日（当天是交易日则返回当天）"""
+        day = _to_date(day)
+        if self.is_trading_day(day):
+            return day
+        return self.previous_trading_day(day)
+
+    def shift_trading_days(self, day: DateLike, offset: int) -> date:
+        """
+        从指定日期移动 offset 个交易日
+
+        offset > 0 向后、offset < 0 向前，不含当天；offset == 0 返回当天。
+        """
+        day = _to_date(day)
+        if offset == 0:
+            return day
+
+        ordinal = day.toordinal()
+        if offset > 0:
+            index = bisect.bisect_right(self._trading_ordinals, ordinal) + offset - 1
+        else:
+            index = bisect.bisect_left(self._trading_ordinals, ordinal) + offset
+
+        if 0 <= index < len(self._trading_ordinals) and self.covers(day):
+            return date.fromordinal(self._trading_ordinals[index])
+
+        return self._shift_by_weekday_rule(day, offset)
+
+    def _shift_by_weekday_rule(self, day: date, offset: int) -> date:
+        """超出覆盖范围时逐日移动"""
+        step = 1 if offset > 0 else -1
+        remaining = abs(offset)
+        current = day
+        while remaining:
+            current += timedelta(days=step)
+            if self.is_trading_day(current):
+                remaining -= 1
+        return current
+
+    def trading_days_between(self, start: DateLike, end: DateLike) -> int:
+        """闭区间 [start, end] 内的交易日数（start 晚于 end 时返回 0）"""
+        start, end = _to_date(start), _to_date(end)
+        if start > end:
+            return 0
+
+        if self.covers(start) and self.covers(end):
+            return self._prefix[end.toordinal() - self._base + 1] - self._prefix[start.toordinal() - self._base]
+
+        count = 0
+        current = start
+        while current <= end:
+            count += self.is_trading_day(current)
+            current += timedelta(days=1)
+        return count
+
+
+# 全局交易日历实例
+trading_calendar = TradingCalendar()
@@ -0,0 +1,484 @@
+"""
+上游调用保护（超时、重试、熔断、延迟统计）
+
+akshare 的接口本身没有超时：上游卡住时调用线程会一直阻塞，持有快照锁和请求合并的
+所有等待者一起卡住；上游故障期间每个缓存未命中都会再打一次已经失败的接口。
+
+UpstreamClient 包装所有上游调用，按接口（endpoint，如 'fund_lof_spot_em'）分别处理：
+- 超时：调用在有界线程池中执行，超过截止时间即放弃等待（抛出 UpstreamTimeout）；
+  被放弃的调用无法中断，会在后台继续运行直至返回，线程池大小限制了这类调用的数量
+- 重试：只重试临时性错误（超时、网络错误），次数有上限，两次尝试之间按指数退避加全抖动等待
+- 总截止时间：一次调用的所有尝试、退避和限流等待合计不超过 deadline，每次尝试的截止时间
+  不超过剩余时间，剩余时间不够再退避一次时不再重试；调用方（如持有分布式锁的节点）
+  因此可以知道一次调用最长会占用多久
+- 熔断：连续临时性错误达到阈值后熔断器打开，之后的调用直接失败（CircuitOpenError），
+  不再访问上游；冷却时间过后放行一次探测调用，成功则恢复，失败则继续熔断
+- 限流：每次调用前从 RateLimiter 取一个令牌，超出上游请求预算时排队或直接拒绝；
+  预算按逻辑调用计，重试不再取令牌（全量接口的桶容量很小，按尝试计时重试会被限流器拒绝，
+  掩盖真正的上游错误），重试次数本身由 max_retries 和总截止时间限制
+- 统计：每个接口的调用延迟直方图、按类型的错误计数、重试/超时/熔断/限流次数
+
+熔断期间由调用方（RealMarketDataService）退回到最近一次成功获取的数据。
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+import logging
+import random
+import threading
+import time
+
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    """上游调用失败"""
+
+
+class UpstreamTimeout(UpstreamError):
+    """上游调用超过截止时间"""
+
+
+class CircuitOpenError(UpstreamError):
+    """熔断器打开，调用未发往上游"""
+
+
+class RateLimitExceeded(UpstreamError):
+    """超出上游请求预算且等待超过上限，调用未发往上游（见 rate_limiter）"""
+
+
+# 临时性错误（超时、网络错误，OSError 包含 ConnectionError 和 TimeoutError）：会被重试，
+# 并计入熔断器的连续失败次数；其他异常（如数据格式错误）直接抛出
+TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (UpstreamTimeout, OSError)
+if REQUESTS_AVAILABLE:
+    TRANSIENT_ERRORS += (requests.RequestException,)
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图（毫秒）"""
+
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)  # 最后一个桶为超出最大分桶的调用
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float) -> None:
+        index = next((i for i, bound in enumerate(self.BUCKETS_MS) if elapsed_ms <= bound), len(self.BUCKETS_MS))
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """分位数估计：返回第 q 分位所在分桶的上界（落在最后一个桶时返回最大值）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return float(self.BUCKETS_MS[index]) if index < len(self.BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict:
+        labels = [f"<={bound}" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}"]
+        return {
+            'count': self.count,
+            'mean': round(self.total_ms / self.count, 1) if self.count else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max_ms, 1),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class CircuitBreaker:
+    """
+    单个接口的熔断器
+
+    - closed：正常放行，连续失败达到 failure_threshold 次后打开
+    - open：直接拒绝，打开 reset_timeout 秒后进入 half_open
+    - half_open：只放行一次探测调用，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            failure_threshold: 打开熔断器所需的连续失败次数，0 表示不熔断
+            reset_timeout: 打开后多久允许探测调用（秒）
+            clock: 单调时钟（可替换，便于模拟）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        """当前状态（调用方持有 _lock）；冷却时间已过的 open 视为 half_open"""
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """是否放行一次调用（half_open 状态只放行一次探测）"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """距离允许探测调用还有多少秒（未打开时为 0）"""
+        with self._lock:
+            if self._current_state() != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        记录一次临时性失败
+
+        Returns:
+            本次失败是否使熔断器打开
+        """
+        with self._lock:
+            self._consecutive_failures += 1
+            state = self._current_state()
+            should_open = state == self.HALF_OPEN or (
+                self.failure_threshold and self._consecutive_failures >= self.failure_threshold
+            )
+            if not should_open or state == self.OPEN:
+                return False
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self._probe_in_flight = False
+            return True
+
+    def release_probe(self) -> None:
+        """探测调用以非临时性错误结束时释放探测名额（不改变状态）"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def get_info(self) -> Dict:
+        with self._lock:
+            state = self._current_state()
+            retry_after = (
+                max(0.0, self.reset_timeout - (self._clock() - self._opened_at)) if state == self.OPEN else 0.0
+            )
+            return {
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'retry_after': round(retry_after, 1),
+            }
+
+
+class _EndpointStats:
+    """单个接口的调用统计"""
+
+    def __init__(self):
+        # calls / successes / failures / attempts / retries / timeouts / deadline_exceeded / short_circuited /
+        # rate_limited / fallbacks
+        self.counters = Counter()
+        self.errors = Counter()  # 格式: {异常类型名: 次数}
+        self.latency = LatencyHistogram()  # 每次尝试（含失败）的耗时
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[datetime] = None
+        self.last_success_at: Optional[datetime] = None
+
+
+class UpstreamClient:
+    """带超时、重试、熔断和延迟统计的上游调用包装"""
+
+    def __init__(
+        self,
+        timeout: float = 30,
+        deadline: float = 0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60,
+        max_workers: int = 8,
+        timeouts: Optional[Dict[str, float]] = None,
+        rate_limiter: Any = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            timeout: 单次尝试的默认截止时间（秒），0 表示不限制（在调用线程中直接执行）
+            deadline: 一次调用（所有尝试、退避和限流等待）合计的截止时间（秒），0 表示不限制
+            max_retries: 临时性错误的最大重试次数（不含首次尝试）
+            backoff_base: 退避基数（秒），第 n 次重试前等待 [0, min(backoff_max, backoff_base × 2^n)] 内的随机时间
+            backoff_max: 单次退避等待上限（秒）
+            failure_threshold: 熔断器打开所需的连续失败次数，0 表示不熔断
+            reset_timeout: 熔断器打开后多久放行探测调用（秒）
+            max_workers: 执行上游调用的线程数（超时后仍在运行的调用也占用线程）
+            timeouts: 按接口覆盖截止时间，格式: {endpoint: 秒}
+            rate_limiter: 上游请求限流器（RateLimiter），None 表示不限流
+            sleep / rng / clock: 退避等待函数、随机数生成器和熔断器、总截止时间使用的单调时钟（可替换，便于模拟）
+        """
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_workers = max_workers
+        self.timeouts = dict(timeouts or {})
+        self.rate_limiter = rate_limiter
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, _EndpointStats] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """某个接口的熔断器（首次使用时创建）"""
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout, self._clock)
+                self._breakers[endpoint] = breaker
+                self._stats[endpoint] = _EndpointStats()
+            return breaker
+
+    def is_open(self, endpoint: str) -> bool:
+        """接口的熔断器是否打开（冷却中，调用会被直接拒绝）"""
+        return self.breaker(endpoint).state == CircuitBreaker.OPEN
+
+    def max_call_duration(self, endpoint: str) -> Optional[float]:
+        """
+        一次 call 最长占用调用方多少秒
+
+        设置了总截止时间时即为 deadline；否则按单次截止时间、重试次数、退避上限和限流等待上限估算。
+        不限制单次尝试（timeout 为 0）且没有总截止时间时返回 None。
+        """
+        if self.deadline:
+            return float(self.deadline)
+
+        timeout = self.timeouts.get(endpoint, self.timeout)
+        if not timeout:
+            return None
+        rate_wait = max(self.rate_limiter.max_waits.values()) if self.rate_limiter is not None else 0.0
+        backoff = sum(min(self.backoff_max, self.backoff_base * 2 ** attempt) for attempt in range(self.max_retries))
+        return rate_wait + timeout * (self.max_retries + 1) + backoff
+
+    def call(self, endpoint: str, func: Callable[..., Any], *args, timeout: Optional[float] = None,
+             deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        通过保护层调用上游
+
+        Args:
+            endpoint: 接口名（熔断和统计的粒度）
+            func: 上游调用
+            timeout: 覆盖本次调用的单次尝试截止时间（秒）
+            deadline: 覆盖本次调用的总截止时间（秒）
+
+        Returns:
+            func 的返回值
+
+        Raises:
+            CircuitOpenError: 熔断器打开，未调用上游
+            RateLimitExceeded: 超出上游请求预算，未调用上游
+            UpstreamTimeout: 最后一次尝试超时，或总截止时间已用尽
+            其他异常: 重试耗尽后最后一次的临时性错误，或首次出现的非临时性错误
+        """
+        breaker = self.breaker(endpoint)
+        stats = self._stats[endpoint]
+        if timeout is None:
+            timeout = self.timeouts.get(endpoint, self.timeout)
+        if deadline is None:
+            deadline = self.deadline
+        deadline_at = self._clock() + deadline if deadline else None
+
+        self._count(stats, 'calls')
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self._count(stats, 'short_circuited')
+                raise CircuitOpenError(f"{endpoint} 熔断中，{breaker.retry_after():.0f} 秒后重试")
+
+            if self.rate_limiter is not None and attempt == 0:
+                try:
+                    self.rate_limiter.acquire(endpoint, timeout=self._remaining(deadline_at))
+                except RateLimitExceeded:
+                    breaker.release_probe()
+                    self._count(stats, 'rate_limited')
+                    raise
+
+            # 每次尝试的截止时间不超过总截止时间的剩余部分
+            attempt_timeout = timeout
+            remaining = self._remaining(deadline_at)
+            if remaining is not None:
+                if remaining <= 0:
+                    breaker.release_probe()
+                    self._count(stats, 'deadline_exceeded')
+                    self._count(stats, 'failures')
+                    raise UpstreamTimeout(f"{endpoint} 已用尽总截止时间 {deadline:g} 秒")
+                attempt_timeout = min(timeout, remaining) if timeout else remaining
+
+            self._count(stats, 'attempts')
+            started = time.perf_counter()
+            try:
+                result = self._run(endpoint, func, args, kwargs, attempt_timeout)
+            except TRANSIENT_ERRORS as e:
+                self._record_error(stats, e, started)
+                if breaker.record_failure():
+                    logger.error(f"上游接口 {endpoint} 连续失败，熔断 {self.reset_timeout:.0f} 秒: {e}")
+                if attempt >= self.max_retries or breaker.state != CircuitBreaker.CLOSED:
+                    self._count(stats, 'failures')
+                    raise
+
+                delay = self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                remaining = self._remaining(deadline_at)
+                if remaining is not None and remaining <= delay:
+                    self._count(stats, 'deadline_exceeded')
+                    self._count(stats, 'failures')
+                    logger.warning(f"上游接口 {endpoint} 调用失败（{type(e).__name__}: {e}），"
+                                   f"总截止时间 {deadline:g} 秒已不足以再次重试")
+                    raise
+
+                attempt += 1
+                self._count(stats, 'retries')
+                logger.warning(f"上游接口 {endpoint} 调用失败（{type(e).__name__}: {e}），"
+                               f"{delay:.2f} 秒后第 {attempt} 次重试")
+                self._sleep(delay)
+                continue
+            except Exception as e:
+                # 非临时性错误（参数错误、数据格式变化等）重试无益，也不代表上游不可用
+                self._record_error(stats, e, started)
+                breaker.release_probe()
+                self._count(stats, 'failures')
+                raise
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            breaker.record_success()
+            with self._lock:
+                stats.latency.record(elapsed_ms)
+                stats.counters['successes'] += 1
+                stats.last_success_at = datetime.now()
+            return result
+
+    def _remaining(self, deadline_at: Optional[float]) -> Optional[float]:
+        """总截止时间的剩余秒数（没有总截止时间时为 None）"""
+        return None if deadline_at is None else deadline_at - self._clock()
+
+    def _run(self, endpoint: str, func: Callable[..., Any], args: tuple, kwargs: Dict, timeout: float) -> Any:
+        """执行一次尝试；有截止时间时在线程池中执行并限时等待"""
+        if not timeout:
+            return func(*args, **kwargs)
+
+        future = self._get_executor().submit(func, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()  # 仍在排队时直接取消；已在运行的调用无法中断，返回后结果被丢弃
+            with self._lock:
+                self._stats[endpoint].counters['timeouts'] += 1
+            raise UpstreamTimeout(f"{endpoint} 超过 {timeout:g} 秒未返回") from None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upstream")
+            return self._executor
+
+    def _count(self, stats: _EndpointStats, counter: str) -> None:
+        with self._lock:
+            stats.counters[counter] += 1
+
+    def _record_error(self, stats: _EndpointStats, error: BaseException, started: float) -> None:
+        with self._lock:
+            stats.latency.record((time.perf_counter() - started) * 1000)
+            stats.errors[type(error).__name__] += 1
+            stats.last_error = f"{type(error).__name__}: {error}"
+            stats.last_error_at = datetime.now()
+
+    def record_fallback(self, endpoint: str) -> None:
+        """记录一次调用方因上游不可用而退回旧数据"""
+        self.breaker(endpoint)
+        self._count(self._stats[endpoint], 'fallbacks')
+
+    def endpoints(self) -> List[str]:
+        with self._lock:
+            return sorted(self._breakers)
+
+    def get_info(self) -> Dict:
+        """获取配置和各接口的熔断状态、调用统计、错误计数和延迟直方图"""
+        endpoints = {}
+        for endpoint in self.endpoints():
+            breaker_info = self._breakers[endpoint].get_info()
+            stats = self._stats[endpoint]
+            with self._lock:
+                endpoints[endpoint] = {
+                    **breaker_info,
+                    **{key: stats.counters[key] for key in (
+                        'calls', 'successes', 'failures', 'attempts', 'retries', 'timeouts',
+                        'deadline_exceeded', 'short_circuited', 'rate_limited', 'fallbacks',
+                    )},
+                    'errors': dict(stats.errors),
+                    'latency_ms': stats.latency.to_dict(),
+                    'last_error': stats.last_error,
+                    'last_error_at': stats.last_error_at.isoformat() if stats.last_error_at else None,
+                    'last_success_at': stats.last_success_at.isoformat() if stats.last_success_at else None,
+                }
+
+        return {
+            'timeout': self.timeout,
+            'deadline': self.deadline,
+            'timeouts': dict(self.timeouts),
+            'max_retries': self.max_retries,
+            'failure_threshold': self.failure_threshold,
+            'reset_timeout': self.reset_timeout,
+            'rate_limiter': self.rate_limiter.get_info() if self.rate_limiter is not None else None,
+            'endpoints': endpoints,
+        }
+
+    def shutdown(self) -> None:
+        """关闭线程池（不等待仍在运行的调用）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
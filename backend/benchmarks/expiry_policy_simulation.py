@@ -0,0 +1,66 @@
+"""
+缓存过期策略模拟
+
+模拟一周内每隔固定分钟数就有一次请求访问全量快照，统计两种策略下的上游API调用次数：
+- 固定TTL：LOF 30分钟、开放式基金 1小时（重构前的配置）
+- CacheExpiryPolicy：按交易日历计算数据下一次可能变化的时刻
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.expiry_policy_simulation
+    python -m benchmarks.expiry_policy_simulation --start 2026-10-12 --days 7 --interval 1
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from app.services.real_data import CacheExpiryPolicy, TradingTimeHelper
+
+FIXED_TTLS = {
+    'lof': 1800,
+    'open_fund': 3600,
+    'etf': 1800,
+}
+
+
+def simulate(data_kind: str, start: datetime, days: int, interval_minutes: int, ttl_func) -> dict:
+    """按请求间隔推进时间，缓存过期时计一次上游调用"""
+    helper = TradingTimeHelper()
+    end = start + timedelta(days=days)
+    current = start
+    expiry = None
+    fetches = {'trading_hours': 0, 'off_hours': 0}
+
+    while current < end:
+        if expiry is None or current >= expiry:
+            bucket = 'trading_hours' if helper.is_trading_hours(current) else 'off_hours'
+            fetches[bucket] += 1
+            expiry = current + timedelta(seconds=ttl_func(data_kind, current))
+        current += timedelta(minutes=interval_minutes)
+
+    return fetches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存过期策略模拟")
+    parser.add_argument("--start", default="2026-10-12", help="模拟起始日期（YYYY-MM-DD）")
+    parser.add_argument("--days", type=int, default=7, help="模拟天数")
+    parser.add_argument("--interval", type=int, default=1, help="请求间隔（分钟）")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    policy = CacheExpiryPolicy()
+
+    print(f"模拟区间: {args.start} 起 {args.days} 天，每 {args.interval} 分钟一次请求")
+    print(f"{'=' * 72}")
+    print(f"{'数据类型':<12}{'策略':<10}{'交易时段调用':>14}{'非交易时段调用':>16}{'合计':>10}")
+
+    for data_kind, fixed_ttl in FIXED_TTLS.items():
+        fixed = simulate(data_kind, start, args.days, args.interval, lambda kind, now: fixed_ttl)
+        dynamic = simulate(data_kind, start, args.days, args.interval, policy.get_ttl)
+
+        for label, result in (('固定TTL', fixed), ('交易日历', dynamic)):
+            total = result['trading_hours'] + result['off_hours']
+            print(f"{data_kind:<14}{label:<10}{result['trading_hours']:>14}{result['off_hours']:>18}{total:>12}")
+
+
+if __name__ == "__main__":
+    main()
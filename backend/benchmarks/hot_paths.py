@@ -0,0 +1,322 @@
+"""
+行情数据热点路径基准测试套件
+
+在合成市场（SyntheticMarket）导出的回放录制上运行真实的 RealMarketDataService 代码路径，不访问网络：
+- fund_lookup：get_lof_fund_info / get_etf_fund_info / get_open_fund_info（快照已缓存）
+- nav：parse_nav_fields（按列名识别净值字段）、add_nav_columns（整表解析最新净值）
+- listing：get_all_open_funds（列表已按快照缓存 / 快照刷新后首次构建）
+- snapshot：开放式基金全量快照冷加载（净值列、校验、索引）
+- asset_type：get_asset_type（已知基金代码 / 负缓存中的未知代码）
+- cache：AssetCache 命中、未命中、get_or_load 未命中加载、覆盖写入、已满时写入新键（淘汰）
+
+每个用例自动确定每轮的调用次数（每轮至少 --min-time 秒），重复 --rounds 轮，记录单次调用的
+最小值、中位数、平均值和标准差（微秒）。结果保存为 JSON，compare 子命令与基线对比，
+超出阈值的变慢标记为回归并以退出码 1 结束（可用于 CI）。
+
+基线与机器相关，应在同一台机器上生成和对比。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.hot_paths run --save-baseline
+    python -m benchmarks.hot_paths run --output /tmp/current.json --compare
+    python -m benchmarks.hot_paths run --size 100000 --filter lookup
+    python -m benchmarks.hot_paths compare benchmarks/baselines/hot_paths.json /tmp/current.json --threshold 0.15
+"""
+import argparse
+import gc
+import itertools
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.models.enums import AssetType
+from app.services.nav_columns import add_nav_columns, parse_nav_fields
+from app.services.real_data import AssetCache
+from app.services.replay_data import MarketDataRecording, ReplayMarketDataService
+from app.services.synthetic_market import SyntheticMarket
+
+DEFAULT_BASELINE = Path(__file__).parent / 'baselines' / 'hot_paths.json'
+STATS = ('min', 'median', 'mean')
+
+
+class Case:
+    """一个基准用例：func 每次调用执行一次被测操作"""
+
+    def __init__(self, name: str, group: str, func: Callable[[], object]):
+        self.name = name
+        self.group = group
+        self.func = func
+
+
+def time_case(case: Case, rounds: int, min_time: float) -> Dict:
+    """校准每轮调用次数后重复 rounds 轮，返回单次调用耗时统计（微秒）"""
+    func = case.func
+    func()  # 预热（首次调用的惰性初始化不计入）
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) * 1e6 / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {
+        'group': case.group,
+        'rounds': rounds,
+        'number': number,
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'stddev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def cycle_codes(codes: List[str], count: int, seed: int) -> Callable[[], str]:
+    """按种子抽样 count 个代码并循环返回"""
+    sample = random.Random(seed).sample(codes, min(count, len(codes)))
+    return itertools.cycle(sample).__next__
+
+
+def build_cases(market: SyntheticMarket, recording_dir: str, seed: int) -> List[Case]:
+    """构建全部用例（共享一个已预热的回放服务）"""
+    service = ReplayMarketDataService(recording_dir, latency_scale=0)
+    service.warm_snapshots()
+    open_frame = market.open_fund_frame()
+
+    lof_code = cycle_codes(market.codes[AssetType.LOF_FUND], 1000, seed)
+    etf_code = cycle_codes(market.codes[AssetType.ETF_FUND], 1000, seed)
+    open_code = cycle_codes(market.codes[AssetType.OPEN_FUND], 1000, seed)
+    fund_codes = [code for asset_type in (AssetType.ETF_FUND, AssetType.LOF_FUND, AssetType.OPEN_FUND)
+                  for code in market.codes[asset_type]]
+    fund_code = cycle_codes(fund_codes, 1000, seed)
+
+    # 不存在的代码：第一次识别后进入负缓存
+    unknown_code = cycle_codes([f"9{i:05d}" for i in range(100)], 100, seed)
+    for _ in range(100):
+        service.get_asset_type(unknown_code())
+
+    def open_fund_snapshot_cold():
+        cold = ReplayMarketDataService(recording_dir, latency_scale=0)
+        return cold._get_all_open_fund_data_with_cache()
+
+    def listing_rebuild():
+        # 快照刷新后列表按新快照重新构建：清除快照上的列表缓存
+        snapshot = service._get_all_open_fund_data_with_cache()
+        snapshot._memo.pop('listing', None)
+        snapshot._memo.pop('listing_records', None)
+        return service.get_all_open_funds()
+
+    cache = AssetCache()
+    cached_keys = [f"key{i}" for i in range(10000)]
+    for key in cached_keys:
+        cache.set(key, {'price': 1.0}, ttl=3600)
+    cached_key = cycle_codes(cached_keys, 1000, seed)
+    missing_key = cycle_codes([f"missing{i}" for i in range(1000)], 1000, seed)
+    load_key = cycle_codes([f"load{i}" for i in range(1000)], 1000, seed)
+
+    def cache_get_or_load_miss():
+        # 未命中 → 单飞加载 → 写入
+        key = load_key()
+        cache.delete(key)
+        return cache.get_or_load(key, lambda: {'price': 1.0}, ttl=3600)
+
+    # 已满的缓存：每次写入新键都要淘汰一个条目
+    full_cache = AssetCache(max_entries=len(cached_keys))
+    for key in cached_keys:
+        full_cache.set(key, {'price': 1.0}, ttl=3600)
+    insert_counter = itertools.count()
+
+    return [
+        Case('lof_lookup', 'fund_lookup', lambda: service.get_lof_fund_info(lof_code())),
+        Case('etf_lookup', 'fund_lookup', lambda: service.get_etf_fund_info(etf_code())),
+        Case('open_fund_lookup', 'fund_lookup', lambda: service.get_open_fund_info(open_code())),
+        Case('parse_nav_fields', 'nav', lambda: parse_nav_fields(open_frame.columns)),
+        Case('add_nav_columns', 'nav', lambda: add_nav_columns(open_frame.copy())),
+        Case('get_all_open_funds_cached', 'listing', service.get_all_open_funds),
+        Case('get_all_open_funds_rebuild', 'listing', listing_rebuild),
+        Case('open_fund_snapshot_cold', 'snapshot', open_fund_snapshot_cold),
+        Case('asset_type_known', 'asset_type', lambda: service.get_asset_type(fund_code())),
+        Case('asset_type_unknown', 'asset_type', lambda: service.get_asset_type(unknown_code())),
+        Case('cache_hit', 'cache', lambda: cache.get(cached_key())),
+        Case('cache_miss', 'cache', lambda: cache.get(missing_key())),
+        Case('cache_get_or_load_miss', 'cache', cache_get_or_load_miss),
+        Case('cache_set', 'cache', lambda: cache.set(cached_key(), {'price': 1.0}, ttl=3600)),
+        Case('cache_insert_at_capacity', 'cache',
+             lambda: full_cache.set(f"new{next(insert_counter)}", {'price': 1.0}, ttl=3600)),
+    ]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(size: int, seed: int, rounds: int, min_time: float, name_filter: Optional[str]) -> Dict:
+    """生成合成市场和回放录制，运行全部（或名称包含 name_filter 的）用例"""
+    market = SyntheticMarket.of_size(size, seed=seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as recording_dir:
+        recording = MarketDataRecording(recording_dir)
+        for endpoint, frame in market.frames().items():
+            recording.save(endpoint, {}, frame, 0)
+
+        for case in build_cases(market, recording_dir, seed):
+            if name_filter and name_filter not in case.name:
+                continue
+            results[case.name] = time_case(case, rounds, min_time)
+            stats = results[case.name]
+            print(f"{case.name:<30}{stats['median']:>14.2f}{stats['min']:>14.2f}{stats['stddev']:>12.2f}{stats['number']:>10}")
+
+    return {
+        'metadata': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'size': size,
+            'seed': seed,
+            'rounds': rounds,
+            'min_time': min_time,
+        },
+        'benchmarks': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, stat: str) -> List[str]:
+    """
+    对比两次结果，打印每个用例的变化
+
+    Returns:
+        变慢超过 threshold（比例）的用例名
+    """
+    base_meta, current_meta = baseline.get('metadata', {}), current.get('metadata', {})
+    for key in ('size', 'seed', 'machine', 'python'):
+        if base_meta.get(key) != current_meta.get(key):
+            print(f"注意: {key} 不同（基线 {base_meta.get(key)}，本次 {current_meta.get(key)}），对比结果可能不可比")
+
+    print(f"按 {stat} 对比，阈值 {threshold:.0%}（基线 {base_meta.get('git_revision')} @ {base_meta.get('created_at')}）")
+    print(f"{'=' * 86}")
+    print(f"{'用例':<30}{'基线 (us)':>14}{'本次 (us)':>14}{'变化':>10}  结果")
+
+    regressions = []
+    base_results, current_results = baseline['benchmarks'], current['benchmarks']
+    for name in sorted(set(base_results) | set(current_results)):
+        if name not in current_results:
+            print(f"{name:<30}{base_results[name][stat]:>14.2f}{'-':>14}{'-':>10}  本次未运行")
+            continue
+        if name not in base_results:
+            print(f"{name:<30}{'-':>14}{current_results[name][stat]:>14.2f}{'-':>10}  新用例")
+            continue
+
+        before, after = base_results[name][stat], current_results[name][stat]
+        change = after / before - 1 if before else 0.0
+        if change > threshold:
+            verdict = '回归'
+            regressions.append(name)
+        elif change < -threshold:
+            verdict = '提升'
+        else:
+            verdict = '持平'
+        print(f"{name:<30}{before:>14.2f}{after:>14.2f}{change:>+10.1%}  {verdict}")
+
+    print(f"{'-' * 86}")
+    if regressions:
+        print(f"{len(regressions)} 个用例变慢超过 {threshold:.0%}: {', '.join(regressions)}")
+    else:
+        print("没有超出阈值的回归")
+    return regressions
+
+
+def load_results(path: Path) -> Dict:
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+def save_results(results: Dict, path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"结果已保存到 {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行情数据热点路径基准测试套件")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="运行基准测试")
+    run_parser.add_argument("--size", type=int, default=20000, help="合成市场的资产总数（按全市场比例分配）")
+    run_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    run_parser.add_argument("--rounds", type=int, default=7, help="每个用例的轮数")
+    run_parser.add_argument("--min-time", type=float, default=0.05, help="每轮的最短耗时（秒）")
+    run_parser.add_argument("--filter", default=None, help="只运行名称包含该字符串的用例")
+    run_parser.add_argument("--output", default=None, help="结果保存路径（JSON）")
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"保存为基线（{DEFAULT_BASELINE.name}）")
+    run_parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="基线路径")
+    run_parser.add_argument("--compare", action="store_true", help="运行后与基线对比")
+    run_parser.add_argument("--threshold", type=float, default=0.1, help="判定回归的变慢比例")
+    run_parser.add_argument("--stat", choices=STATS, default='median', help="对比使用的统计量")
+
+    compare_parser = subparsers.add_parser('compare', help="对比两个结果文件")
+    compare_parser.add_argument("baseline", help="基线结果（JSON）")
+    compare_parser.add_argument("current", help="本次结果（JSON）")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="判定回归的变慢比例")
+    compare_parser.add_argument("--stat", choices=STATS, default='median', help="对比使用的统计量")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    # 被测路径中的 INFO 日志会主导耗时，只保留错误
+    logging.getLogger('app').setLevel(logging.ERROR)
+
+    if args.command == 'compare':
+        regressions = compare(load_results(args.baseline), load_results(args.current), args.threshold, args.stat)
+        sys.exit(1 if regressions else 0)
+
+    print(f"合成市场 {args.size} 个资产（种子 {args.seed}），每个用例 {args.rounds} 轮，每轮至少 {args.min_time:g} 秒")
+    print(f"{'=' * 86}")
+    print(f"{'用例':<30}{'中位数 (us)':>14}{'最小 (us)':>14}{'标准差':>12}{'次/轮':>10}")
+    results = run_suite(args.size, args.seed, args.rounds, args.min_time, args.filter)
+    print()
+
+    if args.output:
+        save_results(results, args.output)
+    if args.save_baseline:
+        save_results(results, args.baseline)
+    if args.compare:
+        baseline_path = Path(args.baseline)
+        if not baseline_path.exists():
+            print(f"基线 {baseline_path} 不存在，先运行 run --save-baseline")
+            sys.exit(2)
+        regressions = compare(load_results(baseline_path), results, args.threshold, args.stat)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+行情记录内存和创建开销基准测试
+
+对比开放式基金查询结果的两种形式：
+- dict：重构前的返回值，约 20 个键的字典 + 整行原始数据副本（raw_data）+ 校验结果字典
+- Quote：slots 不可变记录，原始行通过快照弱引用按需读取，校验结果只保存位掩码
+
+两种方式都从同一个快照读取行记录、校验标记和派生净值，只有结果的构建方式不同。
+内存为保留 N 个结果时 tracemalloc 统计的增量（即缓存这些结果的实际开销）。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.quote_memory_benchmark
+    python -m benchmarks.quote_memory_benchmark --rows 20000 --quotes 5000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.models.enums import AssetType
+from app.services.market_snapshot import MarketSnapshot
+from app.services.nav_columns import LATEST_UNIT_NAV, add_nav_columns, read_nav
+from app.services.quote import Quote
+from app.services.snapshot_validation import add_validation_column, validate_record
+
+from benchmarks.snapshot_lookup_benchmark import build_open_fund_frame
+
+
+def read_fund(snapshot: MarketSnapshot, code: str):
+    """两种方式共用：读取行记录、校验结果和最新单位净值"""
+    record = snapshot.get_record(code)
+    validation = validate_record(record, 'open_fund', '基金代码', '基金简称')
+    nav = read_nav(record, LATEST_UNIT_NAV)
+    return record, validation, nav
+
+
+def legacy_quote(snapshot: MarketSnapshot, code: str) -> dict:
+    """重构前：字典 + 原始行副本 + 校验结果字典"""
+    record, validation, nav = read_fund(snapshot, code)
+    return {
+        "code": code,
+        "name": record.get('基金简称', ''),
+        "price": nav['price'],
+        "type": AssetType.OPEN_FUND,
+        "timestamp": datetime.now(),
+        "unit_net_value": nav['price'],
+        "accumulated_net_value": 0.0,
+        "nav_field_used": nav['field'],
+        "nav_date": nav['date'],
+        "nav_method": 'unit_nav',
+        "change_amount": 0.0,
+        "change_percent": 0.0,
+        "purchase_status": record.get('申购状态', ''),
+        "redemption_status": record.get('赎回状态', ''),
+        "fee_rate": record.get('手续费', 0.0),
+        "volume": 0,
+        "turnover": 0,
+        "open_price": nav['price'],
+        "high_price": nav['price'],
+        "low_price": nav['price'],
+        "prev_close": nav['price'],
+        "turnover_rate": 0.0,
+        "circulating_market_cap": 0.0,
+        "total_market_cap": 0.0,
+        "trading_date": '2026-03-09',
+        "validation": {'valid': validation['valid'], 'issues': validation['issues']},
+        "raw_data": record,
+    }
+
+
+def compact_quote(snapshot: MarketSnapshot, code: str) -> Quote:
+    """Quote：原始行不复制，校验结果只保存位掩码"""
+    record, validation, nav = read_fund(snapshot, code)
+    return Quote.from_snapshot(
+        snapshot, code,
+        name=record.get('基金简称', ''),
+        type=AssetType.OPEN_FUND,
+        price=nav['price'],
+        unit_net_value=nav['price'],
+        accumulated_net_value=0.0,
+        price_field=nav['field'],
+        price_date=nav['date'],
+        price_method='unit_nav',
+        purchase_status=record.get('申购状态', ''),
+        redemption_status=record.get('赎回状态', ''),
+        fee_rate=record.get('手续费', 0.0),
+        trading_date='2026-03-09',
+        validation_flags=validation['flags'],
+    )
+
+
+def measure(build, snapshot: MarketSnapshot, codes) -> dict:
+    """构建并保留所有结果，返回每个结果的平均耗时（微秒）和保留内存（字节）"""
+    gc.collect()
+    start = time.perf_counter()
+    for code in codes:
+        build(snapshot, code)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    kept = [build(snapshot, code) for code in codes]
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    del kept
+    return {
+        'us_per_quote': elapsed * 1e6 / len(codes),
+        'bytes_per_quote': retained / len(codes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行情记录内存和创建开销基准测试")
+    parser.add_argument("--rows", type=int, default=20000, help="合成数据行数")
+    parser.add_argument("--quotes", type=int, default=5000, help="构建并保留的结果数")
+    args = parser.parse_args()
+
+    frame = add_validation_column(add_nav_columns(build_open_fund_frame(args.rows)), 'open_fund', '基金代码', '基金简称')
+    snapshot = MarketSnapshot(frame, '基金代码', '基金简称', 'open_fund')
+    rnd = random.Random(0)
+    codes = [f"{rnd.randrange(args.rows):06d}" for _ in range(args.quotes)]
+    codes = [code for code in codes if read_nav(snapshot.get_record(code), LATEST_UNIT_NAV)]
+
+    print(f"合成数据: {args.rows} 行 × {len(frame.columns)} 列，构建 {len(codes)} 个结果")
+    print(f"{'=' * 60}")
+
+    legacy = measure(legacy_quote, snapshot, codes)
+    compact = measure(compact_quote, snapshot, codes)
+
+    print(f"{'':<8}{'创建耗时 (us/个)':>18}{'保留内存 (B/个)':>18}")
+    print(f"{'dict':<8}{legacy['us_per_quote']:>18.2f}{legacy['bytes_per_quote']:>18.0f}")
+    print(f"{'Quote':<8}{compact['us_per_quote']:>18.2f}{compact['bytes_per_quote']:>18.0f}")
+    print(f"{'=' * 60}")
+    print(f"内存减少: {1 - compact['bytes_per_quote'] / legacy['bytes_per_quote']:.0%}，"
+          f"创建耗时变化: {compact['us_per_quote'] / legacy['us_per_quote'] - 1:+.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+回放基准测试
+
+用 ReplayMarketDataService 回放录制的全量数据，离线、确定性地测量真实代码路径：
+- 冷加载：上游返回 DataFrame 之后的净值列解析、整表校验、快照索引构建（每类快照一次）
+- 批量查询：快照就绪后 get_market_data_many 的解析和构建耗时
+
+录制数据来源：
+- --recordings：scripts/record_market_data.py 录制的真实数据
+- 未指定时在临时目录中生成合成录制（列结构与各 akshare 接口一致，含缺失值和 '---' 等脏数据）
+
+默认不注入延迟（--latency-scale 0）；需要模拟上游耗时时按录制耗时的比例回放。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.replay_benchmark
+    python -m benchmarks.replay_benchmark --rows 20000 --lookups 500 --repeat 5
+    python -m benchmarks.replay_benchmark --recordings ./db/recordings --latency-scale 1
+"""
+import argparse
+import logging
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.models.enums import AssetType
+from app.services.replay_data import MarketDataRecording, ReplayMarketDataService
+
+from benchmarks.snapshot_lookup_benchmark import build_open_fund_frame
+
+# 各全量接口：(资产类型, 加载快照的方法, 相对 --rows 的行数比例, 合成录制的耗时（秒）)
+ENDPOINTS = {
+    'fund_open_fund_daily_em': (AssetType.OPEN_FUND, '_get_all_open_fund_data_with_cache', 1.0, 8.0),
+    'fund_etf_fund_daily_em': (AssetType.ETF_FUND, '_get_all_etf_data_with_cache', 0.06, 3.0),
+    'fund_lof_spot_em': (AssetType.LOF_FUND, '_get_all_lof_data_with_cache', 0.02, 1.5),
+    'stock_zh_a_spot_em': (AssetType.STOCK, '_get_stock_spot_with_cache', 0.27, 6.0),
+}
+
+
+def _dirty(values: np.ndarray, rng: np.random.Generator, share: float = 0.02) -> list:
+    """把一部分数值替换为 akshare 常见的脏值（'---'、空值）"""
+    values = values.astype(object)
+    mask = rng.random(len(values)) < share
+    values[mask] = rng.choice(np.array(['---', None], dtype=object), mask.sum())
+    return list(values)
+
+
+def build_etf_frame(rows: int, seed: int = 43) -> pd.DataFrame:
+    """与 ETF 日净值接口同结构的合成数据"""
+    rng = np.random.default_rng(seed)
+    frame = build_open_fund_frame(rows, seed).drop(columns=['申购状态', '赎回状态', '手续费'])
+    frame = frame.rename(columns={'日增长值': '增长值', '日增长率': '增长率'})
+    frame['基金代码'] = [f"5{i:05d}" for i in range(rows)]
+    frame.insert(2, '类型', '指数型-股票')
+    frame['市价'] = (frame['2026-03-09-单位净值'] * rng.uniform(0.98, 1.02, rows)).round(3)
+    frame['折价率'] = [f"{value:.2f}%" for value in rng.uniform(-3, 3, rows)]
+    return frame
+
+
+def build_lof_frame(rows: int, seed: int = 44) -> pd.DataFrame:
+    """与 LOF 实时行情接口同结构的合成数据"""
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(0.5, 3.0, rows).round(3)
+    prev_close = (price * rng.uniform(0.95, 1.05, rows)).round(3)
+    return pd.DataFrame({
+        '代码': [f"16{i:04d}" for i in range(rows)],
+        '名称': [f"合成LOF{i}" for i in range(rows)],
+        '最新价': _dirty(price, rng),
+        '涨跌额': (price - prev_close).round(3),
+        '涨跌幅': ((price / prev_close - 1) * 100).round(2),
+        '成交量': rng.integers(0, 1_000_000, rows),
+        '成交额': rng.uniform(0, 1e8, rows).round(0),
+        '开盘价': prev_close,
+        '最高价': np.maximum(price, prev_close),
+        '最低价': np.minimum(price, prev_close),
+        '昨收': prev_close,
+        '换手率': rng.uniform(0, 5, rows).round(2),
+        '流通市值': rng.uniform(1e7, 1e10, rows).round(0),
+        '总市值': rng.uniform(1e7, 1e10, rows).round(0),
+    })
+
+
+def build_stock_spot_frame(rows: int, seed: int = 45) -> pd.DataFrame:
+    """与全A股实时行情接口同结构的合成数据（部分股票停牌，最新价为空）"""
+    rng = np.random.default_rng(seed)
+    prev_close = rng.uniform(2, 200, rows).round(2)
+    price = (prev_close * rng.uniform(0.9, 1.1, rows)).round(2)
+    price[rng.random(rows) < 0.02] = np.nan
+    return pd.DataFrame({
+        '代码': [f"{600000 + i:06d}" for i in range(rows)],
+        '名称': [f"合成股票{i}" for i in range(rows)],
+        '最新价': price,
+        '涨跌幅': ((price / prev_close - 1) * 100).round(2),
+        '涨跌额': (price - prev_close).round(2),
+        '成交量': rng.integers(0, 10_000_000, rows),
+        '成交额': rng.uniform(0, 1e9, rows).round(0),
+        '最高': np.fmax(price, prev_close),
+        '最低': np.fmin(price, prev_close),
+        '今开': prev_close,
+        '昨收': prev_close,
+        '换手率': rng.uniform(0, 10, rows).round(2),
+        '总市值': rng.uniform(1e9, 1e12, rows).round(0),
+        '流通市值': rng.uniform(1e9, 1e12, rows).round(0),
+    })
+
+
+SYNTHETIC_BUILDERS = {
+    'fund_open_fund_daily_em': build_open_fund_frame,
+    'fund_etf_fund_daily_em': build_etf_frame,
+    'fund_lof_spot_em': build_lof_frame,
+    'stock_zh_a_spot_em': build_stock_spot_frame,
+}
+
+
+def write_synthetic_recordings(directory: str, rows: int) -> None:
+    """生成各全量接口的合成录制（耗时按真实接口的量级记录）"""
+    recording = MarketDataRecording(directory)
+    for endpoint, (_, _, share, elapsed) in ENDPOINTS.items():
+        recording.save(endpoint, {}, SYNTHETIC_BUILDERS[endpoint](max(1, int(rows * share))), elapsed)
+
+
+def run_once(directory: str, lookups: int, latency_scale: float, seed: int) -> dict:
+    """新建回放服务：逐类冷加载快照，再批量查询随机代码，返回各阶段耗时（毫秒）"""
+    service = ReplayMarketDataService(directory, latency_scale=latency_scale, seed=seed)
+    manifest = service.recording.manifest()
+    rnd = random.Random(seed)
+    timings = {}
+
+    for endpoint, (asset_type, loader, _, _) in ENDPOINTS.items():
+        if endpoint not in manifest:
+            continue
+
+        start = time.perf_counter()
+        snapshot = getattr(service, loader)()
+        cold_ms = (time.perf_counter() - start) * 1000
+        if snapshot is None or snapshot.empty:
+            continue
+
+        codes = list(snapshot.codes())
+        requests = [(code, asset_type) for code in rnd.sample(codes, min(lookups, len(codes)))]
+        start = time.perf_counter()
+        batch = service.get_market_data_many(requests)
+        lookup_ms = (time.perf_counter() - start) * 1000
+
+        timings[endpoint] = {
+            'rows': len(snapshot),
+            'cold_ms': cold_ms,
+            'lookup_ms': lookup_ms,
+            'found': len(batch['results']),
+            'requested': len(requests),
+        }
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放基准测试")
+    parser.add_argument("--recordings", default=None, help="录制目录（默认生成合成录制）")
+    parser.add_argument("--rows", type=int, default=20000, help="合成录制的开放式基金行数（其他接口按比例）")
+    parser.add_argument("--lookups", type=int, default=500, help="每类快照批量查询的代码数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取中位数）")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="按录制耗时注入延迟的比例")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（抽样代码和延迟抖动）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = args.recordings
+        if directory is None:
+            directory = temp_dir
+            write_synthetic_recordings(directory, args.rows)
+            print(f"合成录制: 开放式基金 {args.rows} 行（其他接口按比例）")
+        else:
+            print(f"录制目录: {directory}")
+
+        runs = [run_once(directory, args.lookups, args.latency_scale, args.seed) for _ in range(args.repeat)]
+
+    print(f"每类快照批量查询 {args.lookups} 个代码，重复 {args.repeat} 次取中位数，延迟比例 {args.latency_scale:g}")
+    print(f"{'=' * 84}")
+    print(f"{'接口':<28}{'行数':>8}{'冷加载 (ms)':>14}{'批量查询 (ms)':>16}{'单个 (us)':>12}{'命中':>8}")
+    for endpoint in runs[0]:
+        rows = runs[0][endpoint]['rows']
+        cold = statistics.median(run[endpoint]['cold_ms'] for run in runs)
+        lookup = statistics.median(run[endpoint]['lookup_ms'] for run in runs)
+        found = runs[0][endpoint]['found']
+        requested = runs[0][endpoint]['requested']
+        print(f"{endpoint:<28}{rows:>8}{cold:>14.1f}{lookup:>16.1f}{lookup * 1000 / requested:>12.1f}"
+              f"{f'{found}/{requested}':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+多 worker 快照内存基准测试
+
+模拟 N 个 worker 进程各自加载同一个开放式基金全量快照并查询所有代码，
+统计每个 worker 新增的私有内存（Private）和共享内存（Shared）：
+- pandas：每个进程把快照读入自己的 DataFrame 和行记录（重构前的方式）
+- mmap：每个进程内存映射同一个快照文件，列数据留在共享页缓存中
+
+私有内存随 worker 数线性增长的部分才是真正的额外开销。
+内存统计读取 /proc/self/smaps_rollup，仅支持 Linux。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.shared_snapshot_memory
+    python -m benchmarks.shared_snapshot_memory --rows 50000 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+from app.services.market_snapshot import MarketSnapshot
+from app.services.snapshot_store import PYARROW_AVAILABLE, SnapshotStore
+
+from benchmarks.snapshot_lookup_benchmark import build_open_fund_frame
+
+SMAPS_ROLLUP = "/proc/self/smaps_rollup"
+
+
+def read_memory_kb() -> dict:
+    """读取当前进程的 Rss、私有内存和共享内存（KB）"""
+    usage = {'rss': 0, 'private': 0, 'shared': 0}
+    with open(SMAPS_ROLLUP) as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key == 'Rss':
+                usage['rss'] = int(value.split()[0])
+            elif key in ('Private_Clean', 'Private_Dirty'):
+                usage['private'] += int(value.split()[0])
+            elif key in ('Shared_Clean', 'Shared_Dirty'):
+                usage['shared'] += int(value.split()[0])
+    return usage
+
+
+def worker(directory: str, memory_map: bool, ready, start, results) -> None:
+    """加载快照、查询全部代码，报告新增内存；保持映射直到所有 worker 都测量完毕"""
+    store = SnapshotStore(directory, memory_map=memory_map)
+
+    # 先加载一个很小的快照，排除 pandas/pyarrow 首次使用时的一次性初始化开销
+    # （真实 worker 在加载快照前早已完成这些初始化）
+    warmup, _ = store.load('warmup')
+    for code in warmup.codes():
+        warmup.get_record(code)
+    before = read_memory_kb()
+
+    snapshot, _ = store.load('open_fund')
+    for code in snapshot.codes():
+        snapshot.get_record(code)
+
+    # 等待所有 worker 都加载完成后再测量，共享页才会被计入 Shared
+    ready.wait()
+    after = read_memory_kb()
+    results.put({key: after[key] - before[key] for key in after})
+    start.wait()
+
+
+def run(directory: str, memory_map: bool, workers: int) -> list:
+    context = multiprocessing.get_context('spawn')
+    ready = context.Barrier(workers)
+    start = context.Barrier(workers + 1)
+    results = context.Queue()
+
+    processes = [
+        context.Process(target=worker, args=(directory, memory_map, ready, start, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    usages = [results.get() for _ in range(workers)]
+    start.wait()
+    for process in processes:
+        process.join()
+    return usages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多 worker 快照内存基准测试")
+    parser.add_argument("--rows", type=int, default=20000, help="合成开放式基金数据行数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker 数")
+    args = parser.parse_args()
+
+    if not PYARROW_AVAILABLE:
+        print("pyarrow不可用，无法测试内存映射快照")
+        return
+    if not os.path.exists(SMAPS_ROLLUP):
+        print(f"{SMAPS_ROLLUP} 不存在，该基准测试仅支持 Linux")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = MarketSnapshot(build_open_fund_frame(args.rows), '基金代码', '基金简称', 'open_fund')
+        SnapshotStore(directory).save(snapshot, '2026-03-09')
+        warmup = MarketSnapshot(build_open_fund_frame(100), '基金代码', '基金简称', 'warmup')
+        SnapshotStore(directory).save(warmup, '2026-03-09')
+        file_kb = SnapshotStore(directory).path('open_fund').stat().st_size / 1024
+
+        print(f"快照: {args.rows} 行，文件 {file_kb:.0f} KB")
+        print(f"{'=' * 72}")
+        print(f"{'模式':<8}{'worker数':>8}{'每worker私有(KB)':>20}{'每worker共享(KB)':>20}{'私有合计(KB)':>16}")
+
+        for memory_map in (False, True):
+            mode = 'mmap' if memory_map else 'pandas'
+            for workers in args.workers:
+                usages = run(directory, memory_map, workers)
+                private = [u['private'] for u in usages]
+                shared = [u['shared'] for u in usages]
+                print(f"{mode:<10}{workers:>8}{sum(private) / workers:>20.0f}"
+                      f"{sum(shared) / workers:>20.0f}{sum(private):>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
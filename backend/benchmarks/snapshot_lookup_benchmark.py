@@ -0,0 +1,99 @@
+"""
+全市场快照查询基准测试
+
+对比两种按代码查找基金记录的方式：
+- 旧实现：iloc 逐行扫描 + 逐列重建字典
+- MarketSnapshot：构建一次代码索引，之后 O(1) 查询
+
+使用合成的开放式基金全量数据（列结构与 ak.fund_open_fund_daily_em() 一致），无需网络。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.snapshot_lookup_benchmark
+    python -m benchmarks.snapshot_lookup_benchmark --rows 20000 --lookups 200
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.market_snapshot import MarketSnapshot
+
+
+def build_open_fund_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """构造与开放式基金日净值接口同结构的合成数据"""
+    rng = np.random.default_rng(seed)
+    nav_today = rng.uniform(0.5, 5.0, rows).round(4)
+    nav_prev = (nav_today * rng.uniform(0.97, 1.03, rows)).round(4)
+    # 模拟部分基金当日净值尚未公布
+    nav_today[rng.random(rows) < 0.1] = np.nan
+
+    return pd.DataFrame({
+        '基金代码': [f"{i:06d}" for i in range(rows)],
+        '基金简称': [f"合成基金{i}" for i in range(rows)],
+        '2026-03-09-单位净值': nav_today,
+        '2026-03-09-累计净值': nav_today + 0.5,
+        '2026-03-06-单位净值': nav_prev,
+        '2026-03-06-累计净值': nav_prev + 0.5,
+        '日增长值': (nav_today - nav_prev).round(4),
+        '日增长率': rng.uniform(-3, 3, rows).round(2),
+        '申购状态': '开放申购',
+        '赎回状态': '开放赎回',
+        '手续费': '0.15%',
+    })
+
+
+def legacy_scan_lookup(frame: pd.DataFrame, code: str):
+    """旧实现：逐行扫描查找（与重构前的 get_lof_fund_info 相同）"""
+    for idx in range(len(frame)):
+        row = frame.iloc[idx]
+        row_code = str(row['基金代码']) if pd.notna(row['基金代码']) else None
+        if row_code == code:
+            found = {}
+            for col in frame.columns:
+                value = row[col]
+                found[col] = value if pd.notna(value) else None
+            return found
+    return None
+
+
+def time_per_call(func, codes) -> float:
+    """返回单次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for code in codes:
+        func(code)
+    return (time.perf_counter() - start) * 1000 / len(codes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全市场快照查询基准测试")
+    parser.add_argument("--rows", type=int, default=20000, help="合成数据行数")
+    parser.add_argument("--lookups", type=int, default=200, help="索引查询次数")
+    parser.add_argument("--scan-lookups", type=int, default=5, help="逐行扫描查询次数（很慢）")
+    args = parser.parse_args()
+
+    frame = build_open_fund_frame(args.rows)
+    rnd = random.Random(0)
+    codes = [f"{rnd.randrange(args.rows):06d}" for _ in range(args.lookups)]
+
+    print(f"合成数据: {args.rows} 行 × {len(frame.columns)} 列")
+    print(f"{'=' * 60}")
+
+    start = time.perf_counter()
+    snapshot = MarketSnapshot(frame, '基金代码', '基金简称', 'open_fund')
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"快照构建（每次获取数据一次）: {build_ms:.1f} ms")
+
+    scan_ms = time_per_call(lambda c: legacy_scan_lookup(frame, c), codes[:args.scan_lookups])
+    index_ms = time_per_call(snapshot.get_record, codes)
+    name_ms = time_per_call(snapshot.get_name, codes)
+
+    print(f"逐行扫描查询:   {scan_ms:10.3f} ms/次")
+    print(f"索引查询记录:   {index_ms:10.4f} ms/次")
+    print(f"索引查询名称:   {name_ms:10.4f} ms/次")
+    print(f"加速比:         {scan_ms / index_ms:10.0f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+冷启动 / 热启动延迟基准测试
+
+对比服务重启后第一次查询每类基金所需的时间：
+- 冷启动：快照存储为空，首次查询需要获取并解析全量数据
+- 热启动：快照存储中已有有效快照，构造服务时直接从磁盘恢复
+
+akshare 可用时（--live）走真实上游；否则使用与 ak.fund_open_fund_daily_em() 同结构的
+合成数据，此时冷启动只统计解析响应体和构建快照索引的CPU耗时，不包含网络下载时间
+（真实环境中全量下载通常需要数秒，热启动的优势只会更大）。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --rows 20000 --repeat 5
+    python -m benchmarks.startup_benchmark --live
+"""
+import argparse
+import json
+import logging
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from app.models.enums import AssetType
+from app.services.market_snapshot import MarketSnapshot
+from app.services.real_data import AKSHARE_AVAILABLE, RealMarketDataService
+from app.services.snapshot_store import PYARROW_AVAILABLE, SnapshotStore
+
+from benchmarks.snapshot_lookup_benchmark import build_open_fund_frame
+
+# 合成数据的行数比例（相对 --rows），与真实全量数据的规模大致相当
+SYNTHETIC_SHARES = {
+    'open_fund': 1.0,
+    'etf': 0.06,
+    'lof': 0.02,
+}
+
+SNAPSHOT_ASSET_TYPES = {
+    'open_fund': AssetType.OPEN_FUND,
+    'etf': AssetType.ETF_FUND,
+    'lof': AssetType.LOF_FUND,
+}
+
+
+def build_synthetic_payloads(rows: int) -> dict:
+    """构造三类合成数据的 JSON 响应体（模拟上游接口返回的原始数据）"""
+    payloads = {}
+    for snapshot_type, share in SYNTHETIC_SHARES.items():
+        frame = build_open_fund_frame(max(1, int(rows * share)))
+        payloads[snapshot_type] = frame.to_json(orient='records', force_ascii=False)
+    return payloads
+
+
+def run_synthetic(rows: int, repeat: int) -> None:
+    """
+    合成数据
+
+    冷启动：解析 JSON 响应体 → DataFrame → 构建快照索引 → 写入存储（不含网络下载）
+    热启动：构造服务（含从磁盘恢复快照）→ 首次代码查询
+    """
+    payloads = build_synthetic_payloads(rows)
+
+    cold_times, warm_times = [], []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            store = SnapshotStore(directory)
+
+            start = time.perf_counter()
+            service = RealMarketDataService(snapshot_store=store)
+            trading_date = service.trading_helper.get_current_trading_date()
+            for snapshot_type, payload in payloads.items():
+                frame = pd.DataFrame(json.loads(payload))
+                snapshot = MarketSnapshot(frame, '基金代码', '基金简称', snapshot_type)
+                service.code_directory.sync_snapshot(SNAPSHOT_ASSET_TYPES[snapshot_type], snapshot)
+                store.save(snapshot, trading_date)
+            service.code_directory.resolve('000001')
+            cold_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            warm_service = RealMarketDataService(snapshot_store=store)
+            warm_service.code_directory.resolve('000001')
+            warm_times.append(time.perf_counter() - start)
+
+    print("模式: 合成数据（冷启动不含网络下载时间）")
+    report(cold_times, warm_times)
+
+
+def run_live(repeat: int) -> None:
+    """真实上游：首次查询每类基金各一只"""
+    requests = [
+        ('161226', AssetType.LOF_FUND),
+        ('510300', AssetType.ETF_FUND),
+        ('000001', AssetType.OPEN_FUND),
+    ]
+
+    cold_times, warm_times = [], []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            store = SnapshotStore(directory)
+
+            start = time.perf_counter()
+            service = RealMarketDataService(snapshot_store=store)
+            cold = service.get_market_data_many(requests)
+            cold_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            warm_service = RealMarketDataService(snapshot_store=store)
+            warm = warm_service.get_market_data_many(requests)
+            warm_times.append(time.perf_counter() - start)
+
+            print(f"冷启动上游调用 {service.get_upstream_stats()}，热启动上游调用 {warm_service.get_upstream_stats()}")
+            print(f"冷启动结果 {sorted(cold['results'])}，热启动结果 {sorted(warm['results'])}")
+
+    print("模式: 真实上游")
+    report(cold_times, warm_times)
+
+
+def report(cold_times: list, warm_times: list) -> None:
+    cold_ms = statistics.median(cold_times) * 1000
+    warm_ms = statistics.median(warm_times) * 1000
+    print(f"{'=' * 60}")
+    print(f"冷启动（中位数）: {cold_ms:10.1f} ms")
+    print(f"热启动（中位数）: {warm_ms:10.1f} ms")
+    print(f"加速比: {cold_ms / warm_ms:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动/热启动延迟基准测试")
+    parser.add_argument("--rows", type=int, default=20000, help="合成开放式基金数据行数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    parser.add_argument("--live", action="store_true", help="使用真实akshare上游")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if not PYARROW_AVAILABLE:
+        print("pyarrow不可用，快照存储已禁用，无法对比热启动")
+        return
+
+    if args.live:
+        if not AKSHARE_AVAILABLE:
+            print("akshare不可用，无法使用 --live 模式")
+            return
+        run_live(args.repeat)
+    else:
+        run_synthetic(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+上游调用保护演练
+
+用注入延迟和错误的模拟上游（FakeUpstream）对比直接调用和经由 UpstreamClient 调用：
+- healthy：正常上游
+- flaky：20% 的调用出现连接错误（重试后应几乎全部成功）
+- slow_tail：5% 的调用卡住远超截止时间（超时后重试，调用方延迟有上限）
+- outage：上游中断一段时间后恢复（熔断期间不访问上游，退回最近一次成功的结果；
+  冷却时间过后的探测调用成功即关闭熔断器）
+
+统计调用方看到的成功率（含退回旧数据）和延迟分位数，以及上游实际收到的请求数。
+
+另有限流演练（rate_limit）：后台刷新和强制刷新持续突发请求的同时，用户请求按固定间隔到达，
+统计各优先级的排队时间、被拒绝次数，以及实际吞吐与预算的比例。
+时间参数按比例缩小（毫秒级），整个演练在几秒内完成。
+
+运行方式（在 backend 目录下）：
+    python -m benchmarks.upstream_resilience
+    python -m benchmarks.upstream_resilience --calls 500 --seed 7
+"""
+import argparse
+import random
+import threading
+import time
+
+from app.services.rate_limiter import Priority, RateLimiter, upstream_priority
+from app.services.upstream import CircuitOpenError, RateLimitExceeded, UpstreamClient
+
+
+class FakeUpstream:
+    """注入延迟和错误的模拟上游"""
+
+    def __init__(self, latency: float = 0.005, error_rate: float = 0.0, hang_rate: float = 0.0,
+                 hang_seconds: float = 1.0, seed: int = 0):
+        """
+        Args:
+            latency: 正常调用耗时（秒），实际耗时在其 50%~150% 之间
+            error_rate: 抛出 ConnectionError 的概率
+            hang_rate: 卡住 hang_seconds 秒的概率
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.down = False  # 中断期间每次调用都在短暂等待后抛出 ConnectionError
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self) -> dict:
+        with self._lock:
+            self.requests += 1
+            roll = self._rng.random()
+            jitter = self._rng.uniform(0.5, 1.5)
+
+        if self.down:
+            time.sleep(self.latency)
+            raise ConnectionError("模拟上游中断")
+        if roll < self.error_rate:
+            time.sleep(self.latency * jitter)
+            raise ConnectionError("模拟连接被重置")
+        if roll < self.error_rate + self.hang_rate:
+            time.sleep(self.hang_seconds)
+        else:
+            time.sleep(self.latency * jitter)
+        return {'ok': True}
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def run(call, upstream: FakeUpstream, calls: int, interval: float, outage=None) -> dict:
+    """
+    依次发起 calls 次调用，返回成功率、调用方延迟和上游请求数
+
+    Args:
+        outage: (开始序号, 结束序号)，在此区间内上游中断
+    """
+    upstream.requests = 0
+    latencies = []
+    successes = 0
+    fallbacks = 0
+    for index in range(calls):
+        if outage:
+            upstream.down = outage[0] <= index < outage[1]
+        started = time.perf_counter()
+        try:
+            if call(upstream).get('fallback'):
+                fallbacks += 1
+            successes += 1
+        except Exception:
+            pass
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+    upstream.down = False
+
+    return {
+        'success_rate': successes / calls,
+        'fallbacks': fallbacks,
+        'p50_ms': percentile(latencies, 0.5),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': max(latencies),
+        'upstream_requests': upstream.requests,
+    }
+
+
+def build_client(seed: int) -> UpstreamClient:
+    return UpstreamClient(
+        timeout=0.1, max_retries=2, backoff_base=0.005, backoff_max=0.05,
+        failure_threshold=5, reset_timeout=0.3, max_workers=16, rng=random.Random(seed),
+    )
+
+
+def run_rate_limit_drill(rate: float, burst: float, seconds: float) -> None:
+    """突发的后台/刷新请求与稳定的用户请求争用同一份预算"""
+    limiter = RateLimiter(
+        {'*': (rate, burst)},
+        max_waits={Priority.INTERACTIVE: 2, Priority.REFRESH: 5, Priority.BACKGROUND: 30},
+        background_reserve=1,
+    )
+    client = UpstreamClient(timeout=0, max_retries=0, rate_limiter=limiter)
+    upstream = FakeUpstream(latency=0.001)
+    waits = {priority: [] for priority in Priority}
+    rejected = {priority: 0 for priority in Priority}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    stop = started + seconds
+
+    def caller(priority: Priority, interval: float):
+        with upstream_priority(priority):
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                try:
+                    client.call('drill', upstream)
+                    with lock:
+                        waits[priority].append((time.perf_counter() - started) * 1000)
+                except RateLimitExceeded:
+                    with lock:
+                        rejected[priority] += 1
+                time.sleep(interval)
+
+    threads = [threading.Thread(target=caller, args=(Priority.BACKGROUND, 0)) for _ in range(4)]
+    threads += [threading.Thread(target=caller, args=(Priority.REFRESH, 0)) for _ in range(2)]
+    threads += [threading.Thread(target=caller, args=(Priority.INTERACTIVE, 0.5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 已在排队的请求在 stop 之后仍会取得令牌，按实际耗时计算预算
+    elapsed = time.perf_counter() - started
+    budget = burst + rate * elapsed
+    print(f"限流演练: 预算 {rate:g} 次/秒（突发 {burst:g}），{elapsed:.1f} 秒内最多 {budget:.0f} 次；"
+          f"4 个后台、2 个强制刷新调用方持续请求，用户请求每 0.5 秒一次")
+    print(f"{'=' * 98}")
+    print(f"{'优先级':<14}{'成功':>8}{'拒绝':>8}{'排队 p50 (ms)':>16}{'排队 p99 (ms)':>16}")
+    for priority in Priority:
+        values = waits[priority]
+        print(f"{priority.name.lower():<14}{len(values):>8}{rejected[priority]:>8}"
+              f"{percentile(values, 0.5):>16.1f}{percentile(values, 0.99):>16.1f}")
+    print(f"{'-' * 98}")
+    print(f"上游请求 {upstream.requests} 次，占预算 {upstream.requests / budget:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上游调用保护演练")
+    parser.add_argument("--calls", type=int, default=300, help="每个场景的调用次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--rate", type=float, default=20, help="限流演练的预算（次/秒）")
+    parser.add_argument("--seconds", type=float, default=5, help="限流演练的时长（秒）")
+    args = parser.parse_args()
+
+    calls = args.calls
+    scenarios = [
+        ('healthy', dict(), None),
+        ('flaky', dict(error_rate=0.2), None),
+        ('slow_tail', dict(hang_rate=0.05, hang_seconds=0.5), None),
+        ('outage', dict(), (calls // 4, calls // 2)),
+    ]
+
+    print(f"每个场景 {calls} 次调用；截止时间 100ms，最多重试 2 次，连续失败 5 次熔断 300ms")
+    print(f"{'=' * 98}")
+    print(f"{'场景':<12}{'方式':<8}{'成功率':>10}{'旧数据':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'最大 (ms)':>12}{'上游请求':>12}")
+
+    for name, options, outage in scenarios:
+        client = build_client(args.seed)
+        last_good = {}
+
+        def protected(upstream, client=client, name=name, last_good=last_good):
+            """与 RealMarketDataService 相同：熔断期间退回最近一次成功的结果"""
+            try:
+                last_good['result'] = client.call(name, upstream)
+                return last_good['result']
+            except CircuitOpenError:
+                if 'result' not in last_good:
+                    raise
+                client.record_fallback(name)
+                return {**last_good['result'], 'fallback': True}
+
+        modes = (
+            ('直接', lambda upstream: upstream()),
+            ('保护', protected),
+        )
+        for label, call in modes:
+            upstream = FakeUpstream(seed=args.seed, **options)
+            result = run(call, upstream, calls, interval=0.002, outage=outage)
+            print(f"{name:<12}{label:<8}{result['success_rate']:>10.1%}{result['fallbacks']:>10}{result['p50_ms']:>12.1f}"
+                  f"{result['p99_ms']:>12.1f}{result['max_ms']:>12.1f}{result['upstream_requests']:>12}")
+
+        info = client.get_info()['endpoints'][name]
+        print(f"{'':<12}{'统计':<8}重试 {info['retries']}，超时 {info['timeouts']}，熔断拒绝 {info['short_circuited']}，"
+              f"错误 {info['errors']}，尝试延迟 p95 {info['latency_ms']['p95']}ms，状态 {info['state']}")
+        client.shutdown()
+        print(f"{'-' * 98}")
+
+    print()
+    run_rate_limit_drill(args.rate, burst=5, seconds=args.seconds)
+
+
+if __name__ == "__main__":
+    main()
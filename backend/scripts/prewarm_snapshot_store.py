@@ -0,0 +1,74 @@
+"""
+预热全量快照磁盘存储
+
+在部署或重启前运行，提前下载 LOF、ETF、开放式基金全量数据并写入快照存储，
+服务启动时即可直接从磁盘恢复，第一批请求不再等待上游下载。
+
+使用 --watch 时作为常驻的刷新进程（sidecar）运行：按交易日历在每类数据可能变化时
+重新获取并原子替换快照文件，所有 uvicorn worker 直接内存映射新版本，不再各自下载。
+
+运行方式（在 backend 目录下）：
+    python -m scripts.prewarm_snapshot_store
+    python -m scripts.prewarm_snapshot_store --force
+    python -m scripts.prewarm_snapshot_store --dir ./db/snapshots
+    python -m scripts.prewarm_snapshot_store --watch
+"""
+import argparse
+import logging
+import sys
+import time
+
+from app.core.config import settings
+from app.services.real_data import RealMarketDataService
+from app.services.snapshot_store import SnapshotStore, PYARROW_AVAILABLE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预热全量快照磁盘存储")
+    parser.add_argument("--dir", default=settings.SNAPSHOT_STORE_DIR, help="快照存储目录")
+    parser.add_argument("--force", action="store_true", help="忽略已恢复的快照，重新下载")
+    parser.add_argument("--watch", action="store_true", help="常驻运行，数据过期时自动刷新快照")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if not PYARROW_AVAILABLE:
+        print("pyarrow不可用，无法写入快照存储")
+        sys.exit(1)
+
+    store = SnapshotStore(args.dir)
+    service = RealMarketDataService(snapshot_store=store)
+    rows = service.warm_snapshots(force=args.force)
+
+    print(f"{'=' * 60}")
+    for snapshot_type, count in rows.items():
+        status = f"{count} 行" if count else "获取失败"
+        print(f"{snapshot_type:<12}{status}")
+
+    print(f"{'=' * 60}")
+    for snapshot_type, info in store.get_info()['snapshots'].items():
+        print(f"{snapshot_type:<12}{info['fetched_at']}  交易日 {info['trading_date']}  {info['size_bytes'] / 1024:.1f} KB")
+
+    if args.watch:
+        watch(service)
+
+    if not all(rows.values()):
+        sys.exit(1)
+
+
+def watch(service: RealMarketDataService) -> None:
+    """常驻刷新：睡眠到最早过期的一类数据，然后重新获取所有已过期的快照"""
+    while True:
+        ttl = min(
+            service.expiry_policy.get_ttl(kind) for asset_type, kind in service.SNAPSHOT_DATA_KINDS.items()
+            if asset_type not in service.ON_DEMAND_SNAPSHOTS
+        )
+        print(f"下一次刷新在 {ttl} 秒后")
+        time.sleep(ttl)
+
+        rows = service.warm_snapshots()
+        print(f"刷新完成: {rows}")
+
+
+if __name__ == "__main__":
+    main()
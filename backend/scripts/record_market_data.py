@@ -0,0 +1,51 @@
+"""
+录制上游全量数据，供离线回放（ReplayMarketDataService）使用
+
+需要网络和 akshare。录制 LOF、ETF、开放式基金和全A股实时行情的全量接口，
+以及 --stocks 指定股票的个股信息；每次调用的返回 DataFrame 和耗时保存到录制目录。
+
+回放：设置 MARKET_DATA_REPLAY_DIR 为录制目录后启动服务，或在基准测试中使用
+    python -m benchmarks.replay_benchmark --recordings ./db/recordings
+
+运行方式（在 backend 目录下）：
+    python -m scripts.record_market_data
+    python -m scripts.record_market_data --dir ./db/recordings --stocks 600000 000001
+    python -m scripts.record_market_data --endpoints fund_open_fund_daily_em
+"""
+import argparse
+import logging
+import sys
+
+from app.core.config import settings
+from app.services.real_data import AKSHARE_AVAILABLE
+from app.services.replay_data import MarketDataRecording, record_market_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制上游全量数据")
+    parser.add_argument("--dir", default=settings.MARKET_DATA_REPLAY_DIR or "./db/recordings", help="录制目录")
+    parser.add_argument("--stocks", nargs="*", default=[], help="需要录制个股信息的股票代码")
+    parser.add_argument("--endpoints", nargs="*", default=None, help="只录制这些全量接口（默认全部）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if not AKSHARE_AVAILABLE:
+        print("akshare不可用，无法录制")
+        sys.exit(1)
+
+    rows = record_market_data(args.dir, args.stocks, args.endpoints)
+
+    print(f"{'=' * 60}")
+    manifest = MarketDataRecording(args.dir).manifest()
+    for key, count in rows.items():
+        elapsed = manifest.get(key, {}).get('elapsed')
+        status = f"{count} 行，耗时 {elapsed:.2f} 秒" if count else "录制失败"
+        print(f"{key:<40}{status}")
+
+    if not all(rows.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from app.services.real_data import AssetCache
+
+
+def test_evicts_expired_entries_before_lru():
+    cache = AssetCache(max_entries=3)
+    cache.set('old', {'price': 1.0}, ttl=60, timestamp=datetime.now() - timedelta(hours=1))
+    cache.set('a', {'price': 2.0}, ttl=3600)
+    cache.set('b', {'price': 3.0}, ttl=3600)
+    cache.get('old')  # 最近访问过，但已硬过期
+
+    cache.set('c', {'price': 4.0}, ttl=3600)
+
+    assert list(cache.cache) == ['a', 'b', 'c']
+    assert cache.get_info()['memory']['evictions'] == {'expired': 1, 'capacity': 0}
+
+
+def test_evicts_least_recently_used_when_nothing_expired():
+    cache = AssetCache(max_entries=2)
+    cache.set('a', {'price': 1.0}, ttl=3600)
+    cache.set('b', {'price': 2.0}, ttl=3600)
+    cache.get('a')
+
+    cache.set('c', {'price': 3.0}, ttl=3600)
+
+    assert list(cache.cache) == ['a', 'c']
+    assert cache.get_info()['memory']['evictions'] == {'expired': 0, 'capacity': 1}
+
+
+def test_replaced_entries_do_not_expire_by_their_old_deadline():
+    cache = AssetCache()
+    cache.set('a', {'price': 1.0}, ttl=60, timestamp=datetime.now() - timedelta(hours=1))
+    cache.set('a', {'price': 2.0}, ttl=3600)
+    cache.set('b', {'price': 3.0}, ttl=60, timestamp=datetime.now() - timedelta(hours=1))
+
+    assert cache.purge_expired() == 1
+    assert cache.get('a') == {'price': 2.0}
+    assert cache.get('b') is None
+
+
+def test_expiry_heap_stays_bounded():
+    cache = AssetCache()
+    for i in range(1000):
+        cache.set('a', {'price': float(i)}, ttl=3600)
+
+    assert len(cache._expiry_heap) <= 2 * len(cache.cache) + 64
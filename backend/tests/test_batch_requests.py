@@ -0,0 +1,32 @@
+import pytest
+
+from app.models.enums import AssetType
+from app.services.replay_data import ReplayMarketDataService
+
+
+@pytest.fixture
+def service(tmp_path):
+    return ReplayMarketDataService(str(tmp_path))
+
+
+def test_conflicting_asset_types_are_rejected(service):
+    requests = [('510300', AssetType.ETF_FUND), ('510300', AssetType.LOF_FUND)]
+
+    with pytest.raises(ValueError):
+        service.get_market_data_many(requests)
+    with pytest.raises(ValueError):
+        service.refresh_market_data_many(requests)
+
+
+def test_duplicate_requests_are_fetched_once(service):
+    fetched = []
+
+    def get_market_data(code, asset_type):
+        fetched.append(code)
+        return {'code': code, 'price': 10.0}
+
+    service.get_market_data = get_market_data
+    batch = service.get_market_data_many([('600000', AssetType.STOCK), ('600000', 'STOCK')])
+
+    assert fetched == ['600000']
+    assert list(batch['results']) == ['600000']
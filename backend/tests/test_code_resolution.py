@@ -0,0 +1,37 @@
+from app.models.enums import AssetType
+from app.services.replay_data import ReplayMarketDataService
+
+
+def make_service(tmp_path):
+    service = ReplayMarketDataService(str(tmp_path))
+    loaded = []
+
+    def load_fund_snapshots():
+        loaded.append(True)
+        return {AssetType.ETF_FUND: None, AssetType.LOF_FUND: None, AssetType.OPEN_FUND: None}
+
+    service._load_fund_snapshots = load_fund_snapshots
+    return service, loaded
+
+
+def test_stock_lookup_does_not_load_fund_snapshots(tmp_path):
+    service, loaded = make_service(tmp_path)
+
+    def get_stock_info(code):
+        service._register_stock(code, '浦发银行')
+        return {'code': code}
+
+    service.get_stock_info = get_stock_info
+
+    entry = service._resolve_code('600000')
+
+    assert entry.asset_type == AssetType.STOCK
+    assert loaded == []
+
+
+def test_non_stock_code_falls_through_to_fund_snapshots(tmp_path):
+    service, loaded = make_service(tmp_path)
+    service.get_stock_info = lambda code: None
+
+    assert service._resolve_code('600000') is None
+    assert loaded == [True]
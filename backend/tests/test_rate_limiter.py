@@ -0,0 +1,74 @@
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from app.services.rate_limiter import Priority, RateLimiter
+from app.services.upstream import RateLimitExceeded
+
+
+class SlowRedis:
+    """每次开启事务前等待一段时间的 Redis 客户端（模拟网络延迟）"""
+
+    def __init__(self, client, delay):
+        self.client = client
+        self.delay = delay
+
+    def pipeline(self):
+        time.sleep(self.delay)
+        return self.client.pipeline()
+
+
+def test_rejects_when_budget_exhausted():
+    limiter = RateLimiter({'*': (1, 2)})
+
+    limiter.acquire('spot', max_wait=0)
+    limiter.acquire('spot', max_wait=0)
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire('spot', max_wait=0)
+    assert limiter.get_info()['buckets']['*']['rejected']['interactive'] == 1
+
+
+def test_timeout_caps_max_wait():
+    limiter = RateLimiter({'*': (0.1, 1)})
+    limiter.acquire('spot')
+
+    # 补充一个令牌需要 10 秒，超过调用方剩余的 1 秒
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire('spot', priority=Priority.BACKGROUND, timeout=1)
+
+
+def test_budget_is_shared_through_redis():
+    server = fakeredis.FakeServer()
+    first = RateLimiter({'*': (1, 2)}, redis_client=fakeredis.FakeRedis(server=server))
+    second = RateLimiter({'*': (1, 2)}, redis_client=fakeredis.FakeRedis(server=server))
+
+    first.acquire('spot', max_wait=0)
+    second.acquire('spot', max_wait=0)
+    with pytest.raises(RateLimitExceeded):
+        first.acquire('spot', max_wait=0)
+
+
+def test_falls_back_to_local_buckets_when_redis_is_down():
+    server = fakeredis.FakeServer()
+    server.connected = False
+    limiter = RateLimiter({'*': (1, 1)}, redis_client=fakeredis.FakeRedis(server=server))
+
+    limiter.acquire('spot', max_wait=0)
+    assert not limiter.shared
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire('spot', max_wait=0)
+
+
+def test_redis_round_trip_does_not_hold_the_lock():
+    limiter = RateLimiter({'*': (100, 100)}, redis_client=SlowRedis(fakeredis.FakeRedis(), delay=0.5))
+    worker = threading.Thread(target=limiter.acquire, args=('spot',))
+    worker.start()
+    try:
+        time.sleep(0.1)  # 此时 worker 正在等待 Redis
+        started = time.monotonic()
+        limiter.get_info()
+        assert time.monotonic() - started < 0.2
+    finally:
+        worker.join()
@@ -0,0 +1,157 @@
+from datetime import datetime
+import time
+
+import fakeredis
+import pandas as pd
+import pytest
+
+from app.models.enums import AssetType
+from app.services.market_snapshot import MarketSnapshot
+from app.services.quote import Quote
+from app.services.redis_cache import RedisMarketCache
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def make_cache(server, **kwargs):
+    return RedisMarketCache(client=fakeredis.FakeRedis(server=server), **kwargs)
+
+
+def test_quote_round_trip(server):
+    cache = make_cache(server)
+    quote = Quote(
+        code='600000', name='浦发银行', type=AssetType.STOCK, price=10.5,
+        timestamp=datetime(2026, 3, 9, 15, 0), price_date=datetime(2026, 3, 9), volume=1200,
+    )
+
+    assert cache.set('stock_600000', quote, ttl=60)
+    restored = cache.get('stock_600000')
+
+    assert isinstance(restored, Quote)
+    assert restored.type is AssetType.STOCK
+    assert restored.timestamp == quote.timestamp
+    assert restored.price_date == quote.price_date
+    assert dict(restored) == dict(quote)
+    assert cache.get_fetched_at('stock_600000') is not None
+
+
+def test_snapshot_round_trip(server):
+    cache = make_cache(server)
+    frame = pd.DataFrame({'代码': ['160001', '160002'], '名称': ['基金A', '基金B'], '最新价': [1.1, 2.2]})
+    snapshot = MarketSnapshot(frame, '代码', '名称', 'lof', fetched_at=datetime(2026, 3, 9, 15, 0))
+
+    assert cache.set('lof_all', snapshot, ttl=60)
+    restored = cache.get('lof_all')
+
+    assert isinstance(restored, MarketSnapshot)
+    assert list(restored.codes()) == ['160001', '160002']
+    assert restored.get_record('160002')['最新价'] == 2.2
+    assert restored.fetched_at == snapshot.fetched_at
+
+
+def test_pickled_values_are_not_decoded(server):
+    import pickle
+    import zlib
+
+    cache = make_cache(server)
+    cache.client.set(cache._key('stock_600000'), b'P' + zlib.compress(pickle.dumps({'price': 1.0})))
+
+    assert cache.get('stock_600000') is None
+    assert cache.get_info()['errors'] == 1
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_invalidation_fan_out(server):
+    publisher, subscriber = make_cache(server), make_cache(server)
+    published, received = [], []
+    try:
+        assert publisher.subscribe_invalidations(published.append)
+        assert subscriber.subscribe_invalidations(received.append)
+
+        publisher.publish_invalidation('lof_all')
+
+        assert wait_until(lambda: received == ['lof_all'])
+        assert published == []  # 忽略自己发出的消息
+        assert subscriber.get_info()['invalidations_received'] == 1
+    finally:
+        publisher.close()
+        subscriber.close()
+
+
+def test_falls_back_when_redis_is_down(server):
+    cache = make_cache(server, retry_interval=60)
+    server.connected = False
+
+    assert cache.get('stock_600000') is None
+    assert not cache.available
+    assert not cache.set('stock_600000', {'price': 1.0}, ttl=60)
+    with cache.lock('stock_600000') as acquired:
+        assert not acquired
+
+    # 启动时 Redis 不可用：记住回调，但不订阅
+    assert not make_cache(server).subscribe_invalidations(lambda key: None)
+
+
+def test_resubscribes_after_connection_loss(server):
+    publisher = make_cache(server)
+    subscriber = make_cache(server, retry_interval=0.2)
+    received = []
+    try:
+        assert subscriber.subscribe_invalidations(received.append)
+
+        server.connected = False
+        assert wait_until(lambda: not subscriber.get_info()['subscribed'])
+
+        server.connected = True
+        time.sleep(0.25)
+        subscriber.get('stock_600000')  # 恢复后的第一次成功操作触发重新订阅
+        assert subscriber.get_info()['subscribed']
+        assert subscriber.get_info()['resubscriptions'] == 1
+
+        publisher.publish_invalidation('stock_600000')
+        assert wait_until(lambda: received == ['stock_600000'])
+    finally:
+        publisher.close()
+        subscriber.close()
+
+
+def test_subscribes_once_redis_recovers(server):
+    server.connected = False
+    cache = make_cache(server, retry_interval=0.2)
+    assert not cache.subscribe_invalidations(lambda key: None)
+
+    server.connected = True
+    time.sleep(0.25)
+    cache.get('stock_600000')
+    try:
+        assert cache.get_info()['subscribed']
+    finally:
+        cache.close()
+
+
+def test_lock_is_sized_from_hold_time(server):
+    cache = make_cache(server, lock_timeout=60, lock_wait=30)
+    other = make_cache(server, lock_timeout=60, lock_wait=0)
+    lock_key = cache._key('open_fund_all:lock')
+
+    with cache.lock('open_fund_all', hold=120) as acquired:
+        assert acquired
+        # 自动释放时间覆盖最长的上游调用耗时，不会在慢速获取期间过期
+        assert cache.client.pttl(lock_key) > 120 * 1000
+        with other.lock('open_fund_all') as other_acquired:
+            assert not other_acquired
+
+    assert cache.client.get(lock_key) is None
+    with other.lock('open_fund_all') as acquired:
+        assert acquired
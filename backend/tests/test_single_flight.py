@@ -0,0 +1,81 @@
+"""SingleFlight 的取消语义"""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def blocking(release: threading.Event, value=42):
+    def fn():
+        assert release.wait(5)
+        return value
+    return fn
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_does_not_affect_others():
+    flight = SingleFlight()
+    release = threading.Event()
+    fn = blocking(release)
+    loop = asyncio.get_running_loop()
+
+    leader = asyncio.create_task(flight.do_async('k', fn))
+    await asyncio.sleep(0.05)
+    cancelled = asyncio.create_task(flight.do_async('k', fn))
+    waiter = asyncio.create_task(flight.do_async('k', fn))
+    sync_waiter = loop.run_in_executor(None, flight.do, 'k', fn)
+    await asyncio.sleep(0.05)
+
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    release.set()
+    assert await leader == 42
+    assert await waiter == 42
+    assert await sync_waiter == 42
+    assert flight.get_stats()['executions'] == 1
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_leader_does_not_cancel_shared_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    fn = blocking(release)
+
+    leader = asyncio.create_task(flight.do_async('k', fn))
+    await asyncio.sleep(0.05)
+    waiter = asyncio.create_task(flight.do_async('k', fn))
+    await asyncio.sleep(0.05)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    release.set()
+    assert await waiter == 42
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_leader_error_reaches_all_waiters():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("上游失败")
+
+    leader = asyncio.create_task(flight.do_async('k', fail))
+    await asyncio.sleep(0.05)
+    waiter = asyncio.create_task(flight.do_async('k', fail))
+    await asyncio.sleep(0.05)
+    release.set()
+
+    for task in (leader, waiter):
+        with pytest.raises(ValueError):
+            await task
+    assert flight.in_flight() == 0
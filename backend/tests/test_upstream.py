@@ -0,0 +1,204 @@
+import random
+import time
+
+import pytest
+
+from app.services.upstream import (
+    CircuitBreaker, CircuitOpenError, RateLimitExceeded, UpstreamClient, UpstreamTimeout,
+)
+
+
+class FakeClock:
+    """可手动推进的单调时钟；sleep 直接推进时钟"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_client(clock, **kwargs):
+    options = dict(timeout=0, max_retries=2, failure_threshold=0, rng=random.Random(0),
+                   sleep=clock.sleep, clock=clock)
+    options.update(kwargs)
+    return UpstreamClient(**options)
+
+
+def flaky(failures, result='ok', error=ConnectionError):
+    """前 failures 次调用抛出临时性错误，之后返回 result"""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error("boom")
+        return result
+
+    func.calls = calls
+    return func
+
+
+def test_attempt_timeout():
+    client = UpstreamClient(timeout=0.05, max_retries=0, failure_threshold=0)
+    try:
+        with pytest.raises(UpstreamTimeout):
+            client.call('slow', time.sleep, 0.5)
+        info = client.get_info()['endpoints']['slow']
+        assert info['timeouts'] == 1
+        assert info['failures'] == 1
+    finally:
+        client.shutdown()
+
+
+def test_retries_transient_errors_then_succeeds():
+    clock = FakeClock()
+    client = make_client(clock)
+    func = flaky(2)
+
+    assert client.call('quote', func) == 'ok'
+    assert len(func.calls) == 3
+    assert len(clock.sleeps) == 2
+    info = client.get_info()['endpoints']['quote']
+    assert (info['attempts'], info['retries'], info['successes']) == (3, 2, 1)
+
+
+def test_raises_last_error_when_retries_exhausted():
+    clock = FakeClock()
+    client = make_client(clock, max_retries=1)
+    func = flaky(5)
+
+    with pytest.raises(ConnectionError):
+        client.call('quote', func)
+    assert len(func.calls) == 2
+
+
+def test_non_transient_error_is_not_retried():
+    clock = FakeClock()
+    client = make_client(clock)
+    func = flaky(1, error=ValueError)
+
+    with pytest.raises(ValueError):
+        client.call('quote', func)
+    assert len(func.calls) == 1
+    assert clock.sleeps == []
+
+
+def test_deadline_skips_remaining_retries():
+    clock = FakeClock()
+    client = make_client(clock, max_retries=5, deadline=30)
+    calls = []
+
+    def slow_failure():
+        calls.append(1)
+        clock.now += 20
+        raise ConnectionError("boom")
+
+    with pytest.raises(ConnectionError):
+        client.call('spot', slow_failure)
+    # 第二次尝试结束时已过 40 秒，超过 30 秒的总截止时间，不再重试
+    assert len(calls) == 2
+    assert client.get_info()['endpoints']['spot']['deadline_exceeded'] == 1
+
+
+def test_deadline_caps_attempt_timeout():
+    client = UpstreamClient(timeout=10, deadline=0.1, max_retries=3, failure_threshold=0)
+    try:
+        started = time.monotonic()
+        with pytest.raises(UpstreamTimeout):
+            client.call('slow', time.sleep, 1)
+        assert time.monotonic() - started < 0.5
+        assert client.get_info()['endpoints']['slow']['attempts'] == 1
+    finally:
+        client.shutdown()
+
+
+def test_max_call_duration():
+    assert UpstreamClient(deadline=45).max_call_duration('spot') == 45
+    assert UpstreamClient(timeout=0).max_call_duration('spot') is None
+    client = UpstreamClient(timeout=10, max_retries=1, backoff_base=1, backoff_max=8)
+    assert client.max_call_duration('spot') == 10 * 2 + 1
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    client = make_client(clock, max_retries=0, failure_threshold=2, reset_timeout=10)
+    failing = flaky(10)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            client.call('spot', failing)
+    assert client.breaker('spot').state == CircuitBreaker.OPEN
+
+    # 熔断期间不访问上游
+    with pytest.raises(CircuitOpenError):
+        client.call('spot', failing)
+    assert len(failing.calls) == 2
+
+    clock.now += 10
+    assert client.breaker('spot').state == CircuitBreaker.HALF_OPEN
+
+    # 探测失败：重新打开
+    with pytest.raises(ConnectionError):
+        client.call('spot', failing)
+    assert client.breaker('spot').state == CircuitBreaker.OPEN
+
+    # 探测成功：关闭
+    clock.now += 10
+    assert client.call('spot', lambda: 'ok') == 'ok'
+    assert client.breaker('spot').state == CircuitBreaker.CLOSED
+    assert client.get_info()['endpoints']['spot']['short_circuited'] == 1
+
+
+def test_half_open_allows_single_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now += 5
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
+
+
+class CountingLimiter:
+    """只有 capacity 个令牌、不补充的限流器"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.acquired = 0
+
+    def acquire(self, endpoint, timeout=None):
+        if self.acquired >= self.capacity:
+            raise RateLimitExceeded(f"{endpoint} 超出上游请求预算")
+        self.acquired += 1
+        return 0.0
+
+
+def test_retries_do_not_take_rate_limit_tokens():
+    clock = FakeClock()
+    limiter = CountingLimiter(capacity=1)
+    client = make_client(clock, rate_limiter=limiter)
+    func = flaky(2)
+
+    assert client.call('fund_open_fund_daily_em', func) == 'ok'
+    assert len(func.calls) == 3
+    assert limiter.acquired == 1
+
+    # 预算用尽后新的调用才被拒绝
+    with pytest.raises(RateLimitExceeded):
+        client.call('fund_open_fund_daily_em', func)
+
+
+def test_exhausted_retries_report_the_upstream_error():
+    clock = FakeClock()
+    client = make_client(clock, rate_limiter=CountingLimiter(capacity=1))
+
+    with pytest.raises(ConnectionError):
+        client.call('fund_open_fund_daily_em', flaky(5))